@@ -0,0 +1,190 @@
+"""
+Chunking microbenchmark.
+
+Generates large markdown documents and times the chunker and per-chunk metadata
+extraction against the implementations they replaced, after checking that both
+produce the same chunks and headers:
+
+    uv run benchmarks/chunking_benchmark.py --mb 4 --chunk-sizes 1000 5000
+
+Three documents are generated: typical documentation (headings, paragraphs, lists
+and code blocks), one long code block per section, and text without paragraph
+breaks, where every chunk falls back to a sentence boundary. The content-defined
+chunker (CONTENT_DEFINED_CHUNKING) is timed alongside; it has no reference to
+check against.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from chunking import chunk_headings, chunk_spans, content_defined_chunk_spans, smart_chunk_markdown
+from document_processing import process_document
+
+WORDS = (
+    "crawler index chunk embedding vector query page sitemap token server client request "
+    "response latency cache worker browser session markdown header section example config "
+    "option default value return argument function method class module package install"
+).split()
+
+
+def legacy_smart_chunk_markdown(text: str, chunk_size: int = 5000) -> List[str]:
+    """The slicing chunker that chunk_spans replaced, kept as the reference."""
+    chunks = []
+    start = 0
+    text_length = len(text)
+    while start < text_length:
+        end = start + chunk_size
+        if end >= text_length:
+            chunks.append(text[start:].strip())
+            break
+        chunk = text[start:end]
+        code_block = chunk.rfind('```')
+        if code_block != -1 and code_block > chunk_size * 0.3:
+            end = start + code_block
+        elif '\n\n' in chunk:
+            last_break = chunk.rfind('\n\n')
+            if last_break > chunk_size * 0.3:
+                end = start + last_break
+        elif '. ' in chunk:
+            last_period = chunk.rfind('. ')
+            if last_period > chunk_size * 0.3:
+                end = start + last_period + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+
+def legacy_headings(chunk: str) -> List[tuple]:
+    """The multiline heading regex that chunk_headings replaced."""
+    return re.findall(r'^(#+)\s+(.+)$', chunk, re.MULTILINE)
+
+
+def sentence(rng: random.Random, words: int = 16) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def documentation(size: int, rng: random.Random) -> str:
+    """Headings, paragraphs, lists and short code blocks."""
+    parts, length, section = [], 0, 0
+    while length < size:
+        section += 1
+        block = [f"## Section {section}", " ".join(sentence(rng) for _ in range(rng.randint(2, 8)))]
+        if section % 2 == 0:
+            block.append("\n".join(f"- {sentence(rng, 6)}" for _ in range(rng.randint(2, 6))))
+        if section % 3 == 0:
+            block.append(f"```python\ndef example_{section}(value):\n    return value * {section}\n```")
+        if section % 10 == 0:
+            block.insert(0, f"# Chapter {section // 10}")
+        text = "\n\n".join(block)
+        parts.append(text)
+        length += len(text) + 2
+    return "\n\n".join(parts)
+
+
+def code_heavy(size: int, rng: random.Random) -> str:
+    """A long code block in every section."""
+    parts, length, section = [], 0, 0
+    while length < size:
+        section += 1
+        code = "\n".join(f"    result_{i} = compute({rng.choice(WORDS)!r}, {i})" for i in range(rng.randint(20, 120)))
+        text = f"### Example {section}\n\n{sentence(rng)}\n\n```python\ndef example_{section}():\n{code}\n```"
+        parts.append(text)
+        length += len(text) + 2
+    return "\n\n".join(parts)
+
+
+def run_on(size: int, rng: random.Random) -> str:
+    """Sentences without a single paragraph break."""
+    parts, length = [], 0
+    while length < size:
+        text = sentence(rng)
+        parts.append(text)
+        length += len(text) + 1
+    return " ".join(parts)
+
+
+DOCUMENTS = {"documentation": documentation, "code_heavy": code_heavy, "run_on": run_on}
+
+
+def best_time(fn: Callable[[], Any], repeat: int) -> float:
+    """Fastest of several runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def check(text: str, chunk_size: int) -> None:
+    """Fail unless the new chunker and heading search agree with the reference."""
+    legacy = [chunk for chunk in legacy_smart_chunk_markdown(text, chunk_size) if chunk]
+    chunks = smart_chunk_markdown(text, chunk_size)
+    if chunks != legacy:
+        raise SystemExit(f"Chunks differ from the reference chunker at chunk_size={chunk_size}")
+    for chunk in chunks:
+        if chunk_headings(chunk) != legacy_headings(chunk):
+            raise SystemExit(f"Headers differ from the reference in a chunk at chunk_size={chunk_size}")
+
+
+def bench(text: str, chunk_size: int, repeat: int) -> Dict[str, Any]:
+    chunks = smart_chunk_markdown(text, chunk_size)
+    mb = len(text.encode("utf-8")) / 1e6
+    timings = {
+        "legacy_chunk_ms": best_time(lambda: legacy_smart_chunk_markdown(text, chunk_size), repeat),
+        "chunk_spans_ms": best_time(lambda: chunk_spans(text, chunk_size), repeat),
+        "content_defined_spans_ms": best_time(lambda: content_defined_chunk_spans(text, chunk_size), repeat),
+        "chunk_text_ms": best_time(lambda: smart_chunk_markdown(text, chunk_size), repeat),
+        "legacy_headings_ms": best_time(lambda: [legacy_headings(chunk) for chunk in chunks], repeat),
+        "headings_ms": best_time(lambda: [chunk_headings(chunk) for chunk in chunks], repeat),
+        "process_document_ms": best_time(lambda: process_document("https://example.com/doc", text, chunk_size, "webpage", "", False), repeat),
+    }
+    return {
+        "chunk_size": chunk_size,
+        "chunks": len(chunks),
+        **{name: round(ms, 2) for name, ms in timings.items()},
+        "chunk_text_mb_per_second": round(mb / (timings["chunk_text_ms"] / 1000), 1),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Time markdown chunking on generated documents.")
+    parser.add_argument("--mb", type=float, default=4.0, help="Size of each generated document in MB")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000, 5000], help="chunk_size values to time")
+    parser.add_argument("--documents", nargs="+", choices=DOCUMENTS, default=list(DOCUMENTS), help="Documents to generate")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the generated text")
+    parser.add_argument("--output", default=None, help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {}
+    for name in args.documents:
+        text = DOCUMENTS[name](int(args.mb * 1e6), random.Random(args.seed))
+        runs = []
+        for chunk_size in args.chunk_sizes:
+            check(text, chunk_size)
+            runs.append(bench(text, chunk_size, args.repeat))
+        results[name] = {"characters": len(text), "runs": runs}
+
+    output = json.dumps({"python": sys.version.split()[0], "documents": results}, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+        print(f"Results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Crawl benchmark against a local fixture site.
+
+Starts a FixtureSite, then times the server's own crawl functions against it:
+
+- batch: crawl_batch over every URL in the site's sitemap.xml
+- recursive: crawl_recursive_internal_links from the site's root page
+- markdown: crawl_markdown_file on the site's llms-full.txt
+
+For every scenario it reports pages per second, p50/p95 page latency (time spent
+fetching each URL, HTTP fast path and browser combined), peak RSS of the process
+and its browsers, and how many of the browser pool's page slots were in use.
+Results are JSON, tagged with the current git commit, so runs can be compared
+across commits:
+
+    uv run benchmarks/crawl_benchmark.py --output before.json
+    # ...change the crawler...
+    uv run benchmarks/crawl_benchmark.py --output after.json --compare before.json
+
+The browser pool and HTTP fast path are configured from the same CRAWL_*
+environment variables as the server. Per-host rate limiting is off unless
+--politeness is given, since it would otherwise dominate the timings.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import psutil
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from crawl4ai import BrowserConfig
+
+from crawl4ai_mcp import crawl_batch, crawl_recursive_internal_links, crawl_markdown_file
+from adaptive_concurrency import percentile
+from browser_pool import BrowserPool
+from host_rate_limiter import HostRateLimiter
+from http_fetch import HttpFetcher
+from sitemap import iter_sitemap_entries
+from fixture_site import FixtureSite, SiteConfig
+
+SCENARIOS = ("batch", "recursive", "markdown")
+
+# Metrics compared by --compare, and whether a higher value is better
+COMPARED_METRICS = {
+    "pages_per_second": True,
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "peak_rss_mb": False,
+    "browser_utilization": True
+}
+
+
+class PageTimer:
+    """Collects the time spent fetching each URL, across the HTTP fast path and the browser."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.browser_fetches = 0
+        self.http_fetches = 0
+
+    def add(self, url: str, seconds: float) -> None:
+        self.seconds[url] = self.seconds.get(url, 0.0) + seconds
+
+
+class TimedCrawler:
+    """Wraps a BrowserPool so every browser fetch is timed."""
+
+    def __init__(self, pool: BrowserPool, timer: PageTimer):
+        self.pool = pool
+        self.timer = timer
+
+    async def arun(self, url: str, config: Optional[Any] = None, **kwargs):
+        started = time.monotonic()
+        try:
+            return await self.pool.arun(url=url, config=config, **kwargs)
+        finally:
+            self.timer.browser_fetches += 1
+            self.timer.add(url, time.monotonic() - started)
+
+
+class TimedHttpFetcher:
+    """Wraps an HttpFetcher so every fast-path fetch is timed."""
+
+    def __init__(self, fetcher: HttpFetcher, timer: PageTimer):
+        self.fetcher = fetcher
+        self.client = fetcher.client
+        self.timer = timer
+
+    def wants(self, url: str) -> bool:
+        return self.fetcher.wants(url)
+
+    async def fetch(self, url: str):
+        started = time.monotonic()
+        try:
+            return await self.fetcher.fetch(url)
+        finally:
+            self.timer.http_fetches += 1
+            self.timer.add(url, time.monotonic() - started)
+
+
+class ResourceSampler:
+    """Samples RSS (this process and its browsers) and the browser pool's busy page slots."""
+
+    def __init__(self, pool: BrowserPool, interval: float = 0.05):
+        self.pool = pool
+        self.interval = interval
+        self.peak_rss = 0
+        self.pages_in_use: List[int] = []
+        self._process = psutil.Process()
+        self._task: Optional[asyncio.Task] = None
+
+    def rss(self) -> int:
+        total = 0
+        for process in [self._process, *self._process.children(recursive=True)]:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            self.peak_rss = max(self.peak_rss, await asyncio.to_thread(self.rss))
+            self.pages_in_use.append(self.pool.pages_in_use)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self.peak_rss = max(self.peak_rss, self.rss())
+
+
+async def run_scenario(crawl: Callable[[TimedCrawler, Optional[TimedHttpFetcher]], Awaitable[List[Dict[str, Any]]]], pool: BrowserPool, http_fetcher: Optional[HttpFetcher]) -> Dict[str, Any]:
+    """
+    Time one crawl and summarize it.
+
+    Args:
+        crawl: Coroutine function running the crawl with the given crawler and HTTP fetcher
+        pool: Browser pool the crawl renders pages with
+        http_fetcher: HttpFetcher for the fast path, or None to use the browser only
+
+    Returns:
+        Dictionary of metrics
+    """
+    timer = PageTimer()
+    sampler = ResourceSampler(pool)
+    crawler = TimedCrawler(pool, timer)
+    fetcher = TimedHttpFetcher(http_fetcher, timer) if http_fetcher else None
+
+    sampler.start()
+    started = time.monotonic()
+    try:
+        docs = await crawl(crawler, fetcher)
+    finally:
+        elapsed = time.monotonic() - started
+        await sampler.stop()
+
+    latencies = list(timer.seconds.values()) or [0.0]
+    in_use = sampler.pages_in_use or [0]
+    return {
+        "pages": len(docs),
+        "urls_fetched": len(timer.seconds),
+        "browser_fetches": timer.browser_fetches,
+        "http_fetches": timer.http_fetches,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(len(docs) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "latency_max_ms": round(max(latencies) * 1000, 1),
+        "peak_rss_mb": round(sampler.peak_rss / 1024 / 1024, 1),
+        "browser_pages_mean": round(statistics.fmean(in_use), 2),
+        "browser_pages_peak": max(in_use),
+        "browser_utilization": round(statistics.fmean(in_use) / pool.max_pages, 3)
+    }
+
+
+def median_run(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine repeated runs into one result holding each metric's (lower) median."""
+    return {key: statistics.median_low(run[key] for run in runs) for key in runs[0]}
+
+
+def git_commit() -> Optional[str]:
+    """Return the current commit (with "-dirty" for uncommitted changes), or None outside a git checkout."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=project_root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> str:
+    """
+    Format the change of each compared metric between two benchmark results.
+
+    Args:
+        baseline: Earlier result, as written by this script
+        current: New result
+
+    Returns:
+        Text table with one row per scenario and metric
+    """
+    rows = [f"{'scenario':<10} {'metric':<20} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for scenario, metrics in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            better = change > 0 if higher_is_better else change < 0
+            marker = "" if abs(change) < 5 else (" +" if better else " -")
+            rows.append(f"{scenario:<10} {metric:<20} {old:>10g} {new:>10g} {change:>7.1f}%{marker}")
+    return "\n".join(rows)
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Serve the fixture site and run every requested scenario against it."""
+    config = SiteConfig(
+        pages=args.pages,
+        fanout=args.fanout,
+        page_kb=args.page_kb,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        slow_fraction=args.slow_fraction,
+        slow_ms=args.slow_ms,
+        js_fraction=args.js_fraction,
+        seed=args.seed
+    )
+    pool = BrowserPool.from_env(BrowserConfig(headless=True, verbose=False))
+    http_fetcher = None if args.browser_only else HttpFetcher.from_env()
+    rate_limiter = HostRateLimiter.from_env() if args.politeness else None
+
+    results: Dict[str, Any] = {}
+    with FixtureSite(config) as site:
+        await pool.start()
+        try:
+            sitemap_urls = [entry["loc"] async for entry in iter_sitemap_entries(f"{site.base_url}/sitemap.xml")]
+            crawls = {
+                "batch": lambda crawler, fetcher: crawl_batch(crawler, sitemap_urls, max_concurrent=args.max_concurrent, rate_limiter=rate_limiter, http_fetcher=fetcher),
+                "recursive": lambda crawler, fetcher: crawl_recursive_internal_links(crawler, [f"{site.base_url}/docs/"], max_depth=config.depth() + 1, max_concurrent=args.max_concurrent, rate_limiter=rate_limiter, http_fetcher=fetcher),
+                "markdown": lambda crawler, fetcher: crawl_markdown_file(crawler, f"{site.base_url}/llms-full.txt", rate_limiter=rate_limiter, http_fetcher=fetcher)
+            }
+            for name in args.scenarios:
+                runs = [await run_scenario(crawls[name], pool, http_fetcher) for _ in range(args.repeat)]
+                results[name] = median_run(runs)
+                print(f"{name}: {results[name]['pages']} pages, {results[name]['pages_per_second']} pages/s", file=sys.stderr)
+        finally:
+            await pool.close()
+            if http_fetcher is not None:
+                await http_fetcher.close()
+
+    return {
+        "benchmark": "crawl",
+        "commit": git_commit(),
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "site": asdict(config),
+            "max_concurrent": args.max_concurrent,
+            "repeat": args.repeat,
+            "http_fast_path": http_fetcher is not None,
+            "politeness": args.politeness,
+            "browser_pool_size": pool.size,
+            "browser_max_pages": pool.max_pages
+        },
+        "scenarios": results
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = SiteConfig()
+    parser = argparse.ArgumentParser(description="Benchmark the crawl functions against a local synthetic documentation site.")
+    parser.add_argument("--pages", type=int, default=defaults.pages, help="Number of pages in the site")
+    parser.add_argument("--fanout", type=int, default=defaults.fanout, help="Child pages linked from every page")
+    parser.add_argument("--page-kb", type=float, default=defaults.page_kb, help="Approximate text size of each page in KB")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="Median response latency in milliseconds")
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma, help="Spread of the log-normal latency distribution")
+    parser.add_argument("--slow-fraction", type=float, default=defaults.slow_fraction, help="Fraction of responses that are slow outliers")
+    parser.add_argument("--slow-ms", type=float, default=defaults.slow_ms, help="Latency of slow outliers in milliseconds")
+    parser.add_argument("--js-fraction", type=float, default=defaults.js_fraction, help="Fraction of pages that need the browser to render")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Seed for the site's contents and latencies")
+    parser.add_argument("--max-concurrent", type=int, default=10, help="max_concurrent passed to the crawl functions")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="Scenarios to run")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the median of each metric is reported")
+    parser.add_argument("--browser-only", action="store_true", help="Disable the HTTP fast path")
+    parser.add_argument("--politeness", action="store_true", help="Apply the CRAWL_HOST_* per-host rate limits")
+    parser.add_argument("--label", default=None, help="Free-form label stored with the results")
+    parser.add_argument("--output", default=None, help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    result = await run_benchmark(args)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print(compare(baseline, result), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,248 @@
+"""
+Synthetic documentation site for crawl benchmarks.
+
+FixtureSite serves a generated documentation site from a local HTTP server, so
+crawls can be timed without depending on the network or on a real site changing
+under the benchmark. The site is a tree of pages (each page links to `fanout`
+children plus a few cross links), with a sitemap.xml, an llms.txt index and an
+llms-full.txt containing every page as markdown. Every response is delayed by a
+latency drawn from a log-normal distribution, with a fraction of slow outliers,
+and a fraction of pages are JavaScript shells that only the browser can render.
+All of it is derived from a seed, so two runs with the same settings serve the
+same site with the same latencies.
+"""
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+WORDS = (
+    "crawler index chunk embedding vector query page sitemap token server client request "
+    "response latency cache worker browser session markdown header section example config "
+    "option default value return argument function method class module package install"
+).split()
+
+
+@dataclass
+class SiteConfig:
+    """
+    Shape of the generated site and how slowly it responds.
+
+    Attributes:
+        pages: Number of HTML pages
+        fanout: Child pages linked from every page
+        cross_links: Additional links from every page to random other pages
+        page_kb: Approximate size of each page's text in kilobytes
+        latency_ms: Median response latency in milliseconds
+        latency_sigma: Spread of the log-normal latency distribution
+        slow_fraction: Fraction of responses that are slow outliers
+        slow_ms: Latency of a slow outlier in milliseconds
+        js_fraction: Fraction of pages rendered client-side with JavaScript
+        seed: Seed for page contents and latencies
+    """
+    pages: int = 200
+    fanout: int = 5
+    cross_links: int = 3
+    page_kb: float = 8.0
+    latency_ms: float = 50.0
+    latency_sigma: float = 0.5
+    slow_fraction: float = 0.02
+    slow_ms: float = 2000.0
+    js_fraction: float = 0.1
+    seed: int = 42
+
+    def depth(self) -> int:
+        """Link depth of the deepest page, counting the root page as depth 0."""
+        depth, last = 0, 0
+        while last < self.pages - 1:
+            last = last * self.fanout + self.fanout
+            depth += 1
+        return depth
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under a concurrent crawl
+    request_queue_size = 256
+
+
+class FixtureSite:
+    """
+    Serves a SiteConfig's site from a background thread on a free local port.
+
+    Use as a context manager; `base_url` is valid while it is open.
+    """
+
+    def __init__(self, config: SiteConfig, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FixtureSite":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def page_path(self, index: int) -> str:
+        return "/docs/" if index == 0 else f"/docs/page-{index}.html"
+
+    def page_urls(self) -> List[str]:
+        return [self.base_url + self.page_path(i) for i in range(self.config.pages)]
+
+    def _rng(self, *key) -> random.Random:
+        return random.Random(":".join(str(k) for k in (self.config.seed, *key)))
+
+    def latency(self, path: str) -> float:
+        """Seconds the response for a path is delayed; the same path always gets the same delay."""
+        rng = self._rng("latency", path)
+        if rng.random() < self.config.slow_fraction:
+            return self.config.slow_ms / 1000
+        return self.config.latency_ms / 1000 * math.exp(rng.gauss(0, self.config.latency_sigma))
+
+    def links(self, index: int) -> List[int]:
+        """Pages a page links to: its children in the tree, then its cross links."""
+        config = self.config
+        first = index * config.fanout + 1
+        children = list(range(first, min(first + config.fanout, config.pages)))
+        rng = self._rng("links", index)
+        cross = [rng.randrange(config.pages) for _ in range(config.cross_links)]
+        return children + [i for i in cross if i != index and i not in children]
+
+    def is_javascript(self, index: int) -> bool:
+        return index > 0 and self._rng("js", index).random() < self.config.js_fraction
+
+    def page_markdown(self, index: int) -> str:
+        """The page's text as markdown, about page_kb kilobytes long."""
+        rng = self._rng("text", index)
+        parts = [f"# Page {index}\n"]
+        size, section = 0, 0
+        target = int(self.config.page_kb * 1024)
+        while size < target:
+            section += 1
+            heading = f"\n## Section {section}\n\n"
+            paragraph = " ".join(rng.choice(WORDS) for _ in range(80)).capitalize() + ".\n"
+            parts += [heading, paragraph]
+            size += len(heading) + len(paragraph)
+            if section % 3 == 0:
+                code = f"\n```python\ndef example_{index}_{section}(value):\n    return value * {section}\n```\n"
+                parts.append(code)
+                size += len(code)
+        return "".join(parts)
+
+    def page_html(self, index: int) -> str:
+        nav = "".join(f'<li><a href="{self.page_path(i)}">Page {i}</a></li>' for i in self.links(index))
+        body = markdown_to_html(self.page_markdown(index))
+        if self.is_javascript(index):
+            # An empty shell the HTTP fast path hands over to the browser
+            content = body.replace("\\", "\\\\").replace("`", "\\`").replace("${", "\\${")
+            main = f'<div id="root"></div><script>document.getElementById("root").innerHTML = `{content}`;</script>'
+        else:
+            main = f"<main>{body}</main>"
+        return (
+            f"<!DOCTYPE html><html><head><title>Page {index}</title></head>"
+            f"<body><nav><ul>{nav}</ul></nav>{main}</body></html>"
+        )
+
+    def sitemap(self) -> str:
+        entries = "".join(f"<url><loc>{url}</loc></url>" for url in self.page_urls())
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+
+    def llms_txt(self) -> str:
+        links = "".join(f"- [Page {i}]({url})\n" for i, url in enumerate(self.page_urls()))
+        return f"# Fixture Docs\n\n> Synthetic documentation site for crawl benchmarks.\n\n## Docs\n\n{links}"
+
+    def llms_full_txt(self) -> str:
+        return "\n\n".join(self.page_markdown(i) for i in range(self.config.pages))
+
+    def render(self, path: str) -> Optional[Tuple[str, str]]:
+        """Return the content type and body for a path, or None if it does not exist."""
+        if path == "/sitemap.xml":
+            return "application/xml", self.sitemap()
+        if path == "/llms.txt":
+            return "text/plain; charset=utf-8", self.llms_txt()
+        if path == "/llms-full.txt":
+            return "text/plain; charset=utf-8", self.llms_full_txt()
+        if path == "/robots.txt":
+            return "text/plain; charset=utf-8", f"User-agent: *\nAllow: /\nSitemap: {self.base_url}/sitemap.xml\n"
+        if path in ("/", "/docs", "/docs/"):
+            return "text/html; charset=utf-8", self.page_html(0)
+        if path.startswith("/docs/page-") and path.endswith(".html"):
+            try:
+                index = int(path[len("/docs/page-"):-len(".html")])
+            except ValueError:
+                return None
+            if 0 < index < self.config.pages:
+                return "text/html; charset=utf-8", self.page_html(index)
+        return None
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0].split("#", 1)[0]
+                time.sleep(site.latency(path))
+                with site._lock:
+                    site.requests_served += 1
+                page = site.render(path)
+                if page is None:
+                    self.send_error(404)
+                    return
+                content_type, body = page
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_HEAD(self):
+                self.send_response(200 if site.render(self.path) is not None else 404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def markdown_to_html(markdown: str) -> str:
+    """Render the generated markdown (headings, paragraphs and code blocks) as HTML."""
+    html, code = [], None
+    for line in markdown.split("\n"):
+        if code is not None:
+            if line.startswith("```"):
+                html.append(f"<pre><code>{escape(chr(10).join(code))}</code></pre>")
+                code = None
+            else:
+                code.append(line)
+        elif line.startswith("```"):
+            code = []
+        elif line.startswith("## "):
+            html.append(f"<h2>{escape(line[3:])}</h2>")
+        elif line.startswith("# "):
+            html.append(f"<h1>{escape(line[2:])}</h1>")
+        elif line.strip():
+            html.append(f"<p>{escape(line)}</p>")
+    return "".join(html)
+
+
+def escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
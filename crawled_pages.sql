@@ -2,10 +2,22 @@
 create extension if not exists vector;
 
 -- Drop tables if they exist (to allow rerunning the script)
+drop table if exists crawl_frontier;
+drop table if exists distributed_crawls;
+drop table if exists crawl_state;
 drop table if exists crawled_pages;
 drop table if exists code_examples;
 drop table if exists sources;
 
+-- Drop the frontier functions, whose result types "create or replace" cannot change
+drop function if exists enqueue_frontier_urls(text, jsonb);
+drop function if exists lease_frontier_urls(text, text, integer, integer, integer);
+drop function if exists mark_frontier_urls_fetched(text, text, text[]);
+drop function if exists complete_frontier_urls(text, text, text[], text, text);
+drop function if exists renew_frontier_leases(text, text, integer);
+drop function if exists release_frontier_leases(text, text);
+drop function if exists crawl_frontier_counts(text, text);
+
 -- Create the sources table
 create table sources (
     source_id text primary key,
@@ -39,6 +51,9 @@ create index on crawled_pages using ivfflat (embedding vector_cosine_ops);
 -- Create an index on metadata for faster filtering
 create index idx_crawled_pages_metadata on crawled_pages using gin (metadata);
 
+-- Create an index on chunk hashes for reusing the embeddings of unchanged chunks
+create index idx_crawled_pages_chunk_hash on crawled_pages ((metadata->>'chunk_hash'));
+
 -- Create an index on source_id for faster filtering
 CREATE INDEX idx_crawled_pages_source_id ON crawled_pages (source_id);
 
@@ -172,4 +187,230 @@ create policy "Allow public read access to code_examples"
   on code_examples
   for select
   to public
-  using (true);
\ No newline at end of file
+  using (true);
+
+-- Create the crawl_state table used to skip unchanged pages on re-crawls
+create table crawl_state (
+    url varchar primary key,
+    source_id text not null,
+    etag text,
+    last_modified text,
+    sitemap_lastmod text,
+    content_hash text,
+    internal_links jsonb not null default '[]'::jsonb,
+    canonical_url varchar,  -- Set when this URL is an alias of another page with identical content
+    last_crawled_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+-- Create an index on source_id for faster filtering
+CREATE INDEX idx_crawl_state_source_id ON crawl_state (source_id);
+
+-- Enable RLS on the crawl_state table (only the service role writes or reads it)
+alter table crawl_state enable row level security;
+
+-- Create the tables used by distributed crawls: one row per crawl, and its shared
+-- frontier with one row per URL. The primary key is the crawl's visited set, so a
+-- URL is only ever queued once no matter how many workers discover it.
+create table distributed_crawls (
+    crawl_id text primary key,
+    url varchar not null,
+    crawl_type text not null,
+    params jsonb not null default '{}'::jsonb,
+    created_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+create table crawl_frontier (
+    crawl_id text not null references distributed_crawls(crawl_id) on delete cascade,
+    url varchar not null,
+    depth integer not null default 0,
+    priority real not null default 0,
+    status text not null default 'queued',  -- queued, leased, done or failed
+    leased_by text,
+    lease_expires_at timestamp with time zone,
+    fetched boolean not null default false,  -- The leaseholder fetched the page and queued its links
+    attempts integer not null default 0,  -- Number of times the URL was leased
+    last_error text,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    primary key (crawl_id, url)
+);
+
+-- Create an index for leasing the highest-priority URLs that are not done yet
+CREATE INDEX idx_crawl_frontier_lease ON crawl_frontier (crawl_id, priority desc) WHERE status in ('queued', 'leased');
+
+-- Add URLs to a crawl's frontier, ignoring those it has already seen
+create or replace function enqueue_frontier_urls (
+  p_crawl_id text,
+  p_urls jsonb  -- [{"url": ..., "depth": ..., "priority": ...}, ...]
+) returns integer
+language plpgsql
+as $$
+declare
+  inserted integer;
+begin
+  insert into crawl_frontier (crawl_id, url, depth, priority)
+  select p_crawl_id, e->>'url', coalesce((e->>'depth')::integer, 0), coalesce((e->>'priority')::real, 0)
+  from jsonb_array_elements(p_urls) as e
+  on conflict (crawl_id, url) do nothing;
+  get diagnostics inserted = row_count;
+  return inserted;
+end;
+$$;
+
+-- Lease the highest-priority queued URLs to a worker. URLs whose lease expired
+-- (the worker crashed or stalled) are leased again, up to p_max_attempts times.
+-- SKIP LOCKED lets concurrent workers lease disjoint batches without waiting.
+create or replace function lease_frontier_urls (
+  p_crawl_id text,
+  p_worker text,
+  p_limit integer default 10,
+  p_lease_seconds integer default 300,
+  p_max_attempts integer default 3
+) returns table (
+  url varchar,
+  depth integer
+)
+language plpgsql
+as $$
+begin
+  update crawl_frontier as f
+  set status = 'failed', leased_by = null, lease_expires_at = null,
+      last_error = 'Lease expired ' || f.attempts || ' times', updated_at = now()
+  where (f.crawl_id, f.url) in (
+    select c.crawl_id, c.url
+    from crawl_frontier as c
+    where c.crawl_id = p_crawl_id
+      and c.status = 'leased'
+      and c.lease_expires_at < now()
+      and c.attempts >= p_max_attempts
+    for update skip locked
+  );
+
+  return query
+  update crawl_frontier as f
+  set status = 'leased', leased_by = p_worker, fetched = false,
+      lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+      attempts = f.attempts + 1, updated_at = now()
+  from (
+    select c.url
+    from crawl_frontier as c
+    where c.crawl_id = p_crawl_id
+      and (c.status = 'queued' or (c.status = 'leased' and c.lease_expires_at < now()))
+    order by c.priority desc, c.depth
+    limit p_limit
+    for update skip locked
+  ) as next_urls
+  where f.crawl_id = p_crawl_id and f.url = next_urls.url
+  returning f.url, f.depth;
+end;
+$$;
+
+-- Record that a worker fetched leased pages and queued their links. The pages stay
+-- leased until they are indexed, but can no longer add URLs to the frontier.
+create or replace function mark_frontier_urls_fetched (
+  p_crawl_id text,
+  p_worker text,
+  p_urls text[]
+) returns integer
+language plpgsql
+as $$
+declare
+  updated integer;
+begin
+  update crawl_frontier
+  set fetched = true, updated_at = now()
+  where crawl_id = p_crawl_id and url = any(p_urls) and status = 'leased' and leased_by = p_worker;
+  get diagnostics updated = row_count;
+  return updated;
+end;
+$$;
+
+-- Report leased URLs as done or failed. URLs whose lease was taken over by
+-- another worker are left alone; that worker reports them instead.
+create or replace function complete_frontier_urls (
+  p_crawl_id text,
+  p_worker text,
+  p_urls text[],
+  p_status text default 'done',
+  p_error text default null
+) returns integer
+language plpgsql
+as $$
+declare
+  updated integer;
+begin
+  update crawl_frontier
+  set status = p_status, leased_by = null, lease_expires_at = null, last_error = p_error, updated_at = now()
+  where crawl_id = p_crawl_id and url = any(p_urls) and status = 'leased' and leased_by = p_worker;
+  get diagnostics updated = row_count;
+  return updated;
+end;
+$$;
+
+-- Extend every lease a worker holds; workers call this periodically while they run
+create or replace function renew_frontier_leases (
+  p_crawl_id text,
+  p_worker text,
+  p_lease_seconds integer default 300
+) returns integer
+language plpgsql
+as $$
+declare
+  updated integer;
+begin
+  update crawl_frontier
+  set lease_expires_at = now() + make_interval(secs => p_lease_seconds), updated_at = now()
+  where crawl_id = p_crawl_id and status = 'leased' and leased_by = p_worker;
+  get diagnostics updated = row_count;
+  return updated;
+end;
+$$;
+
+-- Return a worker's unfinished leases to the queue, e.g. when it stops early
+create or replace function release_frontier_leases (
+  p_crawl_id text,
+  p_worker text
+) returns integer
+language plpgsql
+as $$
+declare
+  updated integer;
+begin
+  update crawl_frontier
+  set status = 'queued', leased_by = null, lease_expires_at = null,
+      attempts = greatest(attempts - 1, 0), updated_at = now()
+  where crawl_id = p_crawl_id and status = 'leased' and leased_by = p_worker;
+  get diagnostics updated = row_count;
+  return updated;
+end;
+$$;
+
+-- Count a crawl's URLs by state; expired leases count as queued. crawling_by_others
+-- counts leases of other workers that have not been fetched yet, i.e. pages that
+-- may still add URLs to the frontier.
+create or replace function crawl_frontier_counts (
+  p_crawl_id text,
+  p_worker text default null
+) returns table (
+  queued bigint,
+  leased bigint,
+  crawling_by_others bigint,
+  done bigint,
+  failed bigint,
+  workers bigint
+)
+language sql
+as $$
+  select
+    count(*) filter (where status = 'queued' or (status = 'leased' and lease_expires_at < now())),
+    count(*) filter (where status = 'leased' and lease_expires_at >= now()),
+    count(*) filter (where status = 'leased' and lease_expires_at >= now() and not fetched and leased_by is distinct from p_worker),
+    count(*) filter (where status = 'done'),
+    count(*) filter (where status = 'failed'),
+    count(distinct leased_by) filter (where status = 'leased' and lease_expires_at >= now())
+  from crawl_frontier
+  where crawl_id = p_crawl_id;
+$$;
+
+-- Enable RLS on the distributed crawl tables (only the service role writes or reads them)
+alter table distributed_crawls enable row level security;
+alter table crawl_frontier enable row level security;
@@ -0,0 +1,263 @@
+"""
+AIMD concurrency control for crawls.
+
+A fixed number of concurrent fetches is too timid for a fast CDN and too
+aggressive for a slow origin. An AdaptiveConcurrency limit adjusts itself the way
+TCP congestion control does: after every window of healthy fetches (no timeouts,
+429s or 5xx responses, and a p95 latency close to the best seen so far) it grows
+by one, and as soon as the server shows signs of overload it is halved. Each crawl
+has one limit for all of its fetches, and the HostRateLimiter keeps one per host
+that is shared by every crawl in the process.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
+
+# Fewest fetches per window before the limit is raised, so one fast page cannot raise it
+MIN_WINDOW = 8
+
+
+def adaptive_settings_from_env() -> Dict[str, Any]:
+    """Read the CRAWL_ADAPTIVE_CONCURRENCY and CRAWL_LATENCY_TARGET_SECONDS settings shared by every limit."""
+    return {
+        "adaptive": os.getenv("CRAWL_ADAPTIVE_CONCURRENCY", "true") == "true",
+        "latency_target": float(os.getenv("CRAWL_LATENCY_TARGET_SECONDS", "30"))
+    }
+
+
+def is_overload(result: Any = None, error: Optional[BaseException] = None) -> bool:
+    """
+    Tell whether a fetch failed in a way that means the server is overloaded.
+
+    Args:
+        result: Crawl4AI result or HttpFetchResult, if the fetch returned
+        error: Exception raised by the fetch, if it did not
+
+    Returns:
+        True for timeouts, 429 Too Many Requests and 5xx responses
+    """
+    if error is not None:
+        return isinstance(error, TimeoutError) or "timeout" in str(error).lower()
+    status = getattr(result, "status_code", None)
+    if status is not None and (status == 429 or status >= 500):
+        return True
+    if not getattr(result, "success", True):
+        return "timeout" in (getattr(result, "error_message", None) or "").lower()
+    return False
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class ConcurrencySlot:
+    """One unit of an AdaptiveConcurrency limit, held while a fetch runs."""
+
+    def __init__(self, owner: "AdaptiveConcurrency", epoch: int):
+        self.owner = owner
+        self.epoch = epoch
+
+    @contextmanager
+    def fetching(self) -> Iterator[None]:
+        """Mark the slot as busy with a request, as opposed to held while waiting for work."""
+        self.owner.fetching += 1
+        if self.owner.fetching >= self.owner.limit:
+            self.owner._saturated = True
+        try:
+            yield
+        finally:
+            self.owner.fetching -= 1
+
+    def record(self, latency: float, overloaded: bool = False) -> None:
+        """
+        Report how the fetch made in this slot went.
+
+        Args:
+            latency: Seconds the fetch took
+            overloaded: Whether it timed out or got a 429 or 5xx response (see is_overload)
+        """
+        self.owner.record(self.epoch, latency, overloaded)
+
+
+class AdaptiveConcurrency:
+    """
+    A concurrency limit adjusted by additive increase and multiplicative decrease.
+
+    The limit grows by one after a window of fetches (at least MIN_WINDOW, and at
+    least the current limit) in which as many fetches as the limit ran at once at
+    some point (slots held while waiting for work do not count), nothing was overloaded and
+    the p95 latency stayed within latency_tolerance of the best window's. A p95
+    latency above latency_target, or any overloaded fetch, multiplies it by backoff.
+    Fetches that started before a backoff are ignored, so one burst of errors only
+    lowers the limit once.
+
+    Args:
+        initial: Starting limit
+        maximum: Highest limit (default: initial)
+        minimum: Lowest limit
+        adaptive: Adjust the limit; when False it stays at initial
+        latency_target: p95 latency in seconds above which the limit is lowered
+        latency_tolerance: How far the p95 latency may rise over the best window's while the limit still grows
+        backoff: Factor the limit is multiplied by on overload
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        maximum: Optional[int] = None,
+        minimum: int = 1,
+        adaptive: bool = True,
+        latency_target: float = 30.0,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.5
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum if maximum is not None else initial)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.adaptive = adaptive
+        self.latency_target = latency_target
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.fetching = 0
+        self.increases = 0
+        self.backoffs = 0
+        self.last_p95: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Bumped on every backoff; slots from an older epoch no longer count
+        self._epoch = 0
+        self._latencies: List[float] = []
+        self._saturated = False
+        self._baseline: Optional[float] = None
+
+    @classmethod
+    def for_crawl(cls, max_concurrent: int) -> "AdaptiveConcurrency":
+        """Create the limit of one crawl: it starts at max_concurrent and may grow to CRAWL_MAX_CONCURRENCY."""
+        maximum = max(max_concurrent, int(os.getenv("CRAWL_MAX_CONCURRENCY", "50")))
+        return cls(max_concurrent, maximum=maximum, **adaptive_settings_from_env())
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[ConcurrencySlot]:
+        """
+        Wait until fewer fetches than the limit are in flight.
+
+        Yields:
+            ConcurrencySlot to record the fetch's outcome with
+        """
+        await self._wait_for_slot()
+        try:
+            yield ConcurrencySlot(self, self._epoch)
+        finally:
+            self.in_flight -= 1
+            self._wake()
+
+    async def _wait_for_slot(self) -> None:
+        # Waiters are served in arrival order
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait was cancelled
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def record(self, epoch: int, latency: float, overloaded: bool = False) -> None:
+        """
+        Feed one fetch's outcome to the controller.
+
+        Args:
+            epoch: Epoch of the slot the fetch ran in
+            latency: Seconds the fetch took
+            overloaded: Whether it timed out or got a 429 or 5xx response
+        """
+        if not self.adaptive or epoch != self._epoch:
+            return
+        if overloaded:
+            self._back_off()
+            return
+        self._latencies.append(latency)
+        if len(self._latencies) < max(MIN_WINDOW, self.limit):
+            return
+
+        p95 = percentile(self._latencies, 95)
+        saturated = self._saturated
+        self.last_p95 = p95
+        self._latencies = []
+        self._saturated = self.fetching >= self.limit
+        # The baseline follows the best window, drifting up slowly so a site that
+        # got slower overall does not hold the limit down forever
+        self._baseline = p95 if self._baseline is None else min(p95, self._baseline * 1.05)
+
+        if p95 > self.latency_target:
+            self._back_off()
+        elif saturated and p95 <= self._baseline * self.latency_tolerance and self.limit < self.maximum:
+            self.limit += 1
+            self.increases += 1
+            self._wake()
+
+    def _back_off(self) -> None:
+        self.limit = max(self.minimum, int(self.limit * self.backoff))
+        self.backoffs += 1
+        self._epoch += 1
+        self._latencies = []
+        self._saturated = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summarize the current limit and how it got there."""
+        return {
+            "effective": self.limit,
+            "fetching": self.fetching,
+            "max": self.maximum,
+            "p95_latency_seconds": round(self.last_p95, 2) if self.last_p95 is not None else None,
+            "increases": self.increases,
+            "backoffs": self.backoffs
+        }
+
+
+async def timed_fetch(fetch, slots: List[ConcurrencySlot]) -> Any:
+    """
+    Run a fetch and record its latency and outcome in every given slot.
+
+    Args:
+        fetch: Coroutine function performing the request
+        slots: Slots the fetch holds (e.g. its crawl's and its host's)
+
+    Returns:
+        The fetch's result; a None result (the HTTP fast path handing over to the
+        browser) is not recorded
+    """
+    with ExitStack() as stack:
+        for slot in slots:
+            stack.enter_context(slot.fetching())
+        started = time.monotonic()
+        try:
+            result = await fetch()
+        except Exception as e:
+            for slot in slots:
+                slot.record(time.monotonic() - started, is_overload(error=e))
+            raise
+    if result is not None:
+        for slot in slots:
+            slot.record(time.monotonic() - started, is_overload(result))
+    return result
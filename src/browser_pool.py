@@ -0,0 +1,196 @@
+"""
+Shared browser pool for the Crawl4AI MCP server.
+
+All crawl tool calls render pages through one BrowserPool. It keeps a few
+pre-launched AsyncWebCrawler instances warm, caps the number of pages rendered at
+once across the whole process, hands free page slots to waiting callers in
+round-robin order so one large crawl cannot starve a single-page crawl, and
+replaces each browser after it has rendered a fixed number of pages to keep
+Chromium's memory growth in check.
+"""
+import asyncio
+import contextvars
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Set
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig
+
+# Identifies the tool call or crawl job a page request belongs to, for fair sharing.
+# Tasks inherit it, so every worker of a crawl counts as the same caller.
+crawl_owner: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("crawl_owner", default=None)
+
+
+@dataclass
+class PooledBrowser:
+    """One browser in the pool and its usage counters."""
+    crawler: AsyncWebCrawler
+    in_flight: int = 0
+    pages_served: int = 0
+    retiring: bool = False
+
+
+class BrowserPool:
+    """
+    Pool of warm browsers with a global page ceiling and fair scheduling.
+
+    The pool exposes the same arun() call as AsyncWebCrawler, so it can be passed
+    wherever a crawler is expected. Crawler strategy hooks given to the pool are
+    set on every browser it launches, replacements included.
+    """
+
+    def __init__(
+        self,
+        browser_config: BrowserConfig,
+        size: int = 2,
+        max_pages: int = 10,
+        recycle_after: int = 500,
+        hooks: Optional[Dict[str, Callable]] = None
+    ):
+        self.browser_config = browser_config
+        self.hooks = hooks or {}
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.recycle_after = recycle_after
+        self._browsers: List[PooledBrowser] = []
+        self._launches: Set[asyncio.Task] = set()
+        self._closing: Set[asyncio.Task] = set()
+        self._free = self.max_pages
+        self._waiters: Dict[Any, Deque[asyncio.Future]] = {}
+        self._rotation: Deque[Any] = deque()
+
+    @classmethod
+    def from_env(cls, browser_config: BrowserConfig, hooks: Optional[Dict[str, Callable]] = None) -> "BrowserPool":
+        """Create a pool configured from CRAWL_BROWSER_* environment variables."""
+        return cls(
+            browser_config,
+            size=int(os.getenv("CRAWL_BROWSER_POOL_SIZE", "2")),
+            max_pages=int(os.getenv("CRAWL_BROWSER_MAX_PAGES", "10")),
+            recycle_after=int(os.getenv("CRAWL_BROWSER_RECYCLE_AFTER", "500")),
+            hooks=hooks
+        )
+
+    @property
+    def pages_in_use(self) -> int:
+        """Number of page slots currently held across all browsers."""
+        return self.max_pages - self._free
+
+    async def start(self) -> None:
+        """Launch all browsers up front so the first crawls do not wait for them."""
+        await asyncio.gather(*(self._launch() for _ in range(self.size)))
+
+    async def close(self) -> None:
+        """Close every browser, including ones still launching or being retired."""
+        for task in list(self._launches):
+            task.cancel()
+        await asyncio.gather(*self._launches, *self._closing, return_exceptions=True)
+        browsers, self._browsers = self._browsers, []
+        await asyncio.gather(*(self._close_browser(b) for b in browsers), return_exceptions=True)
+
+    async def _launch(self) -> None:
+        crawler = AsyncWebCrawler(config=self.browser_config)
+        for hook_type, hook in self.hooks.items():
+            crawler.crawler_strategy.set_hook(hook_type, hook)
+        await crawler.__aenter__()
+        self._browsers.append(PooledBrowser(crawler=crawler))
+
+    async def _close_browser(self, browser: PooledBrowser) -> None:
+        try:
+            await browser.crawler.__aexit__(None, None, None)
+        except Exception as e:
+            print(f"Error closing browser: {e}")
+
+    def _spawn(self, tasks: Set[asyncio.Task], coro) -> None:
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    def _retire(self, browser: PooledBrowser) -> None:
+        """Take a browser out of rotation and start its replacement."""
+        browser.retiring = True
+        self._browsers.remove(browser)
+        self._spawn(self._launches, self._launch())
+        if browser.in_flight == 0:
+            self._spawn(self._closing, self._close_browser(browser))
+
+    async def _pick_browser(self) -> PooledBrowser:
+        while True:
+            if self._browsers:
+                return min(self._browsers, key=lambda b: b.in_flight)
+            if not self._launches:
+                # A replacement failed to launch; try again
+                self._spawn(self._launches, self._launch())
+            await asyncio.wait(set(self._launches), return_when=asyncio.FIRST_COMPLETED)
+
+    async def _acquire_slot(self, owner: Any) -> None:
+        if self._free > 0 and not self._rotation:
+            self._free -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        if owner not in self._waiters:
+            self._waiters[owner] = deque()
+            self._rotation.append(owner)
+        self._waiters[owner].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been granted just before the cancellation landed
+            if future.done() and not future.cancelled():
+                self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        self._free += 1
+        # Hand free slots to waiting callers in turn, one slot per caller per round
+        while self._free > 0 and self._rotation:
+            owner = self._rotation.popleft()
+            queue = self._waiters[owner]
+            future = queue.popleft()
+            if queue:
+                self._rotation.append(owner)
+            else:
+                del self._waiters[owner]
+            if future.done():
+                continue
+            self._free -= 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[AsyncWebCrawler]:
+        """
+        Wait for a page slot and borrow the least busy browser.
+
+        Yields:
+            AsyncWebCrawler to render one page with
+        """
+        await self._acquire_slot(crawl_owner.get() or asyncio.current_task())
+        try:
+            browser = await self._pick_browser()
+            browser.in_flight += 1
+            try:
+                yield browser.crawler
+            finally:
+                browser.in_flight -= 1
+                browser.pages_served += 1
+                if not browser.retiring and self.recycle_after > 0 and browser.pages_served >= self.recycle_after:
+                    self._retire(browser)
+                elif browser.retiring and browser.in_flight == 0:
+                    self._spawn(self._closing, self._close_browser(browser))
+        finally:
+            self._release_slot()
+
+    async def arun(self, url: str, config: Optional[Any] = None, **kwargs):
+        """
+        Crawl a URL on a pooled browser.
+
+        Args:
+            url: URL to crawl
+            config: CrawlerRunConfig for the crawl
+
+        Returns:
+            The Crawl4AI crawl result
+        """
+        async with self.lease() as crawler:
+            return await crawler.arun(url=url, config=config, **kwargs)
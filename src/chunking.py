@@ -0,0 +1,288 @@
+"""
+Markdown chunking for the Crawl4AI MCP server.
+
+Chunks are computed as (start, end) offsets into the document rather than as
+copies of it: boundaries are searched with bounded str.rfind calls directly on
+the document, which stop at the last boundary before the chunk's size limit, and
+the text of a chunk is only sliced out once, when it is needed. Heading metadata
+is read with patterns anchored on a literal newline, which the regex engine can
+skip to instead of trying every character of the chunk.
+
+With CONTENT_DEFINED_CHUNKING, boundaries are chosen by the content around them
+instead of by distance from the previous boundary, so an edit near the top of a
+page leaves the chunks below it, and their stored embeddings, unchanged.
+"""
+import hashlib
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from tokenizer import chunk_token_limit, count_tokens, within_tokens
+
+# A chunk only ends at a boundary past this fraction of chunk_size, so it is never tiny
+MIN_BOUNDARY_FRACTION = 0.3
+
+# An ATX heading at the start of a chunk, and one at the start of any later line.
+# Together they find the same headings as r'^(#+)\s+(.+)$' with re.MULTILINE.
+HEADING_AT_START = re.compile(r'(#+)\s+(.+)$', re.MULTILINE)
+HEADING_AFTER_NEWLINE = re.compile(r'\n(#+)\s+(.+)$', re.MULTILINE)
+
+# A blank line, which separates markdown blocks
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+
+Span = Tuple[int, int]
+
+
+def content_defined_chunking() -> bool:
+    """Whether CONTENT_DEFINED_CHUNKING selects content-defined chunk boundaries."""
+    return os.getenv("CONTENT_DEFINED_CHUNKING", "false") == "true"
+
+
+def document_chunk_spans(text: str, chunk_size: int = 5000) -> List[Span]:
+    """
+    Chunk a document the way the indexing pipeline does.
+
+    Uses content_defined_chunk_spans with CONTENT_DEFINED_CHUNKING and chunk_spans
+    otherwise, keeping chunks within CHUNK_MAX_TOKENS tokens either way.
+
+    Args:
+        text: Markdown document
+        chunk_size: Maximum size of each chunk in characters
+
+    Returns:
+        (start, end) offsets of the chunks, in document order
+    """
+    if content_defined_chunking():
+        return content_defined_chunk_spans(text, chunk_size, chunk_token_limit())
+    return chunk_spans(text, chunk_size, chunk_token_limit())
+
+
+def chunk_spans(text: str, chunk_size: int = 5000, max_tokens: Optional[int] = None) -> List[Span]:
+    """
+    Find the chunks of a markdown document as offsets into it.
+
+    Each chunk is at most chunk_size characters. It ends at the last code fence
+    (```) in its window if there is one past 30% of chunk_size, otherwise at the
+    last paragraph break, or when the window has no paragraph break at all, after
+    the last sentence. Leading and trailing whitespace is excluded from every span
+    and empty chunks are dropped.
+
+    With max_tokens, a chunk with more tokens than that (dense code, non-Latin
+    text) is chunked again with a proportionally smaller chunk_size, by the same
+    rules, until every piece fits. Chunks that fit keep their boundaries.
+
+    Args:
+        text: Markdown document
+        chunk_size: Maximum size of each chunk in characters
+        max_tokens: Optional maximum size of each chunk in embedding model tokens
+
+    Returns:
+        (start, end) offsets of the chunks, in document order
+    """
+    spans = _chunk_range(text, 0, len(text), chunk_size)
+    if max_tokens is None:
+        return spans
+    return _fit_tokens(text, spans, max_tokens, text.isascii())
+
+
+def _fit_tokens(text: str, spans: List[Span], max_tokens: int, ascii_text: bool) -> List[Span]:
+    fitted = []
+    for start, end in spans:
+        # Every token covers at least one byte, so short ASCII chunks are never tokenized
+        if ascii_text and end - start <= max_tokens:
+            fitted.append((start, end))
+            continue
+        chunk = text[start:end]
+        if end - start <= 1 or within_tokens(chunk, max_tokens):
+            fitted.append((start, end))
+            continue
+        # Aim a little below the budget, since boundaries cut chunks short
+        smaller = min(end - start - 1, int((end - start) * max_tokens / count_tokens(chunk) * 0.9))
+        fitted += _fit_tokens(text, _chunk_range(text, start, end, max(1, smaller)), max_tokens, ascii_text)
+    return fitted
+
+
+def _chunk_range(text: str, start: int, text_length: int, chunk_size: int) -> List[Span]:
+    spans = []
+    rfind = text.rfind
+    min_boundary = chunk_size * MIN_BOUNDARY_FRACTION
+
+    while start < text_length:
+        end = start + chunk_size
+        if end >= text_length:
+            end = text_length
+        else:
+            fence = rfind('```', start, end)
+            if fence - start > min_boundary:
+                end = fence
+            else:
+                paragraph = rfind('\n\n', start, end)
+                if paragraph != -1:
+                    if paragraph - start > min_boundary:
+                        end = paragraph
+                else:
+                    sentence = rfind('. ', start, end)
+                    if sentence - start > min_boundary:
+                        end = sentence + 1
+
+        chunk_start, chunk_end = _strip_span(text, start, end)
+        if chunk_start < chunk_end:
+            spans.append((chunk_start, chunk_end))
+
+        start = end
+
+    return spans
+
+
+def _strip_span(text: str, start: int, end: int) -> Span:
+    # Spans rarely start or end with more than a line break
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def content_defined_chunk_spans(text: str, chunk_size: int = 5000, max_tokens: Optional[int] = None) -> List[Span]:
+    """
+    Find chunks whose boundaries depend on the content around them, not on their position.
+
+    The document is split into blocks at blank lines outside code blocks. A chunk
+    ends after a block whose hash falls below a threshold proportional to the
+    block's length, so a block of n characters ends it with probability
+    n / (chunk_size / 2). A chunk also ends before a heading. Neither rule cuts a
+    chunk shorter than 30% of chunk_size, and a chunk always ends before a block
+    that would take it past chunk_size. Since each cut depends only on the chunk
+    it ends, an edit changes the chunk it falls in, and the boundaries after it
+    realign with the old ones at the next heading or hash cut; every other chunk
+    keeps its exact text, so its stored embedding can be reused.
+
+    Blocks longer than chunk_size are chunked on their own by the rules of
+    chunk_spans, and max_tokens applies as it does there.
+
+    Args:
+        text: Markdown document
+        chunk_size: Maximum size of each chunk in characters
+        max_tokens: Optional maximum size of each chunk in embedding model tokens
+
+    Returns:
+        (start, end) offsets of the chunks, in document order
+    """
+    min_size = chunk_size * MIN_BOUNDARY_FRACTION
+    cut_scale = 2 ** 64 * 2 / chunk_size
+    spans = []
+    chunk_start = chunk_end = None
+
+    for block_start, block_end in _blocks(text):
+        if chunk_start is not None:
+            size = chunk_end - chunk_start
+            too_long = block_end - chunk_start > chunk_size
+            if too_long or (size >= min_size and HEADING_AT_START.match(text, block_start)):
+                spans.append((chunk_start, chunk_end))
+                chunk_start = None
+
+        if block_end - block_start > chunk_size:
+            spans += _chunk_range(text, block_start, block_end, chunk_size)
+            continue
+        if chunk_start is None:
+            chunk_start = block_start
+        chunk_end = block_end
+
+        block = text[block_start:block_end].encode("utf-8")
+        block_hash = int.from_bytes(hashlib.blake2b(block, digest_size=8).digest(), "big")
+        if chunk_end - chunk_start >= min_size and block_hash < (block_end - block_start) * cut_scale:
+            spans.append((chunk_start, chunk_end))
+            chunk_start = None
+
+    if chunk_start is not None:
+        spans.append((chunk_start, chunk_end))
+    if max_tokens is None:
+        return spans
+    return _fit_tokens(text, spans, max_tokens, text.isascii())
+
+
+def _blocks(text: str) -> List[Span]:
+    """Split markdown at blank lines, keeping each fenced code block in one block."""
+    blocks = []
+    start = scanned = 0
+    in_fence = False
+    for match in PARAGRAPH_BREAK.finditer(text):
+        # An odd number of fences since the last blank line opens or closes a code block
+        if text.count('```', scanned, match.start()) % 2:
+            in_fence = not in_fence
+        scanned = match.end()
+        if in_fence:
+            continue
+        block_start, block_end = _strip_span(text, start, match.start())
+        if block_start < block_end:
+            blocks.append((block_start, block_end))
+        start = match.end()
+    block_start, block_end = _strip_span(text, start, len(text))
+    if block_start < block_end:
+        blocks.append((block_start, block_end))
+    return blocks
+
+
+def smart_chunk_markdown(text: str, chunk_size: int = 5000, max_tokens: Optional[int] = None) -> List[str]:
+    """
+    Split text into chunks, respecting code blocks and paragraphs.
+
+    Args:
+        text: Markdown document
+        chunk_size: Maximum size of each chunk in characters
+        max_tokens: Maximum size of each chunk in tokens (default: CHUNK_MAX_TOKENS)
+
+    Boundaries are content-defined with CONTENT_DEFINED_CHUNKING (see
+    content_defined_chunk_spans).
+
+    Returns:
+        The chunks' text
+    """
+    if max_tokens is None:
+        max_tokens = chunk_token_limit()
+    if content_defined_chunking():
+        spans = content_defined_chunk_spans(text, chunk_size, max_tokens)
+    else:
+        spans = chunk_spans(text, chunk_size, max_tokens)
+    return [text[start:end] for start, end in spans]
+
+
+def chunk_headings(chunk: str) -> List[Tuple[str, str]]:
+    """
+    Find the markdown headings of a chunk.
+
+    Args:
+        chunk: Markdown chunk
+
+    Returns:
+        (hashes, title) pairs, e.g. ("##", "Installation")
+    """
+    headings = []
+    pos = 0
+    first = HEADING_AT_START.match(chunk)
+    if first:
+        headings.append(first.groups())
+        pos = first.end()
+    if '\n#' in chunk:
+        headings += HEADING_AFTER_NEWLINE.findall(chunk, pos)
+    return headings
+
+
+def extract_section_info(chunk: str) -> Dict[str, Any]:
+    """
+    Extracts headers and stats from a chunk.
+
+    Args:
+        chunk: Markdown chunk
+
+    Returns:
+        Dictionary with headers and stats
+    """
+    headers = chunk_headings(chunk)
+    header_str = '; '.join([f'{h[0]} {h[1]}' for h in headers]) if headers else ''
+
+    return {
+        "headers": header_str,
+        "char_count": len(chunk),
+        "word_count": len(chunk.split())
+    }
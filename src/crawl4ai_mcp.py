@@ -35,32 +35,30 @@ def initialize_gpu_compatibility():
             return False
     return False
 
-# Initialize GPU before any ML imports
-gpu_available = initialize_gpu_compatibility()
-
 # Suppress CUDA compatibility warnings
 warnings.filterwarnings("ignore", message=".*CUDA capability.*not compatible.*")
 
 from mcp.server.fastmcp import FastMCP, Context
 from sentence_transformers import CrossEncoder
 from contextlib import asynccontextmanager
-from collections.abc import AsyncIterator
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
-from urllib.parse import urlparse, urldefrag
-from xml.etree import ElementTree
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional, Tuple, Union
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 from supabase import Client
 from pathlib import Path
-import requests
 import asyncio
 import json
 import os
-import re
+import time
 import concurrent.futures
+import itertools
+import uuid
+import psutil
 import sys
 
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode, MemoryAdaptiveDispatcher
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 
 # Add knowledge_graphs folder to path for importing knowledge graph modules
 knowledge_graphs_path = Path(__file__).resolve().parent.parent / 'knowledge_graphs'
@@ -70,14 +68,37 @@ from utils import (
     get_supabase_client, 
     add_documents_to_supabase, 
     search_documents,
-    extract_code_blocks,
     generate_code_example_summary,
     add_code_examples_to_supabase,
     update_source_info,
     extract_source_summary,
-    search_code_examples
+    search_code_examples,
+    upsert_crawl_states,
+    add_page_aliases,
+    create_distributed_crawl,
+    get_distributed_crawl,
+    get_frontier_counts
 )
 
+from host_rate_limiter import HostRateLimiter, interleave_by_host
+from adaptive_concurrency import AdaptiveConcurrency, ConcurrencySlot, timed_fetch
+from fetch_state import FetchStateTracker, PageDeduplicator, page_state
+from sitemap import iter_sitemap_entries
+from http_fetch import HttpFetcher
+from browser_pool import BrowserPool, crawl_owner
+from url_policy import UrlPolicy
+from robots import RobotsCache
+from resource_blocking import ResourceBlocker, BlockingStats, resource_blocking
+from crawl_budget import CrawlBudget
+from page_cache import PageCache
+from llms_txt import CoveredText, LlmsTxtStats, is_llms_txt, llms_full_url, parse_llms_txt
+from result_spool import ResultSpool, SpoolEntry
+from chunking import extract_section_info, smart_chunk_markdown
+from tokenizer import MAX_BATCH_INPUTS, batch_token_limit
+from document_processing import DocumentProcessor, DocumentTask, extract_code_blocks, process_documents
+from distributed_frontier import DistributedFrontier, FRONTIER_FAILED
+from crawl_jobs import CrawlJobStore, CrawlJob, COMPLETED, FETCHED, INDEXED, SKIPPED, URL_FAILED, REDIRECTED
+
 # Import knowledge graph modules
 from knowledge_graph_validator import KnowledgeGraphValidator
 from parse_repo_into_neo4j import DirectNeo4jExtractor
@@ -152,8 +173,16 @@ def validate_github_url(repo_url: str) -> Dict[str, Any]:
 @dataclass
 class Crawl4AIContext:
     """Context for the Crawl4AI MCP server."""
-    crawler: AsyncWebCrawler
+    crawler: BrowserPool
     supabase_client: Client
+    rate_limiter: Optional[HostRateLimiter] = None
+    http_fetcher: Optional[HttpFetcher] = None
+    robots: Optional[RobotsCache] = None
+    resource_blocker: Optional[ResourceBlocker] = None
+    page_cache: Optional[PageCache] = None
+    document_processor: Optional[DocumentProcessor] = None
+    result_spool: Optional[ResultSpool] = None
+    job_store: Optional[CrawlJobStore] = None
     reranking_model: Optional[CrossEncoder] = None
     knowledge_validator: Optional[Any] = None  # KnowledgeGraphValidator when available
     repo_extractor: Optional[Any] = None       # DirectNeo4jExtractor when available
@@ -169,19 +198,50 @@ async def crawl4ai_lifespan(server: FastMCP) -> AsyncIterator[Crawl4AIContext]:
     Yields:
         Crawl4AIContext: The context containing the Crawl4AI crawler and Supabase client
     """
+    # Start the document processing workers in a thread, since the fork server takes a while to import the server
+    document_processor = DocumentProcessor.from_env()
+    await asyncio.to_thread(document_processor.start)
+    
+    # Initialize the GPU only in this process; importing the server (as the fork server does) leaves CUDA untouched
+    gpu_available = initialize_gpu_compatibility()
+    
     # Create browser configuration
     browser_config = BrowserConfig(
         headless=True,
         verbose=False
     )
     
-    # Initialize the crawler
-    crawler = AsyncWebCrawler(config=browser_config)
-    await crawler.__aenter__()
+    # Blocks images, fonts, media, stylesheets and trackers for crawls that enable it
+    resource_blocker = ResourceBlocker.from_env()
+    
+    # Initialize the shared pool of warm browsers used by every crawl tool call
+    crawler = BrowserPool.from_env(browser_config, hooks=resource_blocker.hooks() if resource_blocker else None)
+    await crawler.start()
     
     # Initialize Supabase client
     supabase_client = get_supabase_client()
     
+    # Pooled HTTP client for pages that do not need the browser
+    http_fetcher = HttpFetcher.from_env()
+    
+    # robots.txt rules per host, fetched once and shared by every crawl
+    robots = RobotsCache.from_env(client=http_fetcher.client if http_fetcher else None)
+    
+    # Per-host rate limiter shared by every crawl tool call in this process
+    rate_limiter = HostRateLimiter.from_env(robots)
+    
+    # Local copy of every indexed page, so sites can be re-indexed without re-crawling
+    page_cache = PageCache.from_env()
+    
+    # Crawl results waiting to be indexed spill to disk past a shared memory budget
+    result_spool = ResultSpool.from_env()
+    
+    # Durable crawl job checkpoints, so interrupted crawls can be resumed
+    job_store = CrawlJobStore.from_env()
+    interrupted_jobs = job_store.interrupted_job_ids()
+    if interrupted_jobs:
+        print(f"{len(interrupted_jobs)} interrupted crawl job(s) can be resumed with resume_crawl_job: {', '.join(interrupted_jobs)}")
+    
     # Initialize cross-encoder model for reranking if enabled
     reranking_model = None
     if os.getenv("USE_RERANKING", "false") == "true":
@@ -243,13 +303,36 @@ async def crawl4ai_lifespan(server: FastMCP) -> AsyncIterator[Crawl4AIContext]:
         yield Crawl4AIContext(
             crawler=crawler,
             supabase_client=supabase_client,
+            rate_limiter=rate_limiter,
+            http_fetcher=http_fetcher,
+            robots=robots,
+            resource_blocker=resource_blocker,
+            page_cache=page_cache,
+            document_processor=document_processor,
+            result_spool=result_spool,
+            job_store=job_store,
             reranking_model=reranking_model,
             knowledge_validator=knowledge_validator,
             repo_extractor=repo_extractor
         )
     finally:
+        # Stop background crawls first; they stay resumable
+        running_jobs = [job.task for job in job_store.active_jobs() if job.task]
+        for task in running_jobs:
+            task.cancel()
+        if running_jobs:
+            await asyncio.wait(running_jobs, timeout=10)
+        
         # Clean up all components
-        await crawler.__aexit__(None, None, None)
+        await crawler.close()
+        await robots.close()
+        if http_fetcher:
+            await http_fetcher.close()
+        job_store.close()
+        if page_cache:
+            page_cache.close()
+        document_processor.close()
+        result_spool.close()
         if knowledge_validator:
             try:
                 await knowledge_validator.close()
@@ -334,108 +417,453 @@ def is_txt(url: str) -> bool:
     """
     return url.endswith('.txt')
 
-def parse_sitemap(sitemap_url: str) -> List[str]:
+async def sitemap_urls(first_entry: Dict[str, Optional[str]], entries: AsyncIterator[Dict[str, Optional[str]]], fetch_state: FetchStateTracker, url_policy: UrlPolicy) -> AsyncIterator[str]:
     """
-    Parse a sitemap and extract URLs.
+    Turn streamed sitemap entries into crawl URLs, recording each <lastmod> for re-crawl checks.
     
     Args:
-        sitemap_url: URL of the sitemap
+        first_entry: Entry already read from the stream to check the sitemap is not empty
+        entries: Remaining sitemap entries
+        fetch_state: FetchStateTracker that receives the lastmod values
+        url_policy: UrlPolicy whose canonical URLs the lastmod values are recorded under
+        
+    Yields:
+        Page URLs in sitemap order
+    """
+    try:
+        entry = first_entry
+        while entry is not None:
+            canonical_url = url_policy.try_canonicalize(entry["loc"]) if entry["lastmod"] else None
+            if canonical_url:
+                fetch_state.sitemap_lastmods[canonical_url] = entry["lastmod"]
+            yield entry["loc"]
+            entry = await anext(entries, None)
+    finally:
+        # Stop the sitemap readers when the crawl ends early or is cancelled
+        await entries.aclose()
+
+def process_code_example(args):
+    """
+    Process a single code example to generate its summary.
+    This function is designed to be used with concurrent.futures.
+    
+    Args:
+        args: Tuple containing (code, context_before, context_after)
         
     Returns:
-        List of URLs found in the sitemap
+        The generated summary
     """
-    resp = requests.get(sitemap_url)
-    urls = []
+    code, context_before, context_after = args
+    return generate_code_example_summary(code, context_before, context_after)
 
-    if resp.status_code == 200:
-        try:
-            tree = ElementTree.fromstring(resp.content)
-            urls = [loc.text for loc in tree.findall('.//{*}loc')]
-        except Exception as e:
-            print(f"Error parsing sitemap XML: {e}")
+@dataclass
+class IndexingStats:
+    """Running totals for a crawl-to-index pipeline run."""
+    pages_indexed: int = 0
+    chunks_stored: int = 0
+    embeddings_reused: int = 0
+    code_examples_stored: int = 0
+    duplicate_pages: int = 0
+    results_spilled: int = 0
+    source_summaries: Dict[str, str] = field(default_factory=dict)
+    source_word_counts: Dict[str, int] = field(default_factory=dict)
+    sample_urls: List[str] = field(default_factory=list)
+
+def document_task(doc: Dict[str, Any], chunk_size: int, crawl_type: str, crawl_time: str) -> DocumentTask:
+    """
+    Build the arguments for processing a crawled document in a worker.
+
+    Args:
+        doc: Dictionary with URL and markdown content
+        chunk_size: Maximum size of each content chunk in characters
+        crawl_type: The crawl strategy that produced the document, unless the document names its own
+        crawl_time: Value recorded in the crawl_time metadata field
+
+    Returns:
+        Arguments for document_processing.process_document
+    """
+    # Only pay for code block extraction when code examples will be stored
+    extract_code = os.getenv("USE_AGENTIC_RAG", "false") == "true"
+    return (doc['url'], doc['markdown'], chunk_size, doc.get("crawl_type", crawl_type), crawl_time, extract_code)
 
-    return urls
+def prepare_document(doc: Dict[str, Any], processed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Combine a crawled document with its processing results for storage.
 
-def smart_chunk_markdown(text: str, chunk_size: int = 5000) -> List[str]:
-    """Split text into chunks, respecting code blocks and paragraphs."""
-    chunks = []
-    start = 0
-    text_length = len(text)
+    Args:
+        doc: Dictionary with URL and markdown content
+        processed: Result of document_processing.process_document for the document
 
-    while start < text_length:
-        # Calculate end position
-        end = start + chunk_size
+    Returns:
+        Dictionary with the document, its chunks, chunk metadata, token count and code blocks
+    """
+    parsed_url = urlparse(doc['url'])
+    source_id = parsed_url.netloc or parsed_url.path
+    for meta in processed["metadatas"]:
+        meta["source"] = source_id
+
+    return {
+        "url": doc['url'],
+        "markdown": doc['markdown'],
+        "fetch_state": doc.get("fetch_state"),
+        "source_id": source_id,
+        "chunks": processed["chunks"],
+        "metadatas": processed["metadatas"],
+        "word_count": processed["word_count"],
+        "token_count": processed["token_count"],
+        "code_blocks": processed["code_blocks"]
+    }
 
-        # If we're at the end of the text, just take what's left
-        if end >= text_length:
-            chunks.append(text[start:].strip())
-            break
+def store_prepared_documents(supabase_client: Client, prepared_docs: List[Dict[str, Any]], stats: IndexingStats, batch_size: int = 20) -> None:
+    """
+    Embed and store a group of prepared documents in Supabase.
 
-        # Try to find a code block boundary first (```)
-        chunk = text[start:end]
-        code_block = chunk.rfind('```')
-        if code_block != -1 and code_block > chunk_size * 0.3:
-            end = start + code_block
+    Sources seen for the first time get a summary and a sources row before their
+    chunks are inserted, so the foreign key on crawled_pages is always satisfied.
+    Every document in the group is stored whole, because add_documents_to_supabase
+    deletes existing rows per URL before inserting.
 
-        # If no code block, try to break at a paragraph
-        elif '\n\n' in chunk:
-            # Find the last paragraph break
-            last_break = chunk.rfind('\n\n')
-            if last_break > chunk_size * 0.3:  # Only break if we're past 30% of chunk_size
-                end = start + last_break
+    Args:
+        supabase_client: Supabase client
+        prepared_docs: Documents returned by prepare_document
+        stats: Running totals, updated in place
+        batch_size: Size of each batch for embedding and insertion
+    """
+    # Create the sources row for any new source FIRST (before inserting documents)
+    for doc in prepared_docs:
+        source_id = doc["source_id"]
+        stats.source_word_counts[source_id] = stats.source_word_counts.get(source_id, 0) + doc["word_count"]
+        if source_id not in stats.source_summaries:
+            summary = extract_source_summary(source_id, doc["markdown"][:5000])
+            stats.source_summaries[source_id] = summary
+            update_source_info(supabase_client, source_id, summary, stats.source_word_counts[source_id])
 
-        # If no paragraph break, try to break at a sentence
-        elif '. ' in chunk:
-            # Find the last sentence break
-            last_period = chunk.rfind('. ')
-            if last_period > chunk_size * 0.3:  # Only break if we're past 30% of chunk_size
-                end = start + last_period + 1
+    urls = []
+    chunk_numbers = []
+    contents = []
+    metadatas = []
+    url_to_full_document = {}
+    for doc in prepared_docs:
+        url_to_full_document[doc["url"]] = doc["markdown"]
+        for i, (chunk, meta) in enumerate(zip(doc["chunks"], doc["metadatas"])):
+            urls.append(doc["url"])
+            chunk_numbers.append(i)
+            contents.append(chunk)
+            metadatas.append(meta)
+
+    if contents:
+        stats.embeddings_reused += add_documents_to_supabase(supabase_client, urls, chunk_numbers, contents, metadatas, url_to_full_document, batch_size=batch_size)
+
+    # Extract and process code examples only if enabled
+    code_urls = []
+    code_chunk_numbers = []
+    code_examples = []
+    code_summaries = []
+    code_metadatas = []
+    for doc in prepared_docs:
+        code_blocks = doc["code_blocks"]
+        if not code_blocks:
+            continue
+
+        # Process code examples in parallel
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            summary_args = [(block['code'], block['context_before'], block['context_after'])
+                            for block in code_blocks]
+            summaries = list(executor.map(process_code_example, summary_args))
+
+        for i, (block, summary) in enumerate(zip(code_blocks, summaries)):
+            code_urls.append(doc["url"])
+            code_chunk_numbers.append(i)
+            code_examples.append(block['code'])
+            code_summaries.append(summary)
+            code_metadatas.append({
+                "chunk_index": i,
+                "url": doc["url"],
+                "source": doc["source_id"],
+                "char_count": len(block['code']),
+                "word_count": len(block['code'].split())
+            })
+
+    if code_examples:
+        add_code_examples_to_supabase(
+            supabase_client,
+            code_urls,
+            code_chunk_numbers,
+            code_examples,
+            code_summaries,
+            code_metadatas,
+            batch_size=batch_size
+        )
 
-        # Extract chunk and clean it up
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
+    # Remember what was indexed only once it is stored, so a failed run is re-crawled
+    upsert_crawl_states(supabase_client, [doc["fetch_state"] for doc in prepared_docs if doc.get("fetch_state")])
 
-        # Move start position for next chunk
-        start = end
+    stats.pages_indexed += len(prepared_docs)
+    stats.chunks_stored += len(contents)
+    stats.code_examples_stored += len(code_examples)
+    for doc in prepared_docs:
+        if len(stats.sample_urls) < 6:
+            stats.sample_urls.append(doc["url"])
 
-    return chunks
+async def iter_documents(docs: Iterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """Adapt an already collected list of crawl results to the indexing pipeline."""
+    for doc in docs:
+        yield doc
 
-def extract_section_info(chunk: str) -> Dict[str, Any]:
+async def collect_documents(docs: AsyncIterator[Dict[str, Any]], spool: ResultSpool, stats: IndexingStats) -> List[SpoolEntry]:
     """
-    Extracts headers and stats from a chunk.
-    
+    Collect a whole crawl before indexing it, spilling pages past the spool's memory budget.
+
     Args:
-        chunk: Markdown chunk
-        
+        docs: Async iterator of dictionaries with URL and markdown content
+        spool: ResultSpool that holds the collected pages
+        stats: Running totals; results_spilled is updated in place
+
     Returns:
-        Dictionary with headers and stats
+        Spool entries of the crawled pages, in crawl order
     """
-    headers = re.findall(r'^(#+)\s+(.+)$', chunk, re.MULTILINE)
-    header_str = '; '.join([f'{h[0]} {h[1]}' for h in headers]) if headers else ''
+    entries = []
+    try:
+        async for doc in docs:
+            entries.append(await spool.hold(doc))
+            stats.results_spilled += entries[-1].spilled
+    except BaseException:
+        for entry in entries:
+            spool.discard(entry)
+        raise
+    return entries
+
+async def iter_spooled_documents(spool: ResultSpool, entries: List[SpoolEntry]) -> AsyncIterator[Dict[str, Any]]:
+    """Adapt pages collected with collect_documents to the indexing pipeline, loading each one lazily."""
+    try:
+        for entry in entries:
+            yield await spool.take(entry)
+    finally:
+        # Release pages the pipeline never asked for, e.g. because the crawl was cancelled
+        for entry in entries:
+            spool.discard(entry)
+
+async def index_crawl_stream(
+    supabase_client: Client,
+    docs: AsyncIterator[Dict[str, Any]],
+    crawl_type: str,
+    chunk_size: int = 5000,
+    batch_size: int = 20,
+    queue_size: int = 16,
+    deduplicator: Optional[PageDeduplicator] = None,
+    stats: Optional[IndexingStats] = None,
+    job: Optional[CrawlJob] = None,
+    budget: Optional[CrawlBudget] = None,
+    page_cache: Optional[PageCache] = None,
+    processor: Optional[DocumentProcessor] = None,
+    process_batch_size: int = 8,
+    spool: Optional[ResultSpool] = None,
+    on_indexed: Optional[Callable[[List[str]], Awaitable[None]]] = None
+) -> IndexingStats:
+    """
+    Run crawled documents through chunking, embedding and Supabase insertion as they arrive.
 
-    return {
-        "headers": header_str,
-        "char_count": len(chunk),
-        "word_count": len(chunk.split())
-    }
+    The pipeline has four stages (fetch, chunk, collect, store) connected by bounded
+    queues, so a slow stage applies back-pressure to the crawler instead of letting
+    fetched pages pile up in memory. The chunk stage sends batches of pages to the
+    DocumentProcessor's worker processes (or a worker thread without one), keeping up
+    to one batch per worker in flight; the collect stage hands the results on in crawl
+    order. Storage runs in worker threads so the event loop keeps driving the browser
+    while embeddings are created.
+
+    When a PageDeduplicator is given, pages whose content is identical to a page
+    already stored in this run are stored as aliases of it and never chunked or embedded.
+
+    When a CrawlJob is given, stored pages are checkpointed as indexed together with
+    the running totals, so a resumed job neither re-embeds them nor loses their counts.
+
+    When a CrawlBudget is given, a page whose chunks would exceed its embedding token
+    limit is not stored, and the limit stops the crawl.
+
+    When a PageCache is given, every incoming page is saved to it first, so the
+    crawl can later be re-indexed without fetching it again.
+
+    A batch is sent as soon as it is full or no further page is waiting, so a slow
+    crawl still streams pages through one at a time. Likewise, pages are stored in
+    groups of at least batch_size chunks, growing while more pages are waiting until
+    a group fills one embedding request (EMBEDDING_BATCH_MAX_TOKENS tokens).
+
+    When a ResultSpool is given, pages waiting between stages are held in it, so
+    those past its memory budget wait on disk and are only loaded again when the
+    next stage takes them.
+
+    When on_indexed is given, it is awaited with the URLs of every group of pages
+    (and aliases) once they are stored, e.g. to report them to a distributed frontier.
 
-def process_code_example(args):
-    """
-    Process a single code example to generate its summary.
-    This function is designed to be used with concurrent.futures.
-    
     Args:
-        args: Tuple containing (code, context_before, context_after)
-        
+        supabase_client: Supabase client
+        docs: Async iterator of dictionaries with URL and markdown content
+        crawl_type: The crawl strategy that produced the documents
+        chunk_size: Maximum size of each content chunk in characters
+        batch_size: Minimum number of chunks to group before storing
+        queue_size: Maximum number of pages buffered between two stages
+        deduplicator: Optional PageDeduplicator used to alias duplicate pages
+        stats: Totals of an earlier run of the same job to continue from
+        job: Optional CrawlJob that records which pages have been indexed
+        budget: Optional CrawlBudget whose embedding token limit applies
+        page_cache: Optional PageCache that keeps a copy of every page
+        processor: Optional DocumentProcessor that chunks pages in worker processes
+        process_batch_size: Maximum number of pages sent to a worker at once
+        spool: Optional ResultSpool that holds pages waiting between stages
+        on_indexed: Optional coroutine function called with the URLs of stored pages
+
     Returns:
-        The generated summary
+        IndexingStats with totals for the run
     """
-    code, context_before, context_after = args
-    return generate_code_example_summary(code, context_before, context_after)
+    if stats is None:
+        stats = IndexingStats()
+    crawl_time = str(asyncio.current_task().get_coro().__name__)
+    chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    store_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    # Futures of batches being processed, in crawl order; the bound is the number in flight
+    processed_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, processor.max_workers) if processor is not None else 1)
+
+    async def put_held(queue, item):
+        if spool is None:
+            await queue.put(item)
+            return
+        entry = await spool.hold(item)
+        stats.results_spilled += entry.spilled
+        try:
+            await queue.put(entry)
+        except BaseException:
+            spool.discard(entry)
+            raise
+
+    async def take_held(item):
+        return await spool.take(item) if spool is not None and item is not None else item
+
+    async def fetch_stage():
+        try:
+            async for doc in docs:
+                await put_held(chunk_queue, doc)
+        finally:
+            # Close the crawl right away on cancellation so its browser sessions are released
+            if hasattr(docs, "aclose"):
+                await docs.aclose()
+            await chunk_queue.put(None)
+
+    async def chunk_stage():
+        async def submit(batch):
+            tasks = [document_task(doc, chunk_size, crawl_type, crawl_time) for doc in batch]
+            if processor is not None:
+                future = asyncio.ensure_future(processor.process(tasks))
+            else:
+                future = asyncio.ensure_future(asyncio.to_thread(process_documents, tasks))
+            await processed_queue.put((batch, future))
+
+        batch = []
+        try:
+            while (doc := await take_held(await chunk_queue.get())) is not None:
+                if page_cache is not None:
+                    try:
+                        await asyncio.to_thread(page_cache.put, doc["url"], doc["markdown"], crawl_type)
+                    except Exception as e:
+                        print(f"Error caching {doc['url']}: {e}")
+                batch.append(doc)
+                # Send full batches, or whatever has arrived while the crawler is busy
+                if len(batch) >= process_batch_size or chunk_queue.empty():
+                    await submit(batch)
+                    batch = []
+            if batch:
+                await submit(batch)
+        finally:
+            await processed_queue.put(None)
+
+    async def collect_stage():
+        try:
+            while (item := await processed_queue.get()) is not None:
+                batch, future = item
+                for doc, processed in zip(batch, await future):
+                    if deduplicator is not None:
+                        state = doc.get("fetch_state") or page_state(doc["url"], doc["markdown"], processed["content_hash"])
+                        canonical_url = deduplicator.canonical_for(doc["url"], state["content_hash"])
+                        if canonical_url is not None:
+                            await put_held(store_queue, {"alias": {**state, "canonical_url": canonical_url}})
+                            continue
+                        doc = {**doc, "fetch_state": state}
+                    if budget is not None and not budget.allow_embedding(processed["token_count"]):
+                        continue
+                    await put_held(store_queue, prepare_document(doc, processed))
+                    # Only a page that is actually going to be stored can be aliased to
+                    if deduplicator is not None:
+                        deduplicator.register(doc["url"], doc["fetch_state"]["content_hash"])
+        finally:
+            # Drop batches that will not be collected, e.g. when the crawl is cancelled
+            while not processed_queue.empty():
+                item = processed_queue.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+            await store_queue.put(None)
+
+    async def store_stage():
+        pending = []
+        pending_chunks = 0
+        pending_tokens = 0
+        pending_aliases = []
+        max_group_tokens = batch_token_limit()
+
+        async def flush():
+            nonlocal pending, pending_chunks, pending_tokens, pending_aliases
+            if pending:
+                await asyncio.to_thread(store_prepared_documents, supabase_client, pending, stats, batch_size)
+            # Aliases are written after the pages queued before them, so their canonical page exists
+            if pending_aliases:
+                await asyncio.to_thread(add_page_aliases, supabase_client, pending_aliases)
+                stats.duplicate_pages += len(pending_aliases)
+            stored_urls = [doc["url"] for doc in pending] + [alias["url"] for alias in pending_aliases]
+            if job is not None and stored_urls:
+                job.mark_urls(stored_urls, INDEXED)
+                job.save_stats(asdict(stats))
+            if on_indexed is not None and stored_urls:
+                await on_indexed(stored_urls)
+            pending = []
+            pending_chunks = 0
+            pending_tokens = 0
+            pending_aliases = []
+
+        while (item := await take_held(await store_queue.get())) is not None:
+            if "alias" in item:
+                pending_aliases.append(item["alias"])
+            else:
+                pending.append(item)
+                pending_chunks += len(item["chunks"])
+                pending_tokens += item["token_count"]
+            # Group pages so embedding requests stay full: keep adding pages that are
+            # already waiting until the group fills one request
+            full = pending_tokens >= max_group_tokens or pending_chunks >= MAX_BATCH_INPUTS
+            if full or (pending_chunks >= batch_size and store_queue.empty()) or len(pending_aliases) >= batch_size:
+                await flush()
+        await flush()
+
+    tasks = [asyncio.create_task(stage()) for stage in (fetch_stage, chunk_stage, collect_stage, store_stage)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        if spool is not None:
+            # Release the pages still waiting between stages once every stage has stopped
+            await asyncio.wait(tasks)
+            for queue in (chunk_queue, store_queue):
+                while not queue.empty():
+                    if (entry := queue.get_nowait()) is not None:
+                        spool.discard(entry)
+        raise
+
+    # Record final word counts now that every page of each source has been seen
+    for source_id, summary in stats.source_summaries.items():
+        await asyncio.to_thread(update_source_info, supabase_client, source_id, summary, stats.source_word_counts[source_id])
+
+    return stats
 
 @mcp.tool()
-async def crawl_single_page(ctx: Context, url: str) -> str:
+async def crawl_single_page(ctx: Context, url: str, block_resources: bool = True) -> str:
     """
     Crawl a single web page and store its content in Supabase.
     
@@ -445,6 +873,7 @@ async def crawl_single_page(ctx: Context, url: str) -> str:
     Args:
         ctx: The MCP server provided context
         url: URL of the web page to crawl
+        block_resources: Skip images, fonts, media, stylesheets and trackers when rendering (default: True)
     
     Returns:
         Summary of the crawling operation and storage in Supabase
@@ -453,14 +882,41 @@ async def crawl_single_page(ctx: Context, url: str) -> str:
         # Get the crawler from the context
         crawler = ctx.request_context.lifespan_context.crawler
         supabase_client = ctx.request_context.lifespan_context.supabase_client
+        rate_limiter = ctx.request_context.lifespan_context.rate_limiter
+        http_fetcher = ctx.request_context.lifespan_context.http_fetcher
+        robots = ctx.request_context.lifespan_context.robots
+        resource_blocker = ctx.request_context.lifespan_context.resource_blocker
+        
+        # Only the markdown is kept, so the browser can skip everything that does not affect it
+        block_stats = BlockingStats() if resource_blocker and block_resources else None
+        resource_blocking.set(block_stats)
+        
+        if robots and not await robots.allowed(url):
+            return json.dumps({
+                "success": False,
+                "url": url,
+                "error": "Crawling this URL is disallowed by robots.txt"
+            }, indent=2)
         
         # Configure the crawl
         run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, stream=False)
         
         # Crawl the page
-        result = await crawler.arun(url=url, config=run_config)
+        result = await fetch_page(crawler, url, run_config, rate_limiter, http_fetcher)
+        
+        redirected_to = final_url(result)
+        if robots and redirected_to and redirected_to != url and not await robots.allowed(redirected_to):
+            return json.dumps({
+                "success": False,
+                "url": url,
+                "error": f"Redirected to {redirected_to}, which robots.txt disallows"
+            }, indent=2)
         
         if result.success and result.markdown:
+            page_cache = ctx.request_context.lifespan_context.page_cache
+            if page_cache:
+                await asyncio.to_thread(page_cache.put, url, result.markdown, "single_page")
+            
             # Extract source_id
             parsed_url = urlparse(url)
             source_id = parsed_url.netloc or parsed_url.path
@@ -549,24 +1005,701 @@ async def crawl_single_page(ctx: Context, url: str) -> str:
                     )
             
             return json.dumps({
-                "success": True,
+                "success": True,
+                "url": url,
+                "chunks_stored": len(chunks),
+                "code_examples_stored": len(code_blocks) if code_blocks else 0,
+                "content_length": len(result.markdown),
+                "total_word_count": total_word_count,
+                "source_id": source_id,
+                "links_count": {
+                    "internal": len(result.links.get("internal", [])),
+                    "external": len(result.links.get("external", []))
+                },
+                "resources_blocked": block_stats.summary() if block_stats else None
+            }, indent=2)
+        else:
+            return json.dumps({
+                "success": False,
+                "url": url,
+                "error": result.error_message
+            }, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "url": url,
+            "error": str(e)
+        }, indent=2)
+
+async def run_crawl_job(context: Crawl4AIContext, job: CrawlJob) -> Dict[str, Any]:
+    """
+    Crawl and index the URL of a crawl job, checkpointing its progress as it goes.
+    
+    A resumed job restores its visited set, unfinished frontier and indexing totals,
+    so pages indexed by an earlier run are not fetched or embedded again.
+    
+    Args:
+        context: The server's lifespan context
+        job: Job created by smart_crawl_url or reopened by resume_crawl_job
+        
+    Returns:
+        Dictionary with the crawl summary
+    """
+    url = job.url
+    params = job.params
+    crawler = context.crawler
+    
+    # Every task of this crawl shares the job's turn in the browser pool
+    crawl_owner.set(job.job_id)
+    block_stats = BlockingStats() if context.resource_blocker and params.get("block_resources", True) else None
+    resource_blocking.set(block_stats)
+    supabase_client = context.supabase_client
+    rate_limiter = context.rate_limiter
+    http_fetcher = context.http_fetcher
+    
+    try:
+        # Per-URL fetch state is always recorded; skip_unchanged decides whether it is used
+        url_policy = UrlPolicy(params.get("include_patterns"), params.get("exclude_patterns"), robots=context.robots)
+        fetch_state = FetchStateTracker(supabase_client, skip_unchanged=params["skip_unchanged"], client=http_fetcher.client if http_fetcher else None, canonicalize=url_policy.try_canonicalize)
+        # Limits apply to each run; a resumed job gets a fresh budget of the same size
+        budget = CrawlBudget(
+            max_pages=params.get("max_pages"),
+            max_bytes=params.get("max_bytes"),
+            max_seconds=params.get("max_seconds"),
+            max_embedding_tokens=params.get("max_embedding_tokens")
+        )
+        # Starts at the requested concurrency and adapts to how the site responds
+        concurrency = AdaptiveConcurrency.for_crawl(params["max_concurrent"])
+        job.progress.concurrency = concurrency
+        
+        if context.robots and not await context.robots.allowed(url):
+            job.finish("Crawling this URL is disallowed by robots.txt")
+            return {
+                "success": False,
+                "url": url,
+                "job_id": job.job_id,
+                "error": "Crawling this URL is disallowed by robots.txt"
+            }
+        
+        # Determine the crawl strategy
+        llms_txt_stats = None
+        if is_llms_txt(url):
+            # For llms.txt indexes, crawl the linked documents and what llms-full.txt adds to them
+            llms_txt_stats = LlmsTxtStats()
+            docs = iter_llms_txt_documents(crawler, url, max_concurrent=params["max_concurrent"], rate_limiter=rate_limiter, fetch_state=fetch_state, http_fetcher=http_fetcher, job=job, url_policy=url_policy, budget=budget, concurrency=concurrency, stats=llms_txt_stats)
+            crawl_type = "llms_txt"
+        elif is_txt(url):
+            # For text files, use simple crawl
+            docs = iter_documents(await crawl_markdown_file(crawler, url, rate_limiter=rate_limiter, fetch_state=fetch_state, http_fetcher=http_fetcher))
+            crawl_type = "text_file"
+        elif is_sitemap(url):
+            # For sitemaps, stream URLs to the crawler while the sitemap is still being read
+            sitemap_entries = iter_sitemap_entries(url, client=http_fetcher.client if http_fetcher else None)
+            first_entry = await anext(sitemap_entries, None)
+            if first_entry is None:
+                job.finish("No URLs found in sitemap")
+                return {
+                    "success": False,
+                    "url": url,
+                    "job_id": job.job_id,
+                    "error": "No URLs found in sitemap"
+                }
+            docs = iter_crawl_batch(crawler, sitemap_urls(first_entry, sitemap_entries, fetch_state, url_policy), max_concurrent=params["max_concurrent"], rate_limiter=rate_limiter, fetch_state=fetch_state, http_fetcher=http_fetcher, job=job, url_policy=url_policy, budget=budget, concurrency=concurrency)
+            crawl_type = "sitemap"
+        else:
+            # For regular URLs, use recursive crawl
+            docs = iter_crawl_recursive_internal_links(crawler, [url], max_depth=params["max_depth"], max_concurrent=params["max_concurrent"], rate_limiter=rate_limiter, fetch_state=fetch_state, http_fetcher=http_fetcher, job=job, url_policy=url_policy, budget=budget, concurrency=concurrency)
+            crawl_type = "webpage"
+        
+        stats = IndexingStats(**job.stats) if job.stats else IndexingStats()
+        job.progress.attach_stats(stats)
+        
+        spool = context.result_spool
+        if not params["stream"]:
+            # Collect the whole crawl first, then index it; pages past the memory budget wait on disk
+            if spool is not None:
+                docs = iter_spooled_documents(spool, await collect_documents(docs, spool, stats))
+            else:
+                docs = iter_documents([doc async for doc in docs])
+        
+        # Chunk, embed and store pages as they come out of the crawler
+        deduplicator = PageDeduplicator(supabase_client)
+        stats = await index_crawl_stream(supabase_client, docs, crawl_type, chunk_size=params["chunk_size"], batch_size=20, deduplicator=deduplicator, stats=stats, job=job, budget=budget, page_cache=context.page_cache, processor=context.document_processor, spool=spool)
+        
+        if not stats.pages_indexed and not stats.duplicate_pages and not fetch_state.unchanged_count:
+            job.finish("No content found")
+            return {
+                "success": False,
+                "url": url,
+                "job_id": job.job_id,
+                "error": "No content found"
+            }
+        
+        summary = {
+            "success": True,
+            "url": url,
+            "job_id": job.job_id,
+            "crawl_type": crawl_type,
+            "pages_crawled": stats.pages_indexed,
+            "pages_unchanged": fetch_state.unchanged_count,
+            "duplicate_pages": stats.duplicate_pages,
+            "urls_filtered": url_policy.rejected_count,
+            "urls_disallowed_by_robots": url_policy.disallowed_count,
+            "resources_blocked": block_stats.summary() if block_stats else None,
+            "budget": budget.summary(),
+            "concurrency": concurrency.snapshot(),
+            "llms_txt": asdict(llms_txt_stats) if llms_txt_stats else None,
+            "results_spilled_to_disk": stats.results_spilled,
+            "chunks_stored": stats.chunks_stored,
+            "embeddings_reused": stats.embeddings_reused,
+            "code_examples_stored": stats.code_examples_stored,
+            "sources_updated": len(stats.source_summaries),
+            "urls_crawled": stats.sample_urls[:5] + (["..."] if stats.pages_indexed > 5 else [])
+        }
+        job.finish(result=summary)
+        return summary
+    except Exception as e:
+        job.finish(str(e))
+        raise
+
+def start_crawl_job(context: Crawl4AIContext, job: CrawlJob) -> asyncio.Task:
+    """
+    Run a crawl job as a task tracked by the job store.
+    
+    The task outlives the tool call that started it, so background jobs keep
+    running and any job can be polled or cancelled from other tool calls.
+    
+    Args:
+        context: The server's lifespan context
+        job: Job to run
+        
+    Returns:
+        The asyncio task running the job
+    """
+    job.start()
+    job.task = asyncio.create_task(run_crawl_job(context, job))
+    job.task.add_done_callback(lambda _: job.release())
+    return job.task
+
+async def wait_for_job_result(job: CrawlJob) -> Dict[str, Any]:
+    """
+    Wait for a job started with start_crawl_job and return its summary.
+    
+    If the waiting tool call is cancelled, the job is cancelled with it.
+    
+    Args:
+        job: Running job
+        
+    Returns:
+        Dictionary with the crawl summary
+    """
+    try:
+        await asyncio.wait([job.task])
+    except asyncio.CancelledError:
+        job.task.cancel()
+        raise
+    if job.task.cancelled():
+        return {
+            "success": False,
+            "url": job.url,
+            "job_id": job.job_id,
+            "error": "Crawl job was cancelled"
+        }
+    return job.task.result()
+
+@mcp.tool()
+async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concurrent: int = 10, chunk_size: int = 5000, stream: bool = True, skip_unchanged: bool = False, background: bool = False, include_patterns: Optional[List[str]] = None, exclude_patterns: Optional[List[str]] = None, block_resources: bool = True, max_pages: Optional[int] = None, max_bytes: Optional[int] = None, max_seconds: Optional[float] = None, max_embedding_tokens: Optional[int] = None) -> str:
+    """
+    Intelligently crawl a URL based on its type and store content in Supabase.
+    
+    This tool automatically detects the URL type and applies the appropriate crawling method:
+    - For sitemaps: Extracts and crawls all URLs in parallel
+    - For llms.txt indexes: Crawls every linked document in parallel, plus whatever llms-full.txt adds to them
+    - For other text files: Directly retrieves the content
+    - For regular webpages: Recursively crawls internal links up to the specified depth
+    
+    All crawled content is chunked and stored in Supabase for later retrieval and querying.
+    By default pages are indexed as soon as they are fetched, so embedding and storage
+    overlap with crawling instead of starting after the last page.
+    
+    Set skip_unchanged to refresh a site that was indexed before: pages whose sitemap
+    lastmod, ETag/Last-Modified or content hash show no change are not re-indexed.
+    
+    Every crawl is checkpointed as a job. If it is interrupted (e.g. the server
+    restarts), continue it with resume_crawl_job and the returned job_id.
+    
+    URLs are canonicalized (lowercase host, no default port, fragment or tracking
+    parameters, sorted query) before they are queued, and links to
+    PDFs, images, archives and other non-document files are never crawled. Narrow a
+    crawl with include_patterns / exclude_patterns: globs matched against the whole
+    URL (e.g. "*/docs/*"), or regular expressions prefixed with "re:". They apply to
+    sitemap URLs and the start URL as well.
+    
+    Set background to return a job_id immediately instead of waiting for a large
+    crawl; follow it with get_crawl_job_status or wait_for_crawl_job and stop it
+    with cancel_crawl_job.
+    
+    Only page text is indexed, so by default the browser does not download images,
+    fonts, media, stylesheets or analytics/ad scripts; the summary reports how many
+    requests were blocked and an estimate of the bytes saved.
+    
+    An llms.txt crawl indexes the index itself and the documents it links to (markdown
+    files are downloaded without the browser). If the site also has an llms-full.txt,
+    its sections already contained in those documents are dropped and only the rest
+    is indexed, under the llms-full.txt URL; the summary's llms_txt field reports the
+    counts.
+    
+    Bound a large crawl with max_pages, max_bytes (total markdown), max_seconds and
+    max_embedding_tokens. When a limit is reached the crawl stops fetching, indexes
+    what it already has and reports the limit as budget.stopped_by; resume_crawl_job
+    continues it with a fresh budget of the same size.
+    
+    Args:
+        ctx: The MCP server provided context
+        url: URL to crawl (can be a regular webpage, sitemap.xml, llms.txt or other .txt file)
+        max_depth: Maximum recursion depth for regular URLs (default: 3)
+        max_concurrent: Number of concurrent fetches to start with; it adapts to the site, up to CRAWL_MAX_CONCURRENCY (default: 10)
+        chunk_size: Maximum size of each content chunk in characters (default: 1000)
+        stream: Index each page as soon as it is crawled instead of after the whole crawl (default: True)
+        skip_unchanged: Skip pages that have not changed since they were last indexed (default: False)
+        background: Start the crawl and return its job_id without waiting for it (default: False)
+        include_patterns: Only crawl URLs matching at least one of these patterns (default: all)
+        exclude_patterns: Never crawl URLs matching any of these patterns (default: none)
+        block_resources: Skip images, fonts, media, stylesheets and trackers when rendering (default: True)
+        max_pages: Stop after fetching this many pages (default: unlimited)
+        max_bytes: Stop once this many bytes of markdown have been fetched (default: unlimited)
+        max_seconds: Stop starting new fetches after this many seconds (default: unlimited)
+        max_embedding_tokens: Stop before embedding more than about this many tokens (default: unlimited)
+    
+    Returns:
+        JSON string with crawl summary and storage information, or the job_id of a background crawl
+    """
+    try:
+        context = ctx.request_context.lifespan_context
+        job = context.job_store.create_job(url, {
+            "max_depth": max_depth,
+            "max_concurrent": max_concurrent,
+            "chunk_size": chunk_size,
+            "stream": stream,
+            "skip_unchanged": skip_unchanged,
+            "include_patterns": include_patterns,
+            "exclude_patterns": exclude_patterns,
+            "block_resources": block_resources,
+            "max_pages": max_pages,
+            "max_bytes": max_bytes,
+            "max_seconds": max_seconds,
+            "max_embedding_tokens": max_embedding_tokens
+        })
+        start_crawl_job(context, job)
+        if background:
+            return json.dumps({
+                "success": True,
+                "url": url,
+                "job_id": job.job_id,
+                "status": "running"
+            }, indent=2)
+        return json.dumps(await wait_for_job_result(job), indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "url": url,
+            "error": str(e)
+        }, indent=2)
+
+@mcp.tool()
+async def resume_crawl_job(ctx: Context, job_id: str, background: bool = False) -> str:
+    """
+    Resume a smart_crawl_url job that did not finish, e.g. because the server restarted.
+    
+    The crawl continues from the URLs that were still queued. Pages the job already
+    indexed are not fetched or embedded again, and the summary covers the whole job.
+    
+    Args:
+        ctx: The MCP server provided context
+        job_id: ID returned by smart_crawl_url (see list_crawl_jobs)
+        background: Resume the crawl and return without waiting for it (default: False)
+    
+    Returns:
+        JSON string with crawl summary and storage information
+    """
+    try:
+        job_store = ctx.request_context.lifespan_context.job_store
+        info = job_store.job_info(job_id)
+        if info is None:
+            return json.dumps({
+                "success": False,
+                "job_id": job_id,
+                "error": "Unknown crawl job"
+            }, indent=2)
+        if job_store.is_active(job_id) or info["status"] == COMPLETED:
+            return json.dumps({
+                "success": False,
+                "job_id": job_id,
+                "error": f"Crawl job is {'already running' if job_store.is_active(job_id) else 'already completed'}"
+            }, indent=2)
+        
+        job = job_store.open_job(job_id)
+        start_crawl_job(ctx.request_context.lifespan_context, job)
+        if background:
+            return json.dumps({
+                "success": True,
+                "url": job.url,
+                "job_id": job_id,
+                "status": "running"
+            }, indent=2)
+        return json.dumps(await wait_for_job_result(job), indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "job_id": job_id,
+            "error": str(e)
+        }, indent=2)
+
+@mcp.tool()
+async def list_crawl_jobs(ctx: Context, limit: int = 20) -> str:
+    """
+    List recent crawl jobs with their status and per-URL progress.
+    
+    Jobs reported as "interrupted" or "failed" can be continued with resume_crawl_job.
+    
+    Args:
+        ctx: The MCP server provided context
+        limit: Maximum number of jobs to return (default: 20)
+    
+    Returns:
+        JSON string with the most recently updated crawl jobs
+    """
+    try:
+        job_store = ctx.request_context.lifespan_context.job_store
+        return json.dumps({
+            "success": True,
+            "jobs": job_store.list_jobs(limit)
+        }, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "error": str(e)
+        }, indent=2)
+
+@mcp.tool()
+async def get_crawl_job_status(ctx: Context, job_id: str) -> str:
+    """
+    Get the status of a crawl job.
+    
+    Running jobs report live progress: pages fetched, queued, skipped and failed,
+    pages indexed, chunks embedded, rows written, throughput and the crawl's current
+    adaptive concurrency, along with the limits of the hosts being fetched right now.
+    Finished jobs include their final summary.
+    
+    Args:
+        ctx: The MCP server provided context
+        job_id: ID returned by smart_crawl_url
+    
+    Returns:
+        JSON string with the job status and progress
+    """
+    try:
+        context = ctx.request_context.lifespan_context
+        info = context.job_store.job_info(job_id)
+        if info is None:
+            return json.dumps({
+                "success": False,
+                "job_id": job_id,
+                "error": "Unknown crawl job"
+            }, indent=2)
+        if "progress" in info and context.rate_limiter is not None:
+            info["progress"]["host_concurrency"] = context.rate_limiter.host_concurrency()
+        return json.dumps({"success": True, **info}, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "job_id": job_id,
+            "error": str(e)
+        }, indent=2)
+
+@mcp.tool()
+async def wait_for_crawl_job(ctx: Context, job_id: str, timeout_seconds: int = 60) -> str:
+    """
+    Wait for a background crawl job, streaming progress notifications while it runs.
+    
+    Progress is reported as pages indexed out of pages indexed plus pages still queued.
+    The tool returns when the job ends or the timeout expires, whichever comes first;
+    the job keeps running after a timeout.
+    
+    Args:
+        ctx: The MCP server provided context
+        job_id: ID returned by smart_crawl_url
+        timeout_seconds: Maximum time to wait (default: 60)
+    
+    Returns:
+        JSON string with the job status and progress
+    """
+    try:
+        job_store = ctx.request_context.lifespan_context.job_store
+        job = job_store.active_job(job_id)
+        if job is not None and job.task is not None:
+            deadline = time.monotonic() + timeout_seconds
+            while not job.task.done() and (remaining := deadline - time.monotonic()) > 0:
+                progress = job.progress.snapshot()
+                indexed = progress["pages_indexed"]
+                await ctx.report_progress(indexed, indexed + progress["pages_queued"])
+                await asyncio.wait([job.task], timeout=min(2.0, remaining))
+        
+        info = job_store.job_info(job_id)
+        if info is None:
+            return json.dumps({
+                "success": False,
+                "job_id": job_id,
+                "error": "Unknown crawl job"
+            }, indent=2)
+        return json.dumps({"success": True, **info}, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "job_id": job_id,
+            "error": str(e)
+        }, indent=2)
+
+@mcp.tool()
+async def cancel_crawl_job(ctx: Context, job_id: str) -> str:
+    """
+    Cancel a running crawl job and release its browser sessions.
+    
+    Pages indexed so far are kept, and the job can be continued later with
+    resume_crawl_job.
+    
+    Args:
+        ctx: The MCP server provided context
+        job_id: ID returned by smart_crawl_url
+    
+    Returns:
+        JSON string with the job status after cancellation
+    """
+    try:
+        job_store = ctx.request_context.lifespan_context.job_store
+        job = job_store.active_job(job_id)
+        if job is None or job.task is None:
+            return json.dumps({
+                "success": False,
+                "job_id": job_id,
+                "error": "Crawl job is not running"
+            }, indent=2)
+        
+        job.task.cancel()
+        # Let the crawl unwind so its browser pages are closed before reporting back
+        await asyncio.wait([job.task], timeout=30)
+        if job.task.cancelled():
+            job.mark_cancelled()
+        return json.dumps({"success": True, **job_store.job_info(job_id)}, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "job_id": job_id,
+            "error": str(e)
+        }, indent=2)
+
+async def seed_distributed_crawl(context: Crawl4AIContext, frontier: DistributedFrontier, url: str, crawl_type: str, url_policy: UrlPolicy) -> int:
+    """
+    Queue the start URLs of a distributed crawl: every page of a sitemap, or the URL itself.
+    
+    Args:
+        context: The server's lifespan context
+        frontier: DistributedFrontier of the new crawl
+        url: Start URL
+        crawl_type: "sitemap", "text_file" or "webpage"
+        url_policy: UrlPolicy that canonicalizes and filters the start URLs
+        
+    Returns:
+        Number of URLs queued
+    """
+    async def admitted(urls: List[str]) -> List[Tuple[str, int, float]]:
+        entries = []
+        canonical = {}
+        for written in urls:
+            page_url = url_policy.try_canonicalize(written)
+            if page_url:
+                canonical.setdefault(page_url, written)
+        for page_url, written in canonical.items():
+            if await url_policy.admits(page_url, written):
+                entries.append((page_url, 0, url_policy.scorer(page_url, 0, "", 0)))
+        return entries
+    
+    if crawl_type != "sitemap":
+        return await frontier.enqueue(await admitted([url]))
+    
+    queued = 0
+    batch = []
+    http_fetcher = context.http_fetcher
+    async for entry in iter_sitemap_entries(url, client=http_fetcher.client if http_fetcher else None):
+        batch.append(entry["loc"])
+        if len(batch) >= 500:
+            queued += await frontier.enqueue(await admitted(batch))
+            batch = []
+    if batch:
+        queued += await frontier.enqueue(await admitted(batch))
+    return queued
+
+async def run_distributed_worker(context: Crawl4AIContext, crawl_id: str, max_concurrent: int = 10, max_pages: Optional[int] = None, max_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Work on a distributed crawl until its shared frontier is drained or a limit is reached.
+    
+    The worker crawls and indexes the URLs it leases with the same fetch path and
+    indexing pipeline as smart_crawl_url, and reports each URL to the frontier once
+    its page is stored. Leases are renewed while it runs; whatever it leased but did
+    not index (because it was cancelled or hit a limit) is returned to the queue.
+    
+    Args:
+        context: The server's lifespan context
+        crawl_id: ID returned by start_distributed_crawl
+        max_concurrent: Number of concurrent fetches this worker starts with; it adapts to the site
+        max_pages: Stop after this worker fetched this many pages (default: unlimited)
+        max_seconds: Stop leasing new URLs after this many seconds (default: unlimited)
+        
+    Returns:
+        Dictionary with this worker's summary and the crawl's frontier counts
+    """
+    supabase_client = context.supabase_client
+    crawl = await asyncio.to_thread(get_distributed_crawl, supabase_client, crawl_id)
+    if crawl is None:
+        return {
+            "success": False,
+            "crawl_id": crawl_id,
+            "error": "Unknown distributed crawl"
+        }
+    params = crawl["params"]
+    
+    # Every task of this worker shares one turn in the browser pool
+    crawl_owner.set(f"distributed-{crawl_id}")
+    block_stats = BlockingStats() if context.resource_blocker and params.get("block_resources", True) else None
+    resource_blocking.set(block_stats)
+    
+    frontier = DistributedFrontier.from_env(supabase_client, crawl_id)
+    url_policy = UrlPolicy(params.get("include_patterns"), params.get("exclude_patterns"), robots=context.robots)
+    fetch_state = FetchStateTracker(supabase_client, skip_unchanged=params.get("skip_unchanged", False), client=context.http_fetcher.client if context.http_fetcher else None, canonicalize=url_policy.try_canonicalize)
+    budget = CrawlBudget(max_pages=max_pages, max_seconds=max_seconds)
+    concurrency = AdaptiveConcurrency.for_crawl(max_concurrent)
+    docs = iter_crawl_distributed(
+        context.crawler,
+        frontier,
+        max_depth=params["max_depth"],
+        max_concurrent=max_concurrent,
+        rate_limiter=context.rate_limiter,
+        fetch_state=fetch_state,
+        http_fetcher=context.http_fetcher,
+        url_policy=url_policy,
+        budget=budget,
+        concurrency=concurrency
+    )
+    
+    heartbeat = asyncio.create_task(frontier.keep_leases())
+    try:
+        stats = await index_crawl_stream(
+            supabase_client,
+            docs,
+            crawl["crawl_type"],
+            chunk_size=params["chunk_size"],
+            batch_size=20,
+            deduplicator=PageDeduplicator(supabase_client),
+            budget=budget,
+            page_cache=context.page_cache,
+            processor=context.document_processor,
+            spool=context.result_spool,
+            on_indexed=frontier.complete
+        )
+    finally:
+        heartbeat.cancel()
+        # Hand back anything leased but not indexed, so other workers pick it up now
+        await frontier.release()
+    
+    return {
+        "success": True,
+        "crawl_id": crawl_id,
+        "worker_id": frontier.worker_id,
+        "pages_crawled": stats.pages_indexed,
+        "pages_unchanged": fetch_state.unchanged_count,
+        "duplicate_pages": stats.duplicate_pages,
+        "urls_filtered": url_policy.rejected_count,
+        "urls_disallowed_by_robots": url_policy.disallowed_count,
+        "resources_blocked": block_stats.summary() if block_stats else None,
+        "budget": budget.summary(),
+        "concurrency": concurrency.snapshot(),
+        "chunks_stored": stats.chunks_stored,
+        "embeddings_reused": stats.embeddings_reused,
+        "code_examples_stored": stats.code_examples_stored,
+        "frontier": await frontier.counts()
+    }
+
+@mcp.tool()
+async def start_distributed_crawl(ctx: Context, url: str, max_depth: int = 3, chunk_size: int = 5000, skip_unchanged: bool = False, include_patterns: Optional[List[str]] = None, exclude_patterns: Optional[List[str]] = None, block_resources: bool = True, join: bool = True, max_concurrent: int = 10) -> str:
+    """
+    Start a crawl that several servers or worker processes can work on together.
+    
+    The crawl's frontier and visited set live in Postgres, so every worker that joins
+    it (with join_distributed_crawl, or `python src/crawl_worker.py <crawl_id>` on
+    any machine that can reach Supabase) leases its own batches of URLs, crawls and
+    indexes them and shares the links it finds. A worker that crashes loses nothing:
+    its leases expire and other workers crawl those URLs again.
+    
+    The URL is handled like in smart_crawl_url: a sitemap queues all of its pages, a
+    .txt file is fetched as is, and a regular page is crawled recursively up to
+    max_depth. With join (the default) this server works on the crawl until the
+    frontier is drained; otherwise the crawl_id is returned right away.
+    
+    Args:
+        ctx: The MCP server provided context
+        url: URL to crawl (can be a regular webpage, sitemap.xml, llms.txt or other .txt file)
+        max_depth: Maximum recursion depth for regular URLs (default: 3)
+        chunk_size: Maximum size of each content chunk in characters (default: 5000)
+        skip_unchanged: Skip pages that have not changed since they were last indexed (default: False)
+        include_patterns: Only crawl URLs matching at least one of these patterns (default: all)
+        exclude_patterns: Never crawl URLs matching any of these patterns (default: none)
+        block_resources: Skip images, fonts, media, stylesheets and trackers when rendering (default: True)
+        join: Work on the crawl from this server until it is done (default: True)
+        max_concurrent: Number of concurrent fetches this server starts with; it adapts to the site (default: 10)
+    
+    Returns:
+        JSON string with the crawl_id and, when joining, this worker's crawl summary
+    """
+    try:
+        context = ctx.request_context.lifespan_context
+        if is_txt(url):
+            crawl_type = "text_file"
+        elif is_sitemap(url):
+            crawl_type = "sitemap"
+        else:
+            crawl_type = "webpage"
+        params = {
+            # Sitemap pages and text files are crawled without following links
+            "max_depth": max_depth if crawl_type == "webpage" else 1,
+            "chunk_size": chunk_size,
+            "skip_unchanged": skip_unchanged,
+            "include_patterns": include_patterns,
+            "exclude_patterns": exclude_patterns,
+            "block_resources": block_resources
+        }
+        
+        crawl_id = uuid.uuid4().hex[:12]
+        await asyncio.to_thread(create_distributed_crawl, context.supabase_client, crawl_id, url, crawl_type, params)
+        frontier = DistributedFrontier(context.supabase_client, crawl_id)
+        url_policy = UrlPolicy(include_patterns, exclude_patterns, robots=context.robots)
+        queued = await seed_distributed_crawl(context, frontier, url, crawl_type, url_policy)
+        if not queued:
+            return json.dumps({
+                "success": False,
                 "url": url,
-                "chunks_stored": len(chunks),
-                "code_examples_stored": len(code_blocks) if code_blocks else 0,
-                "content_length": len(result.markdown),
-                "total_word_count": total_word_count,
-                "source_id": source_id,
-                "links_count": {
-                    "internal": len(result.links.get("internal", [])),
-                    "external": len(result.links.get("external", []))
-                }
+                "crawl_id": crawl_id,
+                "error": "No URLs to crawl (filtered, disallowed by robots.txt or empty sitemap)"
             }, indent=2)
-        else:
+        
+        if not join:
             return json.dumps({
-                "success": False,
+                "success": True,
                 "url": url,
-                "error": result.error_message
+                "crawl_id": crawl_id,
+                "crawl_type": crawl_type,
+                "urls_queued": queued
             }, indent=2)
+        return json.dumps({"url": url, **await run_distributed_worker(context, crawl_id, max_concurrent=max_concurrent)}, indent=2)
     except Exception as e:
         return json.dumps({
             "success": False,
@@ -575,198 +1708,153 @@ async def crawl_single_page(ctx: Context, url: str) -> str:
         }, indent=2)
 
 @mcp.tool()
-async def smart_crawl_url(ctx: Context, url: str, max_depth: int = 3, max_concurrent: int = 10, chunk_size: int = 5000) -> str:
+async def join_distributed_crawl(ctx: Context, crawl_id: str, max_concurrent: int = 10, max_pages: Optional[int] = None, max_seconds: Optional[float] = None) -> str:
     """
-    Intelligently crawl a URL based on its type and store content in Supabase.
+    Work on a distributed crawl from this server until its frontier is drained.
     
-    This tool automatically detects the URL type and applies the appropriate crawling method:
-    - For sitemaps: Extracts and crawls all URLs in parallel
-    - For text files (llms.txt): Directly retrieves the content
-    - For regular webpages: Recursively crawls internal links up to the specified depth
+    Any number of servers and standalone workers can join the same crawl; each
+    leases its own URLs, so no page is crawled twice. Set max_pages or max_seconds
+    to contribute only part of the work; unfinished leases are handed back.
     
-    All crawled content is chunked and stored in Supabase for later retrieval and querying.
+    Args:
+        ctx: The MCP server provided context
+        crawl_id: ID returned by start_distributed_crawl
+        max_concurrent: Number of concurrent fetches this server starts with; it adapts to the site (default: 10)
+        max_pages: Stop after this server fetched this many pages (default: unlimited)
+        max_seconds: Stop leasing new URLs after this many seconds (default: unlimited)
+    
+    Returns:
+        JSON string with this worker's crawl summary and the crawl's frontier counts
+    """
+    try:
+        context = ctx.request_context.lifespan_context
+        return json.dumps(await run_distributed_worker(context, crawl_id, max_concurrent=max_concurrent, max_pages=max_pages, max_seconds=max_seconds), indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "crawl_id": crawl_id,
+            "error": str(e)
+        }, indent=2)
+
+@mcp.tool()
+async def get_distributed_crawl_status(ctx: Context, crawl_id: str) -> str:
+    """
+    Get the progress of a distributed crawl across all of its workers.
     
     Args:
         ctx: The MCP server provided context
-        url: URL to crawl (can be a regular webpage, sitemap.xml, or .txt file)
-        max_depth: Maximum recursion depth for regular URLs (default: 3)
-        max_concurrent: Maximum number of concurrent browser sessions (default: 10)
-        chunk_size: Maximum size of each content chunk in characters (default: 1000)
+        crawl_id: ID returned by start_distributed_crawl
     
     Returns:
-        JSON string with crawl summary and storage information
+        JSON string with the crawl's start URL and parameters, its URLs by state
+        (queued, leased, done, failed) and the number of workers holding leases
     """
     try:
-        # Get the crawler from the context
-        crawler = ctx.request_context.lifespan_context.crawler
         supabase_client = ctx.request_context.lifespan_context.supabase_client
+        crawl = await asyncio.to_thread(get_distributed_crawl, supabase_client, crawl_id)
+        if crawl is None:
+            return json.dumps({
+                "success": False,
+                "crawl_id": crawl_id,
+                "error": "Unknown distributed crawl"
+            }, indent=2)
+        counts = await asyncio.to_thread(get_frontier_counts, supabase_client, crawl_id)
+        return json.dumps({
+            "success": True,
+            **crawl,
+            "frontier": counts,
+            "finished": counts is not None and counts["queued"] == 0 and counts["leased"] == 0
+        }, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "crawl_id": crawl_id,
+            "error": str(e)
+        }, indent=2)
+
+async def iter_cached_documents(page_cache: PageCache, pages: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Read cached pages for the indexing pipeline.
+    
+    Args:
+        page_cache: PageCache holding the pages
+        pages: Entries returned by PageCache.latest_pages
         
-        # Determine the crawl strategy
-        crawl_results = []
-        crawl_type = None
-        
-        if is_txt(url):
-            # For text files, use simple crawl
-            crawl_results = await crawl_markdown_file(crawler, url)
-            crawl_type = "text_file"
-        elif is_sitemap(url):
-            # For sitemaps, extract URLs and crawl in parallel
-            sitemap_urls = parse_sitemap(url)
-            if not sitemap_urls:
-                return json.dumps({
-                    "success": False,
-                    "url": url,
-                    "error": "No URLs found in sitemap"
-                }, indent=2)
-            crawl_results = await crawl_batch(crawler, sitemap_urls, max_concurrent=max_concurrent)
-            crawl_type = "sitemap"
-        else:
-            # For regular URLs, use recursive crawl
-            crawl_results = await crawl_recursive_internal_links(crawler, [url], max_depth=max_depth, max_concurrent=max_concurrent)
-            crawl_type = "webpage"
-        
-        if not crawl_results:
+    Yields:
+        Dictionaries with URL, markdown content and the original crawl type
+    """
+    for page in pages:
+        try:
+            markdown = await asyncio.to_thread(page_cache.read, page["content_hash"])
+        except Exception as e:
+            print(f"Error reading cached page {page['url']}: {e}")
+            continue
+        yield {"url": page["url"], "markdown": markdown, "crawl_type": page["crawl_type"]}
+
+@mcp.tool()
+async def reindex_from_cache(ctx: Context, source: Optional[str] = None, url_prefix: Optional[str] = None, chunk_size: int = 5000) -> str:
+    """
+    Re-chunk, re-embed and re-store cached pages without fetching anything.
+    
+    Every page indexed by crawl_single_page or smart_crawl_url is kept in a local
+    cache. Use this tool after changing chunk_size, the embedding model or the
+    contextual embedding settings: the latest cached copy of each page replaces its
+    stored chunks, at the speed of chunking and the embedding API alone.
+    
+    Args:
+        ctx: The MCP server provided context
+        source: Only re-index pages of this source (domain) (default: all cached pages)
+        url_prefix: Only re-index URLs starting with this prefix (default: all)
+        chunk_size: Maximum size of each content chunk in characters (default: 5000)
+    
+    Returns:
+        JSON string with the re-indexing summary
+    """
+    try:
+        context = ctx.request_context.lifespan_context
+        if context.page_cache is None:
             return json.dumps({
                 "success": False,
-                "url": url,
-                "error": "No content found"
+                "error": "The crawl cache is disabled (CRAWL_CACHE=false)"
             }, indent=2)
         
-        # Process results and store in Supabase
-        urls = []
-        chunk_numbers = []
-        contents = []
-        metadatas = []
-        chunk_count = 0
-        
-        # Track sources and their content
-        source_content_map = {}
-        source_word_counts = {}
-        
-        # Process documentation chunks
-        for doc in crawl_results:
-            source_url = doc['url']
-            md = doc['markdown']
-            chunks = smart_chunk_markdown(md, chunk_size=chunk_size)
-            
-            # Extract source_id
-            parsed_url = urlparse(source_url)
-            source_id = parsed_url.netloc or parsed_url.path
-            
-            # Store content for source summary generation
-            if source_id not in source_content_map:
-                source_content_map[source_id] = md[:5000]  # Store first 5000 chars
-                source_word_counts[source_id] = 0
-            
-            for i, chunk in enumerate(chunks):
-                urls.append(source_url)
-                chunk_numbers.append(i)
-                contents.append(chunk)
-                
-                # Extract metadata
-                meta = extract_section_info(chunk)
-                meta["chunk_index"] = i
-                meta["url"] = source_url
-                meta["source"] = source_id
-                meta["crawl_type"] = crawl_type
-                meta["crawl_time"] = str(asyncio.current_task().get_coro().__name__)
-                metadatas.append(meta)
-                
-                # Accumulate word count
-                source_word_counts[source_id] += meta.get("word_count", 0)
-                
-                chunk_count += 1
-        
-        # Create url_to_full_document mapping
-        url_to_full_document = {}
-        for doc in crawl_results:
-            url_to_full_document[doc['url']] = doc['markdown']
-        
-        # Update source information for each unique source FIRST (before inserting documents)
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            source_summary_args = [(source_id, content) for source_id, content in source_content_map.items()]
-            source_summaries = list(executor.map(lambda args: extract_source_summary(args[0], args[1]), source_summary_args))
-        
-        for (source_id, _), summary in zip(source_summary_args, source_summaries):
-            word_count = source_word_counts.get(source_id, 0)
-            update_source_info(supabase_client, source_id, summary, word_count)
-        
-        # Add documentation chunks to Supabase (AFTER sources exist)
-        batch_size = 20
-        add_documents_to_supabase(supabase_client, urls, chunk_numbers, contents, metadatas, url_to_full_document, batch_size=batch_size)
-        
-        # Extract and process code examples from all documents only if enabled
-        extract_code_examples_enabled = os.getenv("USE_AGENTIC_RAG", "false") == "true"
-        if extract_code_examples_enabled:
-            all_code_blocks = []
-            code_urls = []
-            code_chunk_numbers = []
-            code_examples = []
-            code_summaries = []
-            code_metadatas = []
-            
-            # Extract code blocks from all documents
-            for doc in crawl_results:
-                source_url = doc['url']
-                md = doc['markdown']
-                code_blocks = extract_code_blocks(md)
-                
-                if code_blocks:
-                    # Process code examples in parallel
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                        # Prepare arguments for parallel processing
-                        summary_args = [(block['code'], block['context_before'], block['context_after']) 
-                                        for block in code_blocks]
-                        
-                        # Generate summaries in parallel
-                        summaries = list(executor.map(process_code_example, summary_args))
-                    
-                    # Prepare code example data
-                    parsed_url = urlparse(source_url)
-                    source_id = parsed_url.netloc or parsed_url.path
-                    
-                    for i, (block, summary) in enumerate(zip(code_blocks, summaries)):
-                        code_urls.append(source_url)
-                        code_chunk_numbers.append(len(code_examples))  # Use global code example index
-                        code_examples.append(block['code'])
-                        code_summaries.append(summary)
-                        
-                        # Create metadata for code example
-                        code_meta = {
-                            "chunk_index": len(code_examples) - 1,
-                            "url": source_url,
-                            "source": source_id,
-                            "char_count": len(block['code']),
-                            "word_count": len(block['code'].split())
-                        }
-                        code_metadatas.append(code_meta)
-            
-            # Add all code examples to Supabase
-            if code_examples:
-                add_code_examples_to_supabase(
-                    supabase_client, 
-                    code_urls, 
-                    code_chunk_numbers, 
-                    code_examples, 
-                    code_summaries, 
-                    code_metadatas,
-                    batch_size=batch_size
-                )
+        pages = await asyncio.to_thread(context.page_cache.latest_pages, source, url_prefix)
+        if not pages:
+            return json.dumps({
+                "success": False,
+                "source": source,
+                "url_prefix": url_prefix,
+                "error": "No cached pages found"
+            }, indent=2)
         
+        started = time.monotonic()
+        stats = await index_crawl_stream(
+            context.supabase_client,
+            iter_cached_documents(context.page_cache, pages),
+            "cache",
+            chunk_size=chunk_size,
+            batch_size=20,
+            deduplicator=PageDeduplicator(context.supabase_client),
+            processor=context.document_processor,
+            spool=context.result_spool
+        )
         return json.dumps({
             "success": True,
-            "url": url,
-            "crawl_type": crawl_type,
-            "pages_crawled": len(crawl_results),
-            "chunks_stored": chunk_count,
-            "code_examples_stored": len(code_examples),
-            "sources_updated": len(source_content_map),
-            "urls_crawled": [doc['url'] for doc in crawl_results][:5] + (["..."] if len(crawl_results) > 5 else [])
+            "source": source,
+            "url_prefix": url_prefix,
+            "pages_cached": len(pages),
+            "pages_indexed": stats.pages_indexed,
+            "duplicate_pages": stats.duplicate_pages,
+            "chunks_stored": stats.chunks_stored,
+            "embeddings_reused": stats.embeddings_reused,
+            "code_examples_stored": stats.code_examples_stored,
+            "sources_updated": len(stats.source_summaries),
+            "elapsed_seconds": round(time.monotonic() - started, 1)
         }, indent=2)
     except Exception as e:
         return json.dumps({
             "success": False,
-            "url": url,
+            "source": source,
             "error": str(e)
         }, indent=2)
 
@@ -1797,49 +2885,511 @@ async def parse_github_repository(ctx: Context, repo_url: str) -> str:
             "error": f"Repository parsing failed: {str(e)}"
         }, indent=2)
 
-async def crawl_markdown_file(crawler: AsyncWebCrawler, url: str) -> List[Dict[str, Any]]:
+async def fetch_page(crawler: AsyncWebCrawler, url: str, config: CrawlerRunConfig, rate_limiter: Optional[HostRateLimiter] = None, http_fetcher: Optional[HttpFetcher] = None, slot: Optional[ConcurrencySlot] = None, final_client_errors: bool = False):
+    """
+    Crawl a single URL, waiting for the per-host rate limiter first when one is given.
+    
+    With an HttpFetcher, the URL is first fetched over plain HTTP; the browser is only
+    used for pages that need it (non-text content, errors or client-side rendering).
+    The latency and outcome of each request are fed back to the host's concurrency
+    limit and to the crawl's (through its slot), so both grow while the host responds
+    well and back off on timeouts, 429s and 5xx responses.
+    
+    Args:
+        crawler: AsyncWebCrawler instance
+        url: URL to crawl
+        config: Run configuration for the browser crawl
+        rate_limiter: Optional process-wide HostRateLimiter
+        http_fetcher: Optional HttpFetcher for the browserless fast path
+        slot: Optional slot of the crawl's AdaptiveConcurrency limit the fetch runs in
+        final_client_errors: Return a 4xx from the HTTP fast path as is instead of retrying in the browser
+        
+    Returns:
+        The Crawl4AI crawl result, or an HttpFetchResult with the same fields
+    """
+    async def limited(fetch):
+        slots = [slot] if slot is not None else []
+        if rate_limiter is None:
+            return await timed_fetch(fetch, slots)
+        async with rate_limiter.acquire(url) as host_slot:
+            return await timed_fetch(fetch, slots + [host_slot])
+
+    if http_fetcher is not None and http_fetcher.wants(url):
+        result = await limited(lambda: http_fetcher.fetch(url, final_client_errors=final_client_errors))
+        if result is not None:
+            return result
+    return await limited(lambda: crawler.arun(url=url, config=config))
+
+def final_url(result: Any) -> str:
+    """
+    Return the URL a crawl result ended up at after redirects.
+    
+    Crawl4AI keeps the requested URL in result.url and puts the final one in
+    result.redirected_url; HttpFetchResult.url is already the final URL.
+    """
+    return getattr(result, "redirected_url", None) or result.url
+
+async def crawl_markdown_file(crawler: AsyncWebCrawler, url: str, rate_limiter: Optional[HostRateLimiter] = None, fetch_state: Optional[FetchStateTracker] = None, http_fetcher: Optional[HttpFetcher] = None) -> List[Dict[str, Any]]:
     """
     Crawl a .txt or markdown file.
     
     Args:
         crawler: AsyncWebCrawler instance
         url: URL of the file
+        rate_limiter: Optional process-wide HostRateLimiter
+        fetch_state: Optional FetchStateTracker used to skip an unchanged file
+        http_fetcher: Optional HttpFetcher that downloads the file without the browser
         
     Returns:
         List of dictionaries with URL and markdown content
     """
     crawl_config = CrawlerRunConfig()
 
-    result = await crawler.arun(url=url, config=crawl_config)
+    if fetch_state is not None and await fetch_state.unchanged_before_fetch(url, rate_limiter):
+        await fetch_state.mark_unchanged(url)
+        return []
+
+    result = await fetch_page(crawler, url, crawl_config, rate_limiter, http_fetcher)
     if result.success and result.markdown:
-        return [{'url': url, 'markdown': result.markdown}]
+        doc = {'url': url, 'markdown': result.markdown}
+        if fetch_state is not None:
+            doc['fetch_state'] = fetch_state.build_state(url, result, result.markdown)
+            if await fetch_state.unchanged_after_fetch(doc['fetch_state']):
+                await fetch_state.mark_unchanged(url, doc['fetch_state'])
+                return []
+        return [doc]
     else:
         print(f"Failed to crawl {url}: {result.error_message}")
         return []
 
-async def crawl_batch(crawler: AsyncWebCrawler, urls: List[str], max_concurrent: int = 10) -> List[Dict[str, Any]]:
+async def iter_llms_txt_documents(crawler: AsyncWebCrawler, url: str, max_concurrent: int = 10, rate_limiter: Optional[HostRateLimiter] = None, fetch_state: Optional[FetchStateTracker] = None, http_fetcher: Optional[HttpFetcher] = None, job: Optional[CrawlJob] = None, url_policy: Optional[UrlPolicy] = None, budget: Optional[CrawlBudget] = None, concurrency: Optional[AdaptiveConcurrency] = None, stats: Optional[LlmsTxtStats] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Crawl an llms.txt index together with every document it links to.
+    
+    The index is always fetched, even when skip_unchanged would skip it, since its
+    links are needed. The linked documents are crawled in parallel like a sitemap
+    (markdown files over the HTTP fast path), while the llms-full.txt next to the
+    index is downloaded alongside them. Once the linked documents are done, the
+    sections of llms-full.txt they already contain are dropped and the rest is
+    yielded as one more document, so text present in both is only indexed once.
+    
+    Args:
+        crawler: AsyncWebCrawler instance
+        url: URL of the llms.txt file
+        max_concurrent: Number of concurrent fetches to start with; the adaptive limit may raise or lower it
+        rate_limiter: Optional process-wide HostRateLimiter
+        fetch_state: Optional FetchStateTracker used to skip unchanged documents
+        http_fetcher: Optional HttpFetcher for documents that do not need the browser
+        job: Optional CrawlJob that checkpoints the linked documents
+        url_policy: Optional UrlPolicy that canonicalizes and filters the links
+        budget: Optional CrawlBudget that stops the crawl when a limit is reached
+        concurrency: Optional AdaptiveConcurrency limit of the crawl
+        stats: Optional LlmsTxtStats that receives the link and deduplication counts
+        
+    Yields:
+        Dictionaries with URL and markdown content
+    """
+    stats = stats if stats is not None else LlmsTxtStats()
+    policy = url_policy or UrlPolicy()
+    crawl_config = CrawlerRunConfig()
+    
+    result = await fetch_page(crawler, url, crawl_config, rate_limiter, http_fetcher)
+    if not (result.success and result.markdown):
+        print(f"Failed to crawl {url}: {result.error_message}")
+        return
+    links = parse_llms_txt(result.markdown, url)
+    stats.links = len(links)
+    
+    full_url = llms_full_url(url)
+    full_task = None
+    if await policy.admits(full_url):
+        # Most sites have no llms-full.txt, so a 404 from the fast path is not worth a browser render
+        full_task = asyncio.create_task(fetch_page(crawler, full_url, crawl_config, rate_limiter, http_fetcher, final_client_errors=True))
+    try:
+        doc = {'url': url, 'markdown': result.markdown}
+        if fetch_state is not None:
+            doc['fetch_state'] = fetch_state.build_state(url, result, result.markdown)
+            if await fetch_state.unchanged_after_fetch(doc['fetch_state']):
+                await fetch_state.mark_unchanged(url, doc['fetch_state'])
+                doc = None
+        if doc is not None:
+            yield doc
+        
+        covered = CoveredText()
+        if links:
+            async for doc in iter_crawl_batch(crawler, links, max_concurrent=max_concurrent, rate_limiter=rate_limiter, fetch_state=fetch_state, http_fetcher=http_fetcher, job=job, url_policy=url_policy, budget=budget, concurrency=concurrency):
+                covered.add(doc['markdown'])
+                yield doc
+        
+        if full_task is None or (budget is not None and budget.exhausted()):
+            return
+        try:
+            full = await full_task
+        except Exception as e:
+            print(f"Failed to crawl {full_url}: {e}")
+            return
+        if not (full.success and full.markdown) or (getattr(full, "status_code", None) or 200) >= 400:
+            # Absent; a browser render still "succeeds" with the site's error page
+            return
+        stats.full_text_found = True
+        remaining, stats.full_sections_deduplicated = covered.remove_covered_sections(full.markdown)
+        if not remaining:
+            return
+        if budget is not None:
+            budget.add_bytes(len(remaining.encode("utf-8")))
+        doc = {'url': full_url, 'markdown': remaining}
+        if fetch_state is not None:
+            doc['fetch_state'] = fetch_state.build_state(full_url, full, remaining)
+            if await fetch_state.unchanged_after_fetch(doc['fetch_state']):
+                await fetch_state.mark_unchanged(full_url, doc['fetch_state'])
+                return
+        yield doc
+    finally:
+        if full_task is not None and not full_task.done():
+            full_task.cancel()
+            await asyncio.gather(full_task, return_exceptions=True)
+
+async def wait_for_memory(memory_threshold_percent: float = 70.0, check_interval: float = 1.0) -> None:
+    """
+    Wait until system memory usage drops below the threshold before opening another session.
+    
+    Args:
+        memory_threshold_percent: Memory usage percentage above which new crawls are held back
+        check_interval: Seconds between memory checks
+    """
+    while psutil.virtual_memory().percent >= memory_threshold_percent:
+        await asyncio.sleep(check_interval)
+
+async def iter_crawl_frontier(
+    crawler: AsyncWebCrawler,
+    start_urls: Union[List[str], AsyncIterator[str]],
+    max_depth: int = 1,
+    max_concurrent: int = 10,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    fetch_state: Optional[FetchStateTracker] = None,
+    http_fetcher: Optional[HttpFetcher] = None,
+    job: Optional[CrawlJob] = None,
+    url_policy: Optional[UrlPolicy] = None,
+    budget: Optional[CrawlBudget] = None,
+    concurrency: Optional[AdaptiveConcurrency] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Crawl URLs from a shared frontier, yielding each page as soon as it is fetched.
+    
+    Workers pull URLs from the frontier and push newly discovered internal links
+    back immediately, so a slow page only occupies its own session. With
+    max_depth=1 only the start URLs are crawled.
+    
+    How many fetches run at once is decided by an AdaptiveConcurrency limit that
+    starts at max_concurrent, grows while pages come back quickly and backs off on
+    timeouts, 429s and 5xx responses; a CrawlJob reports its current value in its
+    progress.
+    
+    The frontier is a priority queue ordered by the UrlPolicy's scorer (URL patterns,
+    path and link depth, anchor text, inbound links), so with a budget the most
+    valuable pages are fetched first. A queued URL is re-scored whenever another
+    crawled page links to it.
+    
+    Start URLs may come from an async iterator (e.g. a streaming sitemap reader);
+    they are admitted a few at a time, so the crawl begins before the source is
+    exhausted and the frontier never holds the whole source in memory.
+    
+    When a FetchStateTracker is given, pages known to be unchanged are skipped;
+    their remembered internal links still feed the frontier.
+    
+    When a CrawlJob is given, every URL entering the frontier and every fetch is
+    checkpointed. A resumed job starts from its recorded visited set and re-queues
+    only the URLs that had not been indexed yet.
+    
+    Every URL, start URLs included, is canonicalized by the UrlPolicy and must pass
+    its filters (and robots.txt, if the policy has a RobotsCache) before it enters
+    the frontier, so disallowed pages are never fetched.
+    
+    When a CrawlBudget is given, no new fetch starts once one of its limits is
+    reached; pages fetched so far are still yielded and the rest of the frontier
+    is dropped (a CrawlJob keeps it queued for a later resume).
+    
+    Args:
+        crawler: AsyncWebCrawler instance
+        start_urls: List or async iterator of starting URLs
+        max_depth: Maximum recursion depth
+        max_concurrent: Number of concurrent fetches to start with; the adaptive limit may raise or lower it
+        rate_limiter: Optional process-wide HostRateLimiter
+        fetch_state: Optional FetchStateTracker used to skip unchanged pages
+        http_fetcher: Optional HttpFetcher for pages that do not need the browser
+        job: Optional CrawlJob that checkpoints the frontier
+        url_policy: UrlPolicy that canonicalizes and filters URLs (default: canonicalization only)
+        budget: Optional CrawlBudget that stops the crawl when a limit is reached
+        concurrency: AdaptiveConcurrency limit of the crawl (default: one starting at max_concurrent)
+        
+    Yields:
+        Dictionaries with URL and markdown content
+    """
+    if max_depth < 1:
+        return
+
+    run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, stream=False)
+    concurrency = concurrency or AdaptiveConcurrency.for_crawl(max_concurrent)
+    if job is not None:
+        job.progress.concurrency = concurrency
+
+    policy = url_policy or UrlPolicy()
+    normalize_url = policy.try_canonicalize
+
+    # Every URL is marked as seen when it enters the frontier, so no page is queued twice
+    seen = set()
+    frontier: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    order = itertools.count()
+    # URLs waiting in the frontier: url -> (sequence of its current entry, depth, anchor text, score)
+    waiting: Dict[str, Tuple[int, int, str, float]] = {}
+    inbound: Dict[str, int] = {}
+    results: asyncio.Queue = asyncio.Queue(maxsize=max_concurrent * 2)
+
+    # Bounds how many start URLs wait in the frontier at once
+    seed_slots = asyncio.Semaphore(max(1, max_concurrent) * 4)
+
+    def push(url: str, depth: int, anchor: str = "") -> None:
+        score = policy.scorer(url, depth, anchor, inbound.get(url, 0))
+        seq = next(order)
+        waiting[url] = (seq, depth, anchor, score)
+        frontier.put_nowait((-score, seq, url, depth))
+
+    async def enqueue_links(links: Iterable[Tuple[str, str]], depth: int) -> None:
+        # One inbound link per linking page, keeping the first non-empty anchor text
+        anchors: Dict[str, str] = {}
+        # The first href of each canonical URL, which robots.txt is checked against too
+        hrefs: Dict[str, str] = {}
+        for href, text in links:
+            norm_url = normalize_url(href)
+            # Malformed links are skipped rather than failing the page they are on
+            if norm_url and not anchors.get(norm_url):
+                anchors[norm_url] = (text or "").strip()
+                hrefs.setdefault(norm_url, href)
+
+        added = []
+        for norm_url, anchor in anchors.items():
+            inbound[norm_url] = inbound.get(norm_url, 0) + 1
+            if norm_url in seen:
+                # Still waiting: queue it again with its new score; the old entry is skipped
+                entry = waiting.get(norm_url)
+                if entry is not None and policy.scorer(norm_url, entry[1], entry[2], inbound[norm_url]) != entry[3]:
+                    push(norm_url, entry[1], entry[2])
+                continue
+            # Rejected URLs are remembered as well, so each one is only checked once
+            seen.add(norm_url)
+            if await policy.admits(norm_url, hrefs[norm_url]):
+                push(norm_url, depth, anchor)
+                added.append((norm_url, depth))
+        if job is not None:
+            job.add_urls(added)
+            job.progress.pages_queued = len(waiting)
+
+    # A resumed job skips everything it has seen and re-queues what it had not indexed
+    restored = []
+    if job is not None:
+        seen.update(filter(None, map(normalize_url, job.visited_urls())))
+        restored = job.pending_urls()
+
+    async def admit_seeds(batch: List[str]) -> None:
+        fresh = []
+        for written in batch:
+            url = normalize_url(written)
+            if url and url not in seen:
+                seen.add(url)
+                if await policy.admits(url, written):
+                    fresh.append(url)
+        if fetch_state is not None:
+            await fetch_state.load(fresh)
+        if job is not None:
+            job.add_urls([(url, 0) for url in fresh])
+        for url in interleave_by_host(fresh):
+            await seed_slots.acquire()
+            push(url, 0)
+
+    async def feed_seeds():
+        try:
+            for url, depth in restored:
+                if depth == 0:
+                    await seed_slots.acquire()
+                push(url, depth)
+            if isinstance(start_urls, list):
+                await admit_seeds(start_urls)
+                return
+            batch = []
+            async for url in start_urls:
+                if budget is not None and budget.exhausted():
+                    break
+                batch.append(url)
+                if len(batch) >= 100:
+                    await admit_seeds(batch)
+                    batch = []
+            if batch:
+                await admit_seeds(batch)
+        except Exception as e:
+            print(f"Error reading start URLs: {e}")
+
+    async def worker():
+        while True:
+            # Taking a slot before popping keeps fetches in priority order at any limit
+            async with concurrency.acquire() as slot:
+                _, seq, url, depth = await frontier.get()
+                entry = waiting.get(url)
+                if entry is None or entry[0] != seq:
+                    # Superseded by a re-scored entry for the same URL
+                    frontier.task_done()
+                    continue
+                del waiting[url]
+                if job is not None:
+                    job.progress.pages_queued = len(waiting)
+                try:
+                    # Once the budget is spent the rest of the frontier is drained without fetching
+                    if budget is not None and budget.exhausted():
+                        continue
+                    if fetch_state is not None:
+                        previous = await fetch_state.unchanged_before_fetch(url, rate_limiter)
+                        if previous is not None:
+                            await fetch_state.mark_unchanged(url)
+                            if job is not None:
+                                job.mark_urls([url], SKIPPED)
+                            if depth + 1 < max_depth:
+                                await enqueue_links([(href, "") for href in previous.get("internal_links") or []], depth + 1)
+                            continue
+
+                    if budget is not None and not budget.start_page():
+                        continue
+                    await wait_for_memory()
+                    result = await fetch_page(crawler, url, run_config, rate_limiter, http_fetcher, slot)
+                    page_url = final_url(result)
+                    # Redirect targets count as visited as well
+                    redirect_url = normalize_url(page_url)
+                    seen.add(redirect_url)
+                    if budget is not None and result.success and result.markdown:
+                        budget.add_bytes(len(result.markdown.encode("utf-8")))
+                    if result.success and redirect_url != url and not await policy.robots_allow(redirect_url or url, page_url):
+                        # Redirected into a path robots.txt disallows: neither indexed nor followed
+                        policy.disallowed_count += 1
+                        print(f"Skipping {url}: redirected to {page_url}, which robots.txt disallows")
+                        if job is not None:
+                            job.mark_urls([url], SKIPPED)
+                        continue
+
+                    if result.success and result.markdown:
+                        # Indexed under the canonical final URL, which crawl_state is keyed by too
+                        indexed_url = redirect_url or page_url
+                        if depth + 1 < max_depth:
+                            await enqueue_links([(link["href"], link.get("text")) for link in result.links.get("internal", [])], depth + 1)
+                        if job is not None:
+                            if redirect_url != url:
+                                job.mark_urls([url], REDIRECTED)
+                            job.mark_urls([indexed_url], FETCHED, depth)
+                        doc = {'url': indexed_url, 'markdown': result.markdown}
+                        if fetch_state is not None:
+                            doc['fetch_state'] = fetch_state.build_state(indexed_url, result, result.markdown)
+                            if await fetch_state.unchanged_after_fetch(doc['fetch_state']):
+                                await fetch_state.mark_unchanged(indexed_url, doc['fetch_state'])
+                                if job is not None:
+                                    job.mark_urls([indexed_url], SKIPPED)
+                                continue
+                        await results.put(doc)
+                    else:
+                        print(f"Failed to crawl {url}: {result.error_message}")
+                        if job is not None:
+                            job.mark_urls([url], URL_FAILED)
+                except Exception as e:
+                    print(f"Failed to crawl {url}: {e}")
+                    if job is not None:
+                        job.mark_urls([url], URL_FAILED)
+                finally:
+                    if depth == 0:
+                        seed_slots.release()
+                    frontier.task_done()
+
+    async def close_when_drained(feeder: asyncio.Task):
+        await feeder
+        await frontier.join()
+        await results.put(None)
+
+    feeder = asyncio.create_task(feed_seeds())
+    # One worker per slot the limit can grow to; the limit decides how many fetch at once
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency.maximum)]
+    tasks += [feeder, asyncio.create_task(close_when_drained(feeder))]
+    try:
+        while (doc := await results.get()) is not None:
+            yield doc
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Wait for in-flight fetches to unwind so their browser pages are closed
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if hasattr(start_urls, "aclose"):
+            await start_urls.aclose()
+
+def iter_crawl_batch(crawler: AsyncWebCrawler, urls: Union[List[str], AsyncIterator[str]], max_concurrent: int = 10, rate_limiter: Optional[HostRateLimiter] = None, fetch_state: Optional[FetchStateTracker] = None, http_fetcher: Optional[HttpFetcher] = None, job: Optional[CrawlJob] = None, url_policy: Optional[UrlPolicy] = None, budget: Optional[CrawlBudget] = None, concurrency: Optional[AdaptiveConcurrency] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Batch crawl multiple URLs in parallel, yielding each page as soon as it is fetched.
+    
+    Args:
+        crawler: AsyncWebCrawler instance
+        urls: List or async iterator of URLs to crawl
+        max_concurrent: Number of concurrent fetches to start with; the adaptive limit may raise or lower it
+        rate_limiter: Optional process-wide HostRateLimiter
+        fetch_state: Optional FetchStateTracker used to skip unchanged pages
+        http_fetcher: Optional HttpFetcher for pages that do not need the browser
+        job: Optional CrawlJob that checkpoints the frontier
+        url_policy: Optional UrlPolicy that canonicalizes and filters URLs
+        budget: Optional CrawlBudget that stops the crawl when a limit is reached
+        concurrency: Optional AdaptiveConcurrency limit of the crawl (default: one starting at max_concurrent)
+        
+    Returns:
+        Async iterator of dictionaries with URL and markdown content
+    """
+    return iter_crawl_frontier(crawler, urls, max_depth=1, max_concurrent=max_concurrent, rate_limiter=rate_limiter, fetch_state=fetch_state, http_fetcher=http_fetcher, job=job, url_policy=url_policy, budget=budget, concurrency=concurrency)
+
+async def crawl_batch(crawler: AsyncWebCrawler, urls: List[str], max_concurrent: int = 10, rate_limiter: Optional[HostRateLimiter] = None, fetch_state: Optional[FetchStateTracker] = None, http_fetcher: Optional[HttpFetcher] = None, job: Optional[CrawlJob] = None, url_policy: Optional[UrlPolicy] = None, budget: Optional[CrawlBudget] = None, concurrency: Optional[AdaptiveConcurrency] = None) -> List[Dict[str, Any]]:
     """
     Batch crawl multiple URLs in parallel.
     
     Args:
         crawler: AsyncWebCrawler instance
         urls: List of URLs to crawl
-        max_concurrent: Maximum number of concurrent browser sessions
+        max_concurrent: Number of concurrent fetches to start with; the adaptive limit may raise or lower it
+        rate_limiter: Optional process-wide HostRateLimiter
+        fetch_state: Optional FetchStateTracker used to skip unchanged pages
+        http_fetcher: Optional HttpFetcher for pages that do not need the browser
+        job: Optional CrawlJob that checkpoints the frontier
+        url_policy: Optional UrlPolicy that canonicalizes and filters URLs
+        budget: Optional CrawlBudget that stops the crawl when a limit is reached
+        concurrency: Optional AdaptiveConcurrency limit of the crawl (default: one starting at max_concurrent)
         
     Returns:
         List of dictionaries with URL and markdown content
     """
-    crawl_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, stream=False)
-    dispatcher = MemoryAdaptiveDispatcher(
-        memory_threshold_percent=70.0,
-        check_interval=1.0,
-        max_session_permit=max_concurrent
-    )
+    return [doc async for doc in iter_crawl_batch(crawler, urls, max_concurrent=max_concurrent, rate_limiter=rate_limiter, fetch_state=fetch_state, http_fetcher=http_fetcher, job=job, url_policy=url_policy, budget=budget, concurrency=concurrency)]
 
-    results = await crawler.arun_many(urls=urls, config=crawl_config, dispatcher=dispatcher)
-    return [{'url': r.url, 'markdown': r.markdown} for r in results if r.success and r.markdown]
+def iter_crawl_recursive_internal_links(crawler: AsyncWebCrawler, start_urls: List[str], max_depth: int = 3, max_concurrent: int = 10, rate_limiter: Optional[HostRateLimiter] = None, fetch_state: Optional[FetchStateTracker] = None, http_fetcher: Optional[HttpFetcher] = None, job: Optional[CrawlJob] = None, url_policy: Optional[UrlPolicy] = None, budget: Optional[CrawlBudget] = None, concurrency: Optional[AdaptiveConcurrency] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Recursively crawl internal links from start URLs up to a maximum depth,
+    yielding each page as soon as it is fetched.
+    
+    Args:
+        crawler: AsyncWebCrawler instance
+        start_urls: List of starting URLs
+        max_depth: Maximum recursion depth
+        max_concurrent: Number of concurrent fetches to start with; the adaptive limit may raise or lower it
+        rate_limiter: Optional process-wide HostRateLimiter
+        fetch_state: Optional FetchStateTracker used to skip unchanged pages
+        http_fetcher: Optional HttpFetcher for pages that do not need the browser
+        job: Optional CrawlJob that checkpoints the frontier
+        url_policy: Optional UrlPolicy that canonicalizes and filters URLs
+        budget: Optional CrawlBudget that stops the crawl when a limit is reached
+        concurrency: Optional AdaptiveConcurrency limit of the crawl (default: one starting at max_concurrent)
+        
+    Returns:
+        Async iterator of dictionaries with URL and markdown content
+    """
+    return iter_crawl_frontier(crawler, start_urls, max_depth=max_depth, max_concurrent=max_concurrent, rate_limiter=rate_limiter, fetch_state=fetch_state, http_fetcher=http_fetcher, job=job, url_policy=url_policy, budget=budget, concurrency=concurrency)
 
-async def crawl_recursive_internal_links(crawler: AsyncWebCrawler, start_urls: List[str], max_depth: int = 3, max_concurrent: int = 10) -> List[Dict[str, Any]]:
+async def crawl_recursive_internal_links(crawler: AsyncWebCrawler, start_urls: List[str], max_depth: int = 3, max_concurrent: int = 10, rate_limiter: Optional[HostRateLimiter] = None, fetch_state: Optional[FetchStateTracker] = None, http_fetcher: Optional[HttpFetcher] = None, job: Optional[CrawlJob] = None, url_policy: Optional[UrlPolicy] = None, budget: Optional[CrawlBudget] = None, concurrency: Optional[AdaptiveConcurrency] = None) -> List[Dict[str, Any]]:
     """
     Recursively crawl internal links from start URLs up to a maximum depth.
     
@@ -1847,48 +3397,180 @@ async def crawl_recursive_internal_links(crawler: AsyncWebCrawler, start_urls: L
         crawler: AsyncWebCrawler instance
         start_urls: List of starting URLs
         max_depth: Maximum recursion depth
-        max_concurrent: Maximum number of concurrent browser sessions
+        max_concurrent: Number of concurrent fetches to start with; the adaptive limit may raise or lower it
+        rate_limiter: Optional process-wide HostRateLimiter
+        fetch_state: Optional FetchStateTracker used to skip unchanged pages
+        http_fetcher: Optional HttpFetcher for pages that do not need the browser
+        job: Optional CrawlJob that checkpoints the frontier
+        url_policy: Optional UrlPolicy that canonicalizes and filters URLs
+        budget: Optional CrawlBudget that stops the crawl when a limit is reached
+        concurrency: Optional AdaptiveConcurrency limit of the crawl (default: one starting at max_concurrent)
         
     Returns:
         List of dictionaries with URL and markdown content
     """
+    return [doc async for doc in iter_crawl_recursive_internal_links(crawler, start_urls, max_depth=max_depth, max_concurrent=max_concurrent, rate_limiter=rate_limiter, fetch_state=fetch_state, http_fetcher=http_fetcher, job=job, url_policy=url_policy, budget=budget, concurrency=concurrency)]
+
+async def iter_crawl_distributed(
+    crawler: AsyncWebCrawler,
+    frontier: DistributedFrontier,
+    max_depth: int = 3,
+    max_concurrent: int = 10,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    fetch_state: Optional[FetchStateTracker] = None,
+    http_fetcher: Optional[HttpFetcher] = None,
+    url_policy: Optional[UrlPolicy] = None,
+    budget: Optional[CrawlBudget] = None,
+    concurrency: Optional[AdaptiveConcurrency] = None,
+    poll_interval: float = 2.0
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Crawl URLs leased from the shared frontier of a distributed crawl, yielding each page as soon as it is fetched.
+    
+    The worker leases as many URLs as its adaptive concurrency limit has free slots, highest priority first,
+    and adds the internal links of every fetched page to the shared frontier, where
+    the crawl's visited set drops those any worker has already queued. Pages that
+    fail or are skipped as unchanged are reported right away; fetched pages are
+    reported by the indexing pipeline once they are stored (see index_crawl_stream's
+    on_indexed), so a worker that dies mid-crawl loses no pages: its leases expire
+    and other workers crawl them again.
+    
+    The iterator ends once nothing is queued and no other worker is still fetching a
+    leased page (which may add links), or when the CrawlBudget is exhausted. URLs the
+    worker leased but did not index should then be returned with frontier.release().
+    
+    Args:
+        crawler: AsyncWebCrawler instance
+        frontier: DistributedFrontier of the crawl
+        max_depth: Maximum recursion depth
+        max_concurrent: Number of concurrent fetches to start with; the adaptive limit may raise or lower it
+        rate_limiter: Optional process-wide HostRateLimiter
+        fetch_state: Optional FetchStateTracker used to skip unchanged pages
+        http_fetcher: Optional HttpFetcher for pages that do not need the browser
+        url_policy: UrlPolicy that canonicalizes and filters URLs (default: canonicalization only)
+        budget: Optional CrawlBudget that stops the worker when a limit is reached
+        concurrency: AdaptiveConcurrency limit of the worker (default: one starting at max_concurrent)
+        poll_interval: Seconds between frontier checks while other workers hold all queued URLs
+        
+    Yields:
+        Dictionaries with URL and markdown content
+    """
     run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, stream=False)
-    dispatcher = MemoryAdaptiveDispatcher(
-        memory_threshold_percent=70.0,
-        check_interval=1.0,
-        max_session_permit=max_concurrent
-    )
-
-    visited = set()
-
-    def normalize_url(url):
-        return urldefrag(url)[0]
-
-    current_urls = set([normalize_url(u) for u in start_urls])
-    results_all = []
-
-    for depth in range(max_depth):
-        urls_to_crawl = [normalize_url(url) for url in current_urls if normalize_url(url) not in visited]
-        if not urls_to_crawl:
-            break
-
-        results = await crawler.arun_many(urls=urls_to_crawl, config=run_config, dispatcher=dispatcher)
-        next_level_urls = set()
-
-        for result in results:
-            norm_url = normalize_url(result.url)
-            visited.add(norm_url)
-
-            if result.success and result.markdown:
-                results_all.append({'url': result.url, 'markdown': result.markdown})
-                for link in result.links.get("internal", []):
-                    next_url = normalize_url(link["href"])
-                    if next_url not in visited:
-                        next_level_urls.add(next_url)
-
-        current_urls = next_level_urls
+    concurrency = concurrency or AdaptiveConcurrency.for_crawl(max_concurrent)
+    policy = url_policy or UrlPolicy()
+    results: asyncio.Queue = asyncio.Queue(maxsize=max_concurrent * 2)
+    # URLs this worker has already offered to the shared frontier
+    offered = set()
+
+    async def enqueue_links(links: Iterable[Tuple[str, str]], depth: int) -> None:
+        anchors: Dict[str, str] = {}
+        hrefs: Dict[str, str] = {}
+        for href, text in links:
+            norm_url = policy.try_canonicalize(href)
+            # Malformed links are skipped rather than failing the page they are on
+            if norm_url and not anchors.get(norm_url):
+                anchors[norm_url] = (text or "").strip()
+                hrefs.setdefault(norm_url, href)
+        entries = []
+        for norm_url, anchor in anchors.items():
+            if norm_url in offered:
+                continue
+            offered.add(norm_url)
+            if await policy.admits(norm_url, hrefs[norm_url]):
+                entries.append((norm_url, depth, policy.scorer(norm_url, depth, anchor, 0)))
+        await frontier.enqueue(entries)
+
+    async def crawl(url: str, depth: int) -> None:
+        async with concurrency.acquire() as slot:
+            await crawl_leased(url, depth, slot)
+
+    async def crawl_leased(url: str, depth: int, slot: ConcurrencySlot) -> None:
+        try:
+            if fetch_state is not None:
+                previous = await fetch_state.unchanged_before_fetch(url, rate_limiter)
+                if previous is not None:
+                    await fetch_state.mark_unchanged(url)
+                    if depth + 1 < max_depth:
+                        await enqueue_links([(href, "") for href in previous.get("internal_links") or []], depth + 1)
+                    await frontier.complete([url])
+                    return
+
+            await wait_for_memory()
+            result = await fetch_page(crawler, url, run_config, rate_limiter, http_fetcher, slot)
+            if not (result.success and result.markdown):
+                print(f"Failed to crawl {url}: {result.error_message}")
+                await frontier.complete([url], FRONTIER_FAILED, result.error_message)
+                return
+
+            if budget is not None:
+                budget.add_bytes(len(result.markdown.encode("utf-8")))
+            page_url = final_url(result)
+            redirect_url = policy.try_canonicalize(page_url)
+            if redirect_url != url and not await policy.robots_allow(redirect_url or url, page_url):
+                # Redirected into a path robots.txt disallows: neither indexed nor followed
+                policy.disallowed_count += 1
+                print(f"Skipping {url}: redirected to {page_url}, which robots.txt disallows")
+                await frontier.complete([url])
+                return
+            # Indexed under the canonical final URL, which crawl_state is keyed by too
+            indexed_url = redirect_url or page_url
+            if depth + 1 < max_depth:
+                await enqueue_links([(link["href"], link.get("text")) for link in result.links.get("internal", [])], depth + 1)
+            doc = {'url': indexed_url, 'markdown': result.markdown}
+            if fetch_state is not None:
+                doc['fetch_state'] = fetch_state.build_state(indexed_url, result, result.markdown)
+                if await fetch_state.unchanged_after_fetch(doc['fetch_state']):
+                    await fetch_state.mark_unchanged(indexed_url, doc['fetch_state'])
+                    await frontier.complete([url])
+                    return
+            await frontier.fetched(url, indexed_url)
+            await results.put(doc)
+        except Exception as e:
+            print(f"Failed to crawl {url}: {e}")
+            await frontier.complete([url], FRONTIER_FAILED, str(e))
 
-    return results_all
+    async def lease_loop():
+        active = set()
+        try:
+            while budget is None or not budget.exhausted():
+                if len(active) >= concurrency.limit:
+                    _, active = await asyncio.wait(active, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                leased = await frontier.lease(concurrency.limit - len(active))
+                if budget is not None:
+                    # Leases beyond the page limit stay with this worker until it releases them
+                    leased = [entry for entry in leased if budget.start_page()]
+                if leased:
+                    if fetch_state is not None:
+                        await fetch_state.load([url for url, _ in leased])
+                    active.update(asyncio.create_task(crawl(url, depth)) for url, depth in leased)
+                    continue
+                if active:
+                    # Pages in flight here may still add links
+                    _, active = await asyncio.wait(active, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                counts = await frontier.counts()
+                if counts is not None and counts["queued"] == 0 and counts["crawling_by_others"] == 0:
+                    break
+                await asyncio.sleep(poll_interval)
+            if active:
+                await asyncio.wait(active)
+        except Exception as e:
+            print(f"Error leasing from the crawl frontier: {e}")
+        finally:
+            for task in active:
+                task.cancel()
+            # Wait for in-flight fetches to unwind so their browser pages are closed
+            await asyncio.gather(*active, return_exceptions=True)
+        await results.put(None)
+
+    loop_task = asyncio.create_task(lease_loop())
+    try:
+        while (doc := await results.get()) is not None:
+            yield doc
+    finally:
+        loop_task.cancel()
+        await asyncio.gather(loop_task, return_exceptions=True)
 
 async def main():
     transport = os.getenv("TRANSPORT", "sse")
@@ -0,0 +1,90 @@
+"""
+Per-call crawl budgets for the Crawl4AI MCP server.
+
+A CrawlBudget bounds one crawl by pages fetched, markdown bytes, wall-clock
+seconds and embedding tokens. The frontier asks it before every fetch and the
+indexing pipeline before every page it embeds; once any limit is reached the
+crawl stops taking new work, indexes what it already fetched and reports which
+limit ended it. URLs that were not fetched stay queued in the crawl job, so a
+stopped crawl can be resumed with a fresh budget.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class CrawlBudget:
+    """Limits of one crawl and how much of each has been used; None means unlimited."""
+    max_pages: Optional[int] = None
+    max_bytes: Optional[int] = None
+    max_seconds: Optional[float] = None
+    max_embedding_tokens: Optional[int] = None
+    started_at: float = field(default_factory=time.monotonic)
+    pages: int = 0
+    bytes: int = 0
+    embedding_tokens: int = 0
+    stopped_by: Optional[str] = None
+
+    def _stop(self, limit: str) -> None:
+        if self.stopped_by is None:
+            self.stopped_by = limit
+
+    def exhausted(self) -> bool:
+        """Check whether any limit has been reached, including the time limit."""
+        if self.max_seconds is not None and time.monotonic() - self.started_at >= self.max_seconds:
+            self._stop("max_seconds")
+        return self.stopped_by is not None
+
+    def start_page(self) -> bool:
+        """
+        Reserve one page fetch.
+
+        Returns:
+            True if the page may be fetched, False once a limit has been reached
+        """
+        if self.exhausted():
+            return False
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            self._stop("max_pages")
+            return False
+        self.pages += 1
+        return True
+
+    def add_bytes(self, count: int) -> None:
+        """Charge the markdown size of a fetched page."""
+        self.bytes += count
+        if self.max_bytes is not None and self.bytes >= self.max_bytes:
+            self._stop("max_bytes")
+
+    def allow_embedding(self, tokens: int) -> bool:
+        """
+        Reserve embedding tokens for one page.
+
+        Args:
+            tokens: Embedding tokens of the page's chunks
+
+        Returns:
+            True if the page may be embedded, False if it would exceed the token limit
+        """
+        if self.max_embedding_tokens is not None and self.embedding_tokens + tokens > self.max_embedding_tokens:
+            self._stop("max_embedding_tokens")
+            return False
+        self.embedding_tokens += tokens
+        return True
+
+    def summary(self) -> Dict[str, Any]:
+        """Describe the limits, what was used and which limit stopped the crawl, if any."""
+        return {
+            "stopped_by": self.stopped_by,
+            "pages_fetched": self.pages,
+            "markdown_bytes": self.bytes,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 1),
+            "embedding_tokens": self.embedding_tokens,
+            "limits": {
+                "max_pages": self.max_pages,
+                "max_bytes": self.max_bytes,
+                "max_seconds": self.max_seconds,
+                "max_embedding_tokens": self.max_embedding_tokens
+            }
+        }
@@ -0,0 +1,369 @@
+"""
+Durable crawl jobs for the Crawl4AI MCP server.
+
+Every smart_crawl_url call is recorded as a job in a local SQLite database: its
+parameters, every URL that entered its frontier (with its depth), how far each URL
+got and the indexing totals so far. If the server stops mid-crawl, resuming the job
+restores the visited set and the unfinished part of the frontier, so pages that were
+already indexed are neither fetched nor embedded again.
+
+Jobs run as asyncio tasks, so a crawl can continue in the background while its
+live progress is polled and it can be cancelled from another tool call.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Job statuses
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+
+# URL statuses
+QUEUED = "queued"
+FETCHED = "fetched"
+INDEXED = "indexed"
+SKIPPED = "skipped"
+URL_FAILED = "failed"
+REDIRECTED = "redirected"
+
+SCHEMA = """
+create table if not exists crawl_jobs (
+    job_id text primary key,
+    url text not null,
+    params text not null,
+    status text not null,
+    stats text,
+    result text,
+    error text,
+    created_at text not null,
+    updated_at text not null
+);
+
+create table if not exists crawl_job_urls (
+    job_id text not null,
+    url text not null,
+    depth integer not null,
+    status text not null,
+    primary key (job_id, url)
+);
+
+create index if not exists idx_crawl_job_urls_status on crawl_job_urls (job_id, status);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class CrawlProgress:
+    """Live counters of a job's current run, reported while it is in progress."""
+    started_at: float
+    pages_fetched: int = 0
+    pages_skipped: int = 0
+    pages_failed: int = 0
+    pages_queued: int = 0
+    stats: Optional[Any] = None  # IndexingStats of the run once indexing starts
+    concurrency: Optional[Any] = None  # AdaptiveConcurrency of the run's fetches
+    initial_pages: int = 0
+    initial_chunks: int = 0
+
+    def attach_stats(self, stats: Any) -> None:
+        """Track an IndexingStats object, counting throughput from its current totals."""
+        self.stats = stats
+        self.initial_pages = stats.pages_indexed
+        self.initial_chunks = stats.chunks_stored
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Summarize progress and throughput of the current run.
+
+        Returns:
+            Dictionary of counters; indexing totals include earlier runs of the job
+        """
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        stats = self.stats
+        pages_indexed = stats.pages_indexed if stats else 0
+        chunks_stored = stats.chunks_stored if stats else 0
+        code_examples = stats.code_examples_stored if stats else 0
+        return {
+            "elapsed_seconds": round(elapsed, 1),
+            "pages_fetched": self.pages_fetched,
+            "pages_queued": self.pages_queued,
+            "pages_skipped": self.pages_skipped,
+            "pages_failed": self.pages_failed,
+            "pages_indexed": pages_indexed,
+            "chunks_embedded": chunks_stored,
+            "rows_written": chunks_stored + code_examples + (stats.duplicate_pages if stats else 0),
+            "pages_per_second": round(self.pages_fetched / elapsed, 2),
+            "chunks_per_second": round((chunks_stored - self.initial_chunks) / elapsed, 2),
+            "concurrency": self.concurrency.snapshot() if self.concurrency else None
+        }
+
+
+class CrawlJobStore:
+    """
+    SQLite-backed store for crawl jobs and their per-URL progress.
+
+    One store is shared by the whole server process. Writes are small and local,
+    so they run inline on the event loop; a lock keeps the connection safe when a
+    call does come from a worker thread. Jobs running in this process are tracked
+    in memory together with their task and live progress.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.executescript(SCHEMA)
+        self._active: Dict[str, "CrawlJob"] = {}
+
+    @classmethod
+    def from_env(cls) -> "CrawlJobStore":
+        """Open the store at CRAWL_JOBS_DB (default: crawl_jobs.db in the working directory)."""
+        return cls(os.getenv("CRAWL_JOBS_DB", "crawl_jobs.db"))
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params: Iterable[Any] = ()) -> List[sqlite3.Row]:
+        with self._lock, self._conn:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def _executemany(self, sql: str, rows: List[Tuple[Any, ...]]) -> None:
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+
+    def create_job(self, url: str, params: Dict[str, Any]) -> "CrawlJob":
+        """
+        Record a new crawl job.
+
+        Args:
+            url: URL the crawl starts from
+            params: Crawl parameters needed to resume the job
+
+        Returns:
+            CrawlJob handle for the new job
+        """
+        job_id = uuid.uuid4().hex[:12]
+        now = _now()
+        self._execute(
+            "insert into crawl_jobs (job_id, url, params, status, created_at, updated_at) values (?, ?, ?, ?, ?, ?)",
+            (job_id, url, json.dumps(params), RUNNING, now, now)
+        )
+        return CrawlJob(self, job_id, url, params)
+
+    def open_job(self, job_id: str) -> Optional["CrawlJob"]:
+        """
+        Load an existing job so it can be resumed.
+
+        Args:
+            job_id: ID returned when the job was created
+
+        Returns:
+            CrawlJob handle with the saved parameters and stats, or None if unknown
+        """
+        rows = self._execute("select url, params, stats from crawl_jobs where job_id = ?", (job_id,))
+        if not rows:
+            return None
+        row = rows[0]
+        stats = json.loads(row["stats"]) if row["stats"] else None
+        return CrawlJob(self, job_id, row["url"], json.loads(row["params"]), stats)
+
+    def is_active(self, job_id: str) -> bool:
+        """Check whether a job is currently running in this process."""
+        return job_id in self._active
+
+    def active_job(self, job_id: str) -> Optional["CrawlJob"]:
+        """Return the handle of a job running in this process, if any."""
+        return self._active.get(job_id)
+
+    def active_jobs(self) -> List["CrawlJob"]:
+        """Return the handles of all jobs running in this process."""
+        return list(self._active.values())
+
+    def job_info(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Describe a job and count its URLs by status.
+
+        Jobs marked running that no task in this process is driving are reported
+        as interrupted, since the server stopped while they ran. Running jobs
+        include their live progress, finished jobs their final summary.
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            Dictionary describing the job, or None if unknown
+        """
+        rows = self._execute("select * from crawl_jobs where job_id = ?", (job_id,))
+        if not rows:
+            return None
+        row = rows[0]
+        counts = self._execute(
+            "select status, count(*) as n from crawl_job_urls where job_id = ? group by status", (job_id,)
+        )
+        status = row["status"]
+        active = self._active.get(job_id)
+        if status == RUNNING and active is None:
+            status = INTERRUPTED
+        info = {
+            "job_id": job_id,
+            "url": row["url"],
+            "status": status,
+            "params": json.loads(row["params"]),
+            "urls": {r["status"]: r["n"] for r in counts},
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+        if active is not None:
+            info["progress"] = active.progress.snapshot()
+        if row["result"]:
+            info["result"] = json.loads(row["result"])
+        return info
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Describe the most recently updated jobs.
+
+        Args:
+            limit: Maximum number of jobs to return
+
+        Returns:
+            List of job descriptions as returned by job_info
+        """
+        rows = self._execute("select job_id from crawl_jobs order by updated_at desc limit ?", (limit,))
+        return [self.job_info(row["job_id"]) for row in rows]
+
+    def interrupted_job_ids(self) -> List[str]:
+        """Return the IDs of jobs left running by a previous server process."""
+        rows = self._execute("select job_id from crawl_jobs where status = ? order by created_at", (RUNNING,))
+        return [row["job_id"] for row in rows if row["job_id"] not in self._active]
+
+
+class CrawlJob:
+    """Handle used by a running crawl to checkpoint its progress."""
+
+    def __init__(self, store: CrawlJobStore, job_id: str, url: str, params: Dict[str, Any], stats: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.job_id = job_id
+        self.url = url
+        self.params = params
+        self.stats = stats
+        self.task: Optional[asyncio.Task] = None
+        self.progress = CrawlProgress(started_at=time.monotonic())
+
+    def start(self) -> None:
+        """Mark the job as running in this process and reset its live progress."""
+        self.progress = CrawlProgress(started_at=time.monotonic())
+        self.store._active[self.job_id] = self
+        self.store._execute(
+            "update crawl_jobs set status = ?, result = null, error = null, updated_at = ? where job_id = ?",
+            (RUNNING, _now(), self.job_id)
+        )
+
+    def finish(self, error: Optional[str] = None, result: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Mark the job as completed, or failed if an error is given.
+
+        Args:
+            error: Error message if the crawl failed
+            result: Final crawl summary to keep with the job
+        """
+        self.store._execute(
+            "update crawl_jobs set status = ?, result = ?, error = ?, updated_at = ? where job_id = ?",
+            (FAILED if error else COMPLETED, json.dumps(result) if result else None, error, _now(), self.job_id)
+        )
+
+    def mark_cancelled(self) -> None:
+        """Mark the job as cancelled; it can still be resumed later."""
+        self.store._execute(
+            "update crawl_jobs set status = ?, updated_at = ? where job_id = ?",
+            (CANCELLED, _now(), self.job_id)
+        )
+
+    def release(self) -> None:
+        """Stop driving the job in this process; an unfinished job becomes resumable."""
+        self.store._active.pop(self.job_id, None)
+
+    def visited_urls(self) -> Set[str]:
+        """Return every URL that has entered this job's frontier."""
+        rows = self.store._execute("select url from crawl_job_urls where job_id = ?", (self.job_id,))
+        return {row["url"] for row in rows}
+
+    def pending_urls(self) -> List[Tuple[str, int]]:
+        """
+        Return the URLs that still need to be crawled, shallowest first.
+
+        Pages that were fetched but not yet indexed when the job stopped are
+        included, since their content was only held in memory.
+        """
+        rows = self.store._execute(
+            "select url, depth from crawl_job_urls where job_id = ? and status in (?, ?) order by depth, rowid",
+            (self.job_id, QUEUED, FETCHED)
+        )
+        return [(row["url"], row["depth"]) for row in rows]
+
+    def add_urls(self, items: List[Tuple[str, int]]) -> None:
+        """
+        Record URLs that entered the frontier.
+
+        Args:
+            items: (url, depth) pairs; URLs already recorded are left untouched
+        """
+        self.store._executemany(
+            "insert or ignore into crawl_job_urls (job_id, url, depth, status) values (?, ?, ?, ?)",
+            [(self.job_id, url, depth, QUEUED) for url, depth in items]
+        )
+
+    def mark_urls(self, urls: List[str], status: str, depth: int = 0) -> None:
+        """
+        Set the status of URLs, recording any that were not in the frontier yet.
+
+        Args:
+            urls: URLs to update
+            status: New status (fetched, indexed, skipped, redirected or failed)
+            depth: Depth recorded for URLs that were not known yet, e.g. redirect targets
+        """
+        if status == FETCHED:
+            self.progress.pages_fetched += len(urls)
+        elif status == SKIPPED:
+            self.progress.pages_skipped += len(urls)
+        elif status == URL_FAILED:
+            self.progress.pages_failed += len(urls)
+        self.store._executemany(
+            "insert into crawl_job_urls (job_id, url, depth, status) values (?, ?, ?, ?) "
+            "on conflict (job_id, url) do update set status = excluded.status",
+            [(self.job_id, url, depth, status) for url in urls]
+        )
+
+    def save_stats(self, stats: Dict[str, Any]) -> None:
+        """
+        Checkpoint the indexing totals so a resumed run reports the whole job.
+
+        Args:
+            stats: IndexingStats of the job as a dictionary
+        """
+        self.stats = stats
+        self.store._execute(
+            "update crawl_jobs set stats = ?, updated_at = ? where job_id = ?",
+            (json.dumps(stats), _now(), self.job_id)
+        )
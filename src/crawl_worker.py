@@ -0,0 +1,39 @@
+"""
+Standalone worker for distributed crawls.
+
+Runs the same crawl and indexing code as the MCP server, without serving MCP, so
+extra processes or machines can work on a crawl started with start_distributed_crawl:
+
+    uv run src/crawl_worker.py <crawl_id> [--max-concurrent 10] [--max-pages N] [--max-seconds S]
+
+The worker reads the same environment variables as the server and exits once the
+crawl's frontier is drained or a limit is reached.
+"""
+import argparse
+import asyncio
+import json
+
+from crawl4ai_mcp import mcp, crawl4ai_lifespan, run_distributed_worker
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Work on a distributed crawl until its frontier is drained.")
+    parser.add_argument("crawl_id", help="ID returned by start_distributed_crawl")
+    parser.add_argument("--max-concurrent", type=int, default=10, help="Maximum number of concurrent browser sessions")
+    parser.add_argument("--max-pages", type=int, default=None, help="Stop after fetching this many pages")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Stop leasing new URLs after this many seconds")
+    args = parser.parse_args()
+
+    async with crawl4ai_lifespan(mcp) as context:
+        summary = await run_distributed_worker(
+            context,
+            args.crawl_id,
+            max_concurrent=args.max_concurrent,
+            max_pages=args.max_pages,
+            max_seconds=args.max_seconds
+        )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""
+Shared crawl frontier for distributed crawls.
+
+A distributed crawl keeps its frontier and visited set in Postgres (the
+crawl_frontier table), so any number of server processes or standalone workers,
+on one machine or many, can crawl the same site together. Each worker leases a
+batch of the highest-priority URLs (SELECT ... FOR UPDATE SKIP LOCKED, so
+concurrent workers never wait on each other or get the same URL), crawls and
+indexes them with the regular pipeline, adds the links it finds and reports each
+URL as fetched once its links are queued and as done once its page is stored. Leases are renewed while the worker runs;
+when a worker crashes its leases expire and other workers pick the URLs up again.
+"""
+import asyncio
+import os
+import socket
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from supabase import Client
+
+from utils import (
+    enqueue_frontier_urls,
+    lease_frontier_urls,
+    mark_frontier_urls_fetched,
+    complete_frontier_urls,
+    renew_frontier_leases,
+    release_frontier_leases,
+    get_frontier_counts
+)
+
+# URL states reported by workers
+FRONTIER_DONE = "done"
+FRONTIER_FAILED = "failed"
+
+
+def new_worker_id() -> str:
+    """Return an ID that identifies this worker across hosts: hostname, process ID and a random suffix."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class DistributedFrontier:
+    """
+    One worker's handle on the shared frontier of a distributed crawl.
+
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        worker_id: ID of this worker (default: hostname, process ID and a random suffix)
+        lease_seconds: Seconds a lease lasts unless renewed
+        max_attempts: Number of expired leases after which a URL is marked failed
+    """
+
+    def __init__(self, client: Client, crawl_id: str, worker_id: Optional[str] = None, lease_seconds: int = 300, max_attempts: int = 3):
+        self.client = client
+        self.crawl_id = crawl_id
+        self.worker_id = worker_id or new_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # URL a page was indexed under -> URL it was leased as, for pages that redirected
+        self._leased_as: Dict[str, str] = {}
+
+    @classmethod
+    def from_env(cls, client: Client, crawl_id: str) -> "DistributedFrontier":
+        """Create a frontier handle configured by CRAWL_LEASE_SECONDS and CRAWL_LEASE_MAX_ATTEMPTS."""
+        return cls(
+            client,
+            crawl_id,
+            lease_seconds=int(os.getenv("CRAWL_LEASE_SECONDS", "300")),
+            max_attempts=int(os.getenv("CRAWL_LEASE_MAX_ATTEMPTS", "3"))
+        )
+
+    async def enqueue(self, entries: List[Tuple[str, int, float]]) -> int:
+        """
+        Add URLs to the shared frontier; URLs the crawl has already seen are ignored.
+
+        Args:
+            entries: (url, depth, priority) tuples
+
+        Returns:
+            Number of URLs that were new to the crawl
+        """
+        rows = [{"url": url, "depth": depth, "priority": priority} for url, depth, priority in entries]
+        return await asyncio.to_thread(enqueue_frontier_urls, self.client, self.crawl_id, rows)
+
+    async def lease(self, limit: int) -> List[Tuple[str, int]]:
+        """
+        Lease up to limit URLs, highest priority first.
+
+        Returns:
+            (url, depth) tuples; empty when nothing is queued right now
+        """
+        rows = await asyncio.to_thread(
+            lease_frontier_urls, self.client, self.crawl_id, self.worker_id, limit, self.lease_seconds, self.max_attempts
+        )
+        return [(row["url"], row["depth"]) for row in rows]
+
+    async def fetched(self, leased_url: str, url: str) -> None:
+        """
+        Report that a leased page was fetched and its links queued.
+
+        Other workers stop waiting for it once it can no longer add URLs; it stays
+        leased until it is indexed, so it is crawled again if this worker dies first.
+
+        Args:
+            leased_url: URL as leased
+            url: URL the page will be indexed under, which differs after a redirect
+        """
+        if url != leased_url:
+            self._leased_as[url] = leased_url
+        await asyncio.to_thread(mark_frontier_urls_fetched, self.client, self.crawl_id, self.worker_id, [leased_url])
+
+    async def complete(self, urls: List[str], status: str = FRONTIER_DONE, error: Optional[str] = None) -> None:
+        """
+        Report pages as done or failed, by the URL they were leased or indexed under.
+
+        Args:
+            urls: Leased URLs, or the URLs their pages were indexed under
+            status: FRONTIER_DONE or FRONTIER_FAILED
+            error: Error message for failed URLs
+        """
+        leased = [self._leased_as.pop(url, url) for url in urls]
+        await asyncio.to_thread(complete_frontier_urls, self.client, self.crawl_id, self.worker_id, leased, status, error)
+
+    async def release(self) -> None:
+        """Return every URL this worker still holds to the queue for other workers."""
+        self._leased_as.clear()
+        await asyncio.to_thread(release_frontier_leases, self.client, self.crawl_id, self.worker_id)
+
+    async def counts(self) -> Optional[Dict[str, int]]:
+        """Count the crawl's URLs by state; None if Supabase could not be reached."""
+        return await asyncio.to_thread(get_frontier_counts, self.client, self.crawl_id, self.worker_id)
+
+    async def keep_leases(self) -> None:
+        """Renew this worker's leases every third of the lease duration until cancelled."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await asyncio.to_thread(renew_frontier_leases, self.client, self.crawl_id, self.worker_id, self.lease_seconds)
@@ -0,0 +1,221 @@
+"""
+CPU-bound document processing for the Crawl4AI MCP server.
+
+Chunking, header/metadata extraction, code block extraction and content hashing
+are pure Python and hold the GIL, so after a large crawl they would occupy the
+event loop (or one core, from a thread) for a long time. The functions here only
+depend on the standard library and tiktoken, so a DocumentProcessor can run them
+in worker processes: documents are sent in batches and results come back as each
+batch finishes, which lets post-crawl processing use every core while the event
+loop keeps serving requests.
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from chunking import document_chunk_spans, extract_section_info
+from tokenizer import count_tokens, get_encoding
+
+
+def content_hash(markdown: str) -> str:
+    """Return the SHA-256 hex digest of a page's markdown."""
+    return hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+
+
+def extract_code_blocks(markdown_content: str, min_length: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Extract code blocks from markdown content along with context.
+
+    Args:
+        markdown_content: The markdown content to extract code blocks from
+        min_length: Minimum length of code blocks to extract (default: 1000 characters)
+
+    Returns:
+        List of dictionaries containing code blocks and their context
+    """
+    code_blocks = []
+
+    # Skip if content starts with triple backticks (edge case for files wrapped in backticks)
+    content = markdown_content.strip()
+    start_offset = 0
+    if content.startswith('```'):
+        # Skip the first triple backticks
+        start_offset = 3
+        print("Skipping initial triple backticks")
+
+    # Find all occurrences of triple backticks
+    backtick_positions = []
+    pos = start_offset
+    while True:
+        pos = markdown_content.find('```', pos)
+        if pos == -1:
+            break
+        backtick_positions.append(pos)
+        pos += 3
+
+    # Process pairs of backticks
+    i = 0
+    while i < len(backtick_positions) - 1:
+        start_pos = backtick_positions[i]
+        end_pos = backtick_positions[i + 1]
+
+        # Extract the content between backticks
+        code_section = markdown_content[start_pos+3:end_pos]
+
+        # Check if there's a language specifier on the first line
+        lines = code_section.split('\n', 1)
+        if len(lines) > 1:
+            # Check if first line is a language specifier (no spaces, common language names)
+            first_line = lines[0].strip()
+            if first_line and not ' ' in first_line and len(first_line) < 20:
+                language = first_line
+                code_content = lines[1].strip() if len(lines) > 1 else ""
+            else:
+                language = ""
+                code_content = code_section.strip()
+        else:
+            language = ""
+            code_content = code_section.strip()
+
+        # Skip if code block is too short
+        if len(code_content) < min_length:
+            i += 2  # Move to next pair
+            continue
+
+        # Extract context before (1000 chars)
+        context_start = max(0, start_pos - 1000)
+        context_before = markdown_content[context_start:start_pos].strip()
+
+        # Extract context after (1000 chars)
+        context_end = min(len(markdown_content), end_pos + 3 + 1000)
+        context_after = markdown_content[end_pos + 3:context_end].strip()
+
+        code_blocks.append({
+            'code': code_content,
+            'language': language,
+            'context_before': context_before,
+            'context_after': context_after,
+            'full_context': f"{context_before}\n\n{code_content}\n\n{context_after}"
+        })
+
+        # Move to next pair (skip the closing backtick we just processed)
+        i += 2
+
+    return code_blocks
+
+
+# Arguments of process_document: (url, markdown, chunk_size, crawl_type, crawl_time, extract_code)
+DocumentTask = Tuple[str, str, int, str, str, bool]
+
+
+def process_document(url: str, markdown: str, chunk_size: int, crawl_type: str, crawl_time: str, extract_code: bool) -> Dict[str, Any]:
+    """
+    Chunk a document and extract everything the indexing pipeline needs from it.
+
+    Args:
+        url: URL the document is indexed under
+        markdown: Markdown content
+        chunk_size: Maximum size of each content chunk in characters (see document_chunk_spans)
+        crawl_type: Value recorded in the crawl_type metadata field
+        crawl_time: Value recorded in the crawl_time metadata field
+        extract_code: Whether to extract code blocks
+
+    Returns:
+        Dictionary with chunks, per-chunk metadata (without the source), the total
+        word count, the chunks' embedding tokens, code blocks and the content hash
+    """
+    chunks = [markdown[start:end] for start, end in document_chunk_spans(markdown, chunk_size)]
+    metadatas = []
+    word_count = 0
+    for i, chunk in enumerate(chunks):
+        meta = extract_section_info(chunk)
+        meta["chunk_index"] = i
+        meta["url"] = url
+        meta["crawl_type"] = crawl_type
+        meta["crawl_time"] = crawl_time
+        metadatas.append(meta)
+        word_count += meta.get("word_count", 0)
+
+    return {
+        "chunks": chunks,
+        "metadatas": metadatas,
+        "word_count": word_count,
+        "token_count": sum(count_tokens(chunk) for chunk in chunks),
+        "code_blocks": extract_code_blocks(markdown) if extract_code else [],
+        "content_hash": content_hash(markdown)
+    }
+
+
+def process_documents(tasks: List[DocumentTask]) -> List[Dict[str, Any]]:
+    """Process a batch of documents; runs inside a worker process."""
+    return [process_document(*task) for task in tasks]
+
+
+def _warm_up() -> None:
+    # Load the tokenizer now rather than while the first batch waits
+    get_encoding()
+
+
+class DocumentProcessor:
+    """
+    Process pool for CPU-bound document processing.
+
+    Workers are forked from a fork server: a fresh interpreter started by start()
+    that imports the main module and this one, then forks a worker per request.
+    Workers therefore share the imported modules without inheriting the server's
+    event loop, browsers, threads or CUDA context, none of which survive a fork
+    safely. Where fork servers are unavailable workers are spawned. With
+    max_workers=0 documents are processed in a thread instead.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max(0, max_workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls) -> "DocumentProcessor":
+        """Create a processor with CRAWL_PROCESS_WORKERS workers (default: one per core but one)."""
+        default_workers = max(1, (os.cpu_count() or 2) - 1)
+        return cls(int(os.getenv("CRAWL_PROCESS_WORKERS", str(default_workers))))
+
+    def start(self) -> None:
+        """
+        Start the worker processes and wait until each has loaded the tokenizer.
+
+        This blocks while the fork server imports the main module, so call it from a
+        thread when an event loop is running.
+        """
+        if self.max_workers == 0 or self._pool is not None:
+            return
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["__main__", "document_processing"])
+        else:
+            context = multiprocessing.get_context("spawn")
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        # Start every worker now rather than while the first batch waits
+        for future in [self._pool.submit(_warm_up) for _ in range(self.max_workers)]:
+            future.result()
+
+    def close(self) -> None:
+        """Stop the worker processes, dropping queued batches."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def process(self, tasks: List[DocumentTask]) -> List[Dict[str, Any]]:
+        """
+        Process a batch of documents in a worker process.
+
+        Args:
+            tasks: process_document arguments for each document
+
+        Returns:
+            process_document results in the same order
+        """
+        if self._pool is None:
+            return await asyncio.to_thread(process_documents, tasks)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, process_documents, tasks)
@@ -0,0 +1,261 @@
+"""
+Per-URL fetch state for conditional re-crawls.
+
+The crawl_state table remembers, for every indexed URL, the validators the server
+sent (ETag, Last-Modified), the sitemap <lastmod>, a hash of the page markdown and
+the page's internal links. A re-crawl uses that state to skip pages that have not
+changed, without rendering them in the browser when a validator or lastmod proves it.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from supabase import Client
+
+from utils import get_crawl_states, upsert_crawl_states, touch_crawl_states
+from document_processing import content_hash
+
+
+def header_value(headers: Optional[Dict[str, Any]], name: str) -> Optional[str]:
+    """Look up a response header case-insensitively."""
+    if not headers:
+        return None
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return str(value)
+    return None
+
+
+def page_state(url: str, markdown: str, page_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the minimal crawl_state row for a page: its source, content hash and crawl time.
+
+    Args:
+        url: URL the page is indexed under
+        markdown: The page markdown
+        page_hash: Content hash of the markdown, if already computed
+
+    Returns:
+        Dictionary ready to be upserted into crawl_state
+    """
+    parsed_url = urlparse(url)
+    return {
+        "url": url,
+        "source_id": parsed_url.netloc or parsed_url.path,
+        "content_hash": page_hash or content_hash(markdown),
+        "canonical_url": None,
+        "last_crawled_at": datetime.now(timezone.utc).isoformat()
+    }
+
+
+class FetchStateTracker:
+    """
+    Decides which URLs a crawl can skip and builds the state to persist for the rest.
+
+    A URL is considered unchanged before fetching when its sitemap <lastmod> matches
+    the stored one, or when a conditional HEAD request returns 304 or the stored ETag.
+    After fetching, a page whose markdown hash matches the stored hash is unchanged too.
+    Skipping only happens when skip_unchanged is set; state is built either way so the
+    next crawl can use it. Conditional requests go through the given shared
+    httpx client, or a short-lived one when there is none.
+
+    Stored state and sitemap lastmod values are keyed by canonical URL (the
+    crawl's UrlPolicy.try_canonicalize), so a page is found again whether it is
+    looked up under the URL it was queued as or the one it was fetched from.
+    """
+
+    def __init__(
+        self,
+        supabase_client: Client,
+        skip_unchanged: bool = False,
+        sitemap_lastmods: Optional[Dict[str, str]] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        canonicalize: Optional[Callable[[str], Optional[str]]] = None
+    ):
+        self.supabase_client = supabase_client
+        self.skip_unchanged = skip_unchanged
+        self.client = client
+        self.canonicalize = canonicalize
+        self.sitemap_lastmods = sitemap_lastmods or {}
+        self.unchanged_count = 0
+        self._previous: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def key(self, url: str) -> str:
+        """Return the canonical URL that state for a URL is stored and looked up under."""
+        if self.canonicalize is None:
+            return url
+        return self.canonicalize(url) or url
+
+    async def load(self, urls: List[str]) -> None:
+        """
+        Prefetch the stored state for a known list of URLs in bulk.
+
+        Args:
+            urls: URLs that are about to be crawled
+        """
+        if not self.skip_unchanged or not urls:
+            return
+        keys = list(dict.fromkeys(map(self.key, urls)))
+        states = await asyncio.to_thread(get_crawl_states, self.supabase_client, keys)
+        for key in keys:
+            self._previous[key] = states.get(key)
+
+    async def previous_state(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the stored state for a URL, querying Supabase if it was not prefetched."""
+        key = self.key(url)
+        if key not in self._previous:
+            states = await asyncio.to_thread(get_crawl_states, self.supabase_client, [key])
+            self._previous[key] = states.get(key)
+        return self._previous[key]
+
+    async def unchanged_before_fetch(self, url: str, rate_limiter: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        Check whether a URL can be skipped without fetching it.
+
+        Args:
+            url: URL about to be crawled
+            rate_limiter: Optional HostRateLimiter the conditional request waits on
+
+        Returns:
+            The stored state if the page is known to be unchanged, otherwise None
+        """
+        if not self.skip_unchanged:
+            return None
+        previous = await self.previous_state(url)
+        if not previous or not previous.get("content_hash"):
+            return None
+
+        lastmod = self.sitemap_lastmods.get(self.key(url))
+        if lastmod and previous.get("sitemap_lastmod") == lastmod:
+            return previous
+
+        etag = previous.get("etag")
+        last_modified = previous.get("last_modified")
+        if not etag and not last_modified:
+            return None
+
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        if rate_limiter is None:
+            unchanged = await self._head_unchanged(url, headers, etag)
+        else:
+            async with rate_limiter.acquire(url):
+                unchanged = await self._head_unchanged(url, headers, etag)
+        return previous if unchanged else None
+
+    async def _head_unchanged(self, url: str, headers: Dict[str, str], etag: Optional[str]) -> bool:
+        try:
+            if self.client is None:
+                async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
+                    resp = await client.head(url, headers=headers)
+            else:
+                resp = await self.client.head(url, headers=headers, follow_redirects=True, timeout=10.0)
+        except Exception as e:
+            print(f"Conditional request failed for {url}: {e}")
+            return False
+        if resp.status_code == 304:
+            return True
+        if resp.status_code == 200 and etag and resp.headers.get("ETag") == etag:
+            return True
+        return False
+
+    def build_state(self, url: str, result: Any, markdown: str) -> Dict[str, Any]:
+        """
+        Build the crawl_state row for a freshly fetched page, keyed by its canonical URL.
+
+        Args:
+            url: URL the page is indexed under
+            result: The Crawl4AI crawl result
+            markdown: The page markdown
+
+        Returns:
+            Dictionary ready to be upserted into crawl_state
+        """
+        headers = getattr(result, "response_headers", None)
+        links = getattr(result, "links", None) or {}
+        key = self.key(url)
+        state = page_state(key, markdown)
+        state.update({
+            "etag": header_value(headers, "ETag"),
+            "last_modified": header_value(headers, "Last-Modified"),
+            "sitemap_lastmod": self.sitemap_lastmods.get(key),
+            "internal_links": [link["href"] for link in links.get("internal", []) if link.get("href")]
+        })
+        return state
+
+    async def unchanged_after_fetch(self, state: Dict[str, Any]) -> bool:
+        """
+        Check whether freshly fetched content matches what is already indexed.
+
+        Args:
+            state: State built by build_state for the fetched page
+
+        Returns:
+            True if the page can be skipped instead of re-indexed
+        """
+        if not self.skip_unchanged:
+            return False
+        previous = await self.previous_state(state["url"])
+        return bool(previous) and previous.get("content_hash") == state["content_hash"]
+
+    async def mark_unchanged(self, url: str, state: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Count a skipped URL and refresh its stored state.
+
+        Args:
+            url: URL that was skipped
+            state: Fresh state if the page was fetched (keeps new validators), otherwise None
+        """
+        self.unchanged_count += 1
+        if state is not None:
+            await asyncio.to_thread(upsert_crawl_states, self.supabase_client, [state])
+        else:
+            await asyncio.to_thread(touch_crawl_states, self.supabase_client, [self.key(url)])
+
+
+class PageDeduplicator:
+    """
+    Detects pages whose markdown is identical to a page already indexed in this crawl.
+
+    The first page stored with a given content hash is the canonical page; later
+    URLs with the same hash become aliases of it. Only pages queued for storage in
+    the current run are registered as canonical, so a page is never aliased to one
+    that was dropped (e.g. by the crawl budget) or whose content a previous crawl
+    recorded but may have changed since.
+    """
+
+    def __init__(self, supabase_client: Client):
+        self.supabase_client = supabase_client
+        self.duplicate_count = 0
+        self._canonical_by_hash: Dict[str, str] = {}
+
+    def canonical_for(self, url: str, page_hash: str) -> Optional[str]:
+        """
+        Find the canonical page a URL duplicates.
+
+        Args:
+            url: URL of the fetched page
+            page_hash: Content hash of the page markdown
+
+        Returns:
+            The canonical URL if the page is a duplicate, otherwise None
+        """
+        canonical = self._canonical_by_hash.get(page_hash)
+        return None if canonical is None or canonical == url else canonical
+
+    def register(self, url: str, page_hash: str) -> None:
+        """
+        Record a page that is being stored as the canonical page for its content.
+
+        Args:
+            url: URL of the stored page
+            page_hash: Content hash of the page markdown
+        """
+        self._canonical_by_hash.setdefault(page_hash, url)
@@ -0,0 +1,197 @@
+"""
+Per-host politeness for the Crawl4AI MCP server.
+
+A single HostRateLimiter is shared by every crawl tool in the process, so two
+concurrent crawls of the same site share one request budget instead of each
+bringing their own. Each host's in-flight limit adapts to how the host responds
+(see adaptive_concurrency).
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlparse
+
+from robots import RobotsCache
+from adaptive_concurrency import AdaptiveConcurrency, ConcurrencySlot, adaptive_settings_from_env
+
+
+@dataclass
+class HostState:
+    """Token bucket and in-flight accounting for one host."""
+    concurrency: AdaptiveConcurrency
+    tokens: float
+    updated: float
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    crawl_delay: Optional[float] = None
+    crawl_delay_loaded: bool = False
+
+
+class HostRateLimiter:
+    """
+    Process-wide token-bucket rate limiter keyed by host.
+
+    Each host gets `requests_per_second` tokens per second (up to `burst` saved up)
+    and starts with at most `max_in_flight_per_host` concurrent requests. With
+    `adaptive` set, that limit grows up to `max_in_flight_ceiling` while the host
+    answers quickly and is halved when it times out or returns 429 or 5xx. When a host's
+    robots.txt declares a Crawl-delay (read through the shared RobotsCache), its
+    rate is lowered to one request per delay.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = 5.0,
+        burst: int = 5,
+        max_in_flight_per_host: int = 5,
+        respect_crawl_delay: bool = True,
+        robots: Optional[RobotsCache] = None,
+        adaptive: bool = True,
+        max_in_flight_ceiling: Optional[int] = None,
+        latency_target: float = 30.0
+    ):
+        self.requests_per_second = requests_per_second
+        self.burst = max(1, burst)
+        self.max_in_flight_per_host = max(1, max_in_flight_per_host)
+        self.max_in_flight_ceiling = max(self.max_in_flight_per_host, max_in_flight_ceiling or 0)
+        self.adaptive = adaptive
+        self.latency_target = latency_target
+        self.respect_crawl_delay = respect_crawl_delay
+        self.robots = robots
+        self._hosts: Dict[str, HostState] = {}
+
+    @classmethod
+    def from_env(cls, robots: Optional[RobotsCache] = None) -> "HostRateLimiter":
+        """Create a limiter configured from CRAWL_HOST_* environment variables."""
+        return cls(
+            requests_per_second=float(os.getenv("CRAWL_HOST_REQUESTS_PER_SECOND", "5")),
+            burst=int(os.getenv("CRAWL_HOST_BURST", "5")),
+            max_in_flight_per_host=int(os.getenv("CRAWL_HOST_MAX_IN_FLIGHT", "5")),
+            respect_crawl_delay=os.getenv("CRAWL_RESPECT_CRAWL_DELAY", "true") == "true",
+            robots=robots,
+            max_in_flight_ceiling=int(os.getenv("CRAWL_HOST_MAX_IN_FLIGHT_CEILING", "10")),
+            **adaptive_settings_from_env()
+        )
+
+    def _state(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = HostState(
+                concurrency=AdaptiveConcurrency(
+                    self.max_in_flight_per_host,
+                    maximum=self.max_in_flight_ceiling,
+                    adaptive=self.adaptive,
+                    latency_target=self.latency_target
+                ),
+                tokens=float(self.burst),
+                updated=time.monotonic()
+            )
+            self._hosts[host] = state
+        return state
+
+    def set_crawl_delay(self, host: str, delay: Optional[float]) -> None:
+        """
+        Override the Crawl-delay for a host.
+
+        Args:
+            host: Host name (netloc) the delay applies to
+            delay: Seconds between requests, or None to use the default rate
+        """
+        state = self._state(host.lower())
+        state.crawl_delay = delay
+        state.crawl_delay_loaded = True
+
+    async def _load_crawl_delay(self, scheme: str, host: str) -> Optional[float]:
+        """Read the host's Crawl-delay from the cached robots.txt rules."""
+        if self.robots is None:
+            return None
+        try:
+            return await self.robots.crawl_delay(f"{scheme}://{host}/")
+        except Exception as e:
+            print(f"Error reading robots.txt for {host}: {e}")
+            return None
+
+    async def _take_token(self, state: HostState, scheme: str, host: str) -> None:
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with state.lock:
+            if self.respect_crawl_delay and not state.crawl_delay_loaded:
+                state.crawl_delay = await self._load_crawl_delay(scheme, host)
+                state.crawl_delay_loaded = True
+
+            rate = self.requests_per_second
+            capacity = float(self.burst)
+            if state.crawl_delay:
+                rate = min(rate, 1.0 / state.crawl_delay) if rate > 0 else 1.0 / state.crawl_delay
+                capacity = 1.0
+            if rate <= 0:
+                return
+
+            while True:
+                now = time.monotonic()
+                state.tokens = min(capacity, state.tokens + (now - state.updated) * rate)
+                state.updated = now
+                if state.tokens >= 1.0:
+                    state.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - state.tokens) / rate)
+
+    @asynccontextmanager
+    async def acquire(self, url: str) -> AsyncIterator[ConcurrencySlot]:
+        """
+        Wait for permission to send one request to the URL's host.
+
+        Args:
+            url: URL about to be fetched
+
+        Yields:
+            The host's in-flight slot, held until the block exits; record the
+            request's outcome in it to adapt the host's limit
+        """
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        state = self._state(host)
+
+        async with state.concurrency.acquire() as slot:
+            await self._take_token(state, parsed.scheme or "https", host)
+            yield slot
+
+    def host_concurrency(self) -> Dict[str, Dict[str, int]]:
+        """
+        Report the in-flight limit of every host that currently has requests in flight.
+
+        Returns:
+            Dictionary of host -> current limit and requests in flight
+        """
+        return {
+            host: {"effective": state.concurrency.limit, "in_flight": state.concurrency.in_flight}
+            for host, state in self._hosts.items()
+            if state.concurrency.in_flight
+        }
+
+
+def interleave_by_host(urls: List[str]) -> List[str]:
+    """
+    Reorder URLs round-robin across hosts, preserving order within each host.
+
+    Crawling a mixed list in this order lets workers spread over many hosts
+    instead of queueing behind one host's in-flight limit.
+
+    Args:
+        urls: URLs to reorder
+
+    Returns:
+        The same URLs, interleaved by host
+    """
+    by_host: Dict[str, List[str]] = {}
+    for url in urls:
+        by_host.setdefault(urlparse(url).netloc.lower(), []).append(url)
+
+    interleaved = []
+    queues = list(by_host.values())
+    for i in range(max((len(q) for q in queues), default=0)):
+        for queue in queues:
+            if i < len(queue):
+                interleaved.append(queue[i])
+    return interleaved
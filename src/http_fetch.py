@@ -0,0 +1,231 @@
+"""
+Lightweight HTTP fetch path for the Crawl4AI MCP server.
+
+Plain text, markdown and static HTML pages do not need a headless browser. The
+HttpFetcher retrieves them over a pooled keep-alive (and HTTP/2 when available)
+client and converts HTML with Crawl4AI's own scraping and markdown generation, so
+results look the same as browser crawls. Pages that look like they need JavaScript
+are left to the browser.
+"""
+import asyncio
+import importlib.util
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from crawl4ai.content_scraping_strategy import WebScrapingStrategy
+from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+
+TEXT_CONTENT_TYPES = ("text/plain", "text/markdown", "text/x-markdown")
+TEXT_EXTENSIONS = (".md", ".markdown", ".txt")
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Content that no crawl can index; the browser is not asked to try either
+BINARY_CONTENT_TYPES = (
+    "image/", "video/", "audio/", "font/", "application/pdf", "application/zip",
+    "application/gzip", "application/x-tar", "application/octet-stream", "application/msword",
+    "application/vnd."
+)
+
+# Markers of client-side rendered apps whose HTML is an empty shell
+SPA_SHELL_PATTERN = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>'
+    r'|<noscript>[^<]*(?:enable|requires?)\s+javascript',
+    re.IGNORECASE
+)
+
+
+@dataclass
+class HttpFetchResult:
+    """Subset of Crawl4AI's CrawlResult produced without a browser."""
+    url: str
+    success: bool
+    markdown: str = ""
+    links: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    status_code: Optional[int] = None
+    response_headers: Dict[str, str] = field(default_factory=dict)
+    error_message: Optional[str] = None
+
+
+def needs_javascript(html: str, markdown: str) -> bool:
+    """
+    Guess whether a page only renders its content with JavaScript.
+
+    Args:
+        html: Raw HTML returned by the server
+        markdown: Markdown extracted from that HTML
+
+    Returns:
+        True if the page should be rendered in the browser instead
+    """
+    if SPA_SHELL_PATTERN.search(html):
+        return True
+    text_length = len(markdown.strip())
+    script_count = html.lower().count("<script")
+    return text_length < 200 or (script_count > 10 and text_length < 1000)
+
+
+def html_to_page(url: str, html: str) -> Dict[str, Any]:
+    """
+    Convert HTML to markdown and links the same way the browser crawler does.
+
+    Args:
+        url: URL the HTML was fetched from
+        html: Raw HTML
+
+    Returns:
+        Dictionary with "markdown" and "links" ({"internal": [...], "external": [...]})
+    """
+    scraped = WebScrapingStrategy().scrap(url, html)
+    markdown = DefaultMarkdownGenerator().generate_markdown(scraped.cleaned_html, base_url=url).raw_markdown
+
+    links = {}
+    for kind in ("internal", "external"):
+        items = getattr(scraped.links, kind, None)
+        if items is None and isinstance(scraped.links, dict):
+            items = scraped.links.get(kind)
+        links[kind] = [item if isinstance(item, dict) else item.model_dump() for item in items or []]
+    return {"markdown": markdown, "links": links}
+
+
+class HttpFetcher:
+    """
+    Pooled HTTP client that serves text, markdown and static HTML without the browser.
+
+    fetch() returns None whenever the browser should handle the URL instead: HTTP
+    errors, unknown content, or HTML that looks like a client-side rendered app.
+    Binary content (PDFs, images, archives, ...) fails fast without its body being
+    downloaded. Once
+    most pages of a host turn out to need JavaScript, that host goes straight to
+    the browser.
+    """
+
+    def __init__(self, max_connections: int = 100, timeout: float = 30.0):
+        self.client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections // 2),
+            headers={"User-Agent": "Mozilla/5.0 (compatible; crawl4ai-mcp)"}
+        )
+        self.fast_path_count = 0
+        self.fallback_count = 0
+        self._js_pages: Dict[str, int] = {}
+        self._static_pages: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["HttpFetcher"]:
+        """Create a fetcher unless CRAWL_HTTP_FAST_PATH is set to false."""
+        if os.getenv("CRAWL_HTTP_FAST_PATH", "true") != "true":
+            return None
+        return cls()
+
+    async def close(self) -> None:
+        """Close the pooled HTTP client."""
+        await self.client.aclose()
+
+    def wants(self, url: str) -> bool:
+        """Check whether a URL should be tried over plain HTTP before the browser."""
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https"):
+            return False
+        if parsed.path.lower().endswith(TEXT_EXTENSIONS):
+            return True
+        host = parsed.netloc.lower()
+        js_pages = self._js_pages.get(host, 0)
+        return js_pages < 3 or js_pages <= self._static_pages.get(host, 0)
+
+    def _fallback(self, host: Optional[str] = None) -> None:
+        self.fallback_count += 1
+        if host:
+            self._js_pages[host] = self._js_pages.get(host, 0) + 1
+
+    async def fetch(self, url: str, final_client_errors: bool = False) -> Optional[HttpFetchResult]:
+        """
+        Fetch a URL over plain HTTP if it does not need a browser.
+
+        Args:
+            url: URL to fetch
+            final_client_errors: Treat a 4xx response (other than 408 and 429) as the
+                final answer, e.g. for optional files that most sites do not have
+
+        Returns:
+            HttpFetchResult (failed for binary content and final client errors), or None
+            if the browser should crawl the URL
+        """
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        is_text_url = parsed.path.lower().endswith(TEXT_EXTENSIONS)
+
+        try:
+            # Stream so the body is only downloaded once the headers show it is worth it
+            async with self.client.stream("GET", url) as response:
+                content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                headers = dict(response.headers)
+                final_url = str(response.url)
+
+                if response.status_code == 200 and content_type.startswith(BINARY_CONTENT_TYPES):
+                    return HttpFetchResult(
+                        url=final_url,
+                        success=False,
+                        status_code=response.status_code,
+                        response_headers=headers,
+                        error_message=f"Skipped non-document content ({content_type})"
+                    )
+                if final_client_errors and 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                    return HttpFetchResult(
+                        url=final_url,
+                        success=False,
+                        status_code=response.status_code,
+                        response_headers=headers,
+                        error_message=f"HTTP {response.status_code}"
+                    )
+                if response.status_code != 200 or not content_type.startswith("text/") and content_type not in HTML_CONTENT_TYPES:
+                    self._fallback()
+                    return None
+                await response.aread()
+        except Exception as e:
+            print(f"HTTP fetch failed for {url}, using browser: {e}")
+            self._fallback()
+            return None
+
+        if content_type in TEXT_CONTENT_TYPES or (is_text_url and content_type.startswith("text/") and content_type != "text/html"):
+            self.fast_path_count += 1
+            return HttpFetchResult(
+                url=final_url,
+                success=True,
+                markdown=response.text,
+                links={"internal": [], "external": []},
+                status_code=response.status_code,
+                response_headers=headers
+            )
+
+        if content_type not in HTML_CONTENT_TYPES:
+            self._fallback()
+            return None
+
+        html = response.text
+        try:
+            page = await asyncio.to_thread(html_to_page, final_url, html)
+        except Exception as e:
+            print(f"HTML conversion failed for {url}, using browser: {e}")
+            self._fallback()
+            return None
+
+        if needs_javascript(html, page["markdown"]):
+            self._fallback(host)
+            return None
+
+        self.fast_path_count += 1
+        self._static_pages[host] = self._static_pages.get(host, 0) + 1
+        return HttpFetchResult(
+            url=final_url,
+            success=True,
+            markdown=page["markdown"],
+            links=page["links"],
+            status_code=response.status_code,
+            response_headers=headers
+        )
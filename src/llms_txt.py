@@ -0,0 +1,131 @@
+"""
+llms.txt support for the Crawl4AI MCP server.
+
+An llms.txt file (https://llmstxt.org) is a markdown index of a site's documentation:
+a title, a short summary and lists of links to markdown versions of the pages. Many
+sites also publish llms-full.txt next to it, with all of those pages concatenated.
+This module finds the documents an llms.txt links to and strips from llms-full.txt
+the sections already covered by them, so a crawl that indexes both does not store
+the same text twice.
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import List, Set, Tuple
+from urllib.parse import urljoin, urlparse, urlunparse
+
+# [title](url) or [title](<url> "optional title")
+MARKDOWN_LINK_PATTERN = re.compile(r'\[[^\]]*\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+
+# Links to these are followed even when they point to another host
+DOCUMENT_EXTENSIONS = (".md", ".markdown", ".mdx", ".txt")
+
+# Fraction of a llms-full.txt section's paragraphs that must appear in the linked
+# documents for the section to count as already indexed
+COVERED_THRESHOLD = 0.8
+
+
+def is_llms_txt(url: str) -> bool:
+    """Check whether a URL points to an llms.txt index (not llms-full.txt)."""
+    return urlparse(url).path.rsplit("/", 1)[-1].lower() == "llms.txt"
+
+
+def llms_full_url(url: str) -> str:
+    """Return the URL of the llms-full.txt next to an llms.txt."""
+    parsed = urlparse(url)
+    path = parsed.path.rsplit("/", 1)[0] + "/llms-full.txt"
+    return urlunparse(parsed._replace(path=path, query="", fragment=""))
+
+
+def parse_llms_txt(markdown: str, base_url: str) -> List[str]:
+    """
+    Extract the document links of an llms.txt file.
+
+    Relative links are resolved against the file's URL. Links on the same host are
+    kept, as are markdown and text files on other hosts; links to other sites' web
+    pages, to the llms.txt files themselves and duplicates are dropped.
+
+    Args:
+        markdown: Content of the llms.txt file
+        base_url: URL the file was fetched from
+
+    Returns:
+        Absolute URLs in the order they appear
+    """
+    host = urlparse(base_url).netloc.lower()
+    own_files = {base_url.split("#", 1)[0], llms_full_url(base_url)}
+    links = []
+    for match in MARKDOWN_LINK_PATTERN.finditer(markdown):
+        url = urljoin(base_url, match.group(1)).split("#", 1)[0]
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or url in own_files:
+            continue
+        if parsed.netloc.lower() != host and not parsed.path.lower().endswith(DOCUMENT_EXTENSIONS):
+            continue
+        links.append(url)
+    return list(dict.fromkeys(links))
+
+
+def _paragraph_hashes(markdown: str) -> List[str]:
+    """Hash every paragraph of a markdown text, ignoring whitespace differences."""
+    hashes = []
+    for paragraph in re.split(r"\n\s*\n", markdown):
+        normalized = " ".join(paragraph.split())
+        if normalized:
+            hashes.append(hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest())
+    return hashes
+
+
+def _sections(markdown: str) -> List[str]:
+    """Split markdown into sections, each starting at a top-level (#) heading outside code blocks."""
+    sections, current, in_code = [], [], False
+    for line in markdown.split("\n"):
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        if not in_code and line.startswith("# ") and current:
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+@dataclass
+class LlmsTxtStats:
+    """What an llms.txt crawl found: linked documents and the llms-full.txt sections they made redundant."""
+    links: int = 0
+    full_text_found: bool = False
+    full_sections_deduplicated: int = 0
+
+
+class CoveredText:
+    """The paragraphs of documents already indexed by a crawl, for deduplicating llms-full.txt."""
+
+    def __init__(self):
+        self._hashes: Set[str] = set()
+
+    def add(self, markdown: str) -> None:
+        """Record a document's paragraphs as covered."""
+        self._hashes.update(_paragraph_hashes(markdown))
+
+    def remove_covered_sections(self, markdown: str, threshold: float = COVERED_THRESHOLD) -> Tuple[str, int]:
+        """
+        Drop the sections of a concatenated document that the covered documents already contain.
+
+        Args:
+            markdown: Content of llms-full.txt
+            threshold: Fraction of a section's paragraphs that must be covered to drop it
+
+        Returns:
+            The remaining markdown and the number of sections dropped
+        """
+        kept, dropped = [], 0
+        for section in _sections(markdown):
+            hashes = _paragraph_hashes(section)
+            if hashes and sum(h in self._hashes for h in hashes) >= threshold * len(hashes):
+                dropped += 1
+            else:
+                kept.append(section)
+        return "\n".join(kept).strip(), dropped
+
@@ -0,0 +1,143 @@
+"""
+Local crawl cache for the Crawl4AI MCP server.
+
+Every page that reaches the indexing pipeline is saved on disk, so a site can be
+re-chunked and re-embedded (after changing chunk_size, the embedding model or the
+contextual embedding settings) without fetching it again. Markdown is stored
+gzip-compressed and content-addressed by its SHA-256, so unchanged pages fetched
+many times take the space of one copy. A SQLite index records every fetch by URL
+and fetch time and points at the content it produced.
+"""
+import gzip
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+SCHEMA = """
+create table if not exists cached_pages (
+    url text not null,
+    fetched_at text not null,
+    content_hash text not null,
+    source_id text not null,
+    crawl_type text not null,
+    primary key (url, fetched_at)
+);
+
+create index if not exists idx_cached_pages_source on cached_pages (source_id, url);
+"""
+
+
+class PageCache:
+    """
+    Content-addressed on-disk store of crawled markdown.
+
+    Methods are blocking (file and SQLite I/O); call them through asyncio.to_thread
+    from the event loop. A lock keeps the shared connection safe across threads.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> Optional["PageCache"]:
+        """Open the cache at CRAWL_CACHE_DIR unless CRAWL_CACHE is set to false."""
+        if os.getenv("CRAWL_CACHE", "true") != "true":
+            return None
+        return cls(os.getenv("CRAWL_CACHE_DIR", "crawl_cache"))
+
+    def close(self) -> None:
+        """Close the index database."""
+        with self._lock:
+            self._conn.close()
+
+    def _object_path(self, content_hash: str) -> str:
+        return os.path.join(self.root, "objects", content_hash[:2], f"{content_hash}.md.gz")
+
+    def put(self, url: str, markdown: str, crawl_type: str) -> str:
+        """
+        Save a fetched page.
+
+        Args:
+            url: URL the page was indexed under
+            markdown: Markdown content of the page
+            crawl_type: The crawl strategy that fetched the page
+
+        Returns:
+            SHA-256 of the markdown, under which the content is stored
+        """
+        data = markdown.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._object_path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a truncated object
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(gzip.compress(data, compresslevel=6))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+        parsed = urlparse(url)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "insert or replace into cached_pages (url, fetched_at, content_hash, source_id, crawl_type) values (?, ?, ?, ?, ?)",
+                (url, datetime.now(timezone.utc).isoformat(), content_hash, parsed.netloc or parsed.path, crawl_type)
+            )
+        return content_hash
+
+    def read(self, content_hash: str) -> str:
+        """
+        Load cached markdown.
+
+        Args:
+            content_hash: Hash returned by put()
+
+        Returns:
+            The markdown content
+        """
+        with open(self._object_path(content_hash), "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+
+    def latest_pages(self, source_id: Optional[str] = None, url_prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List the most recent fetch of every cached URL.
+
+        Args:
+            source_id: Only include pages of this source (domain)
+            url_prefix: Only include URLs starting with this prefix
+
+        Returns:
+            Dictionaries with url, fetched_at, content_hash, source_id and crawl_type
+        """
+        conditions = []
+        params: List[Any] = []
+        if source_id:
+            conditions.append("source_id = ?")
+            params.append(source_id)
+        if url_prefix:
+            conditions.append("substr(url, 1, ?) = ?")
+            params.extend([len(url_prefix), url_prefix])
+        where = f"where {' and '.join(conditions)}" if conditions else ""
+        # SQLite takes the bare columns from the row holding max(fetched_at)
+        sql = (
+            "select url, max(fetched_at) as fetched_at, content_hash, source_id, crawl_type "
+            f"from cached_pages {where} group by url order by url"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
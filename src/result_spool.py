@@ -0,0 +1,126 @@
+"""
+Memory-bounded holding area for crawl results.
+
+Crawled pages wait in the indexing pipeline's queues (and, for crawls that are not
+streamed, in the list of collected results) until they are chunked and embedded.
+A ResultSpool keeps those waiting results in memory up to a byte budget shared by
+every crawl in the server; results arriving past it are pickled to temporary files
+and read back only when the pipeline takes them, so a crawl of large pages cannot
+exhaust the memory of the server container.
+"""
+import asyncio
+import os
+import pickle
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+def result_size(item: Dict[str, Any]) -> int:
+    """Approximate the memory held by a pipeline item: its markdown, chunks and code blocks."""
+    size = len(item.get("markdown") or "")
+    size += sum(len(chunk) for chunk in item.get("chunks") or ())
+    for block in item.get("code_blocks") or ():
+        size += len(block["code"]) + len(block["full_context"])
+    return size
+
+
+@dataclass
+class SpoolEntry:
+    """A result held by a ResultSpool, either in memory or in a file."""
+    size: int
+    item: Optional[Dict[str, Any]] = None
+    path: Optional[str] = None
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+
+class ResultSpool:
+    """
+    Holds crawl results in memory up to a byte budget and on disk beyond it.
+
+    The budget is accounted on the event loop, so cancelling a crawl mid-write
+    never leaks any of it; only file reads and writes run in worker threads.
+    """
+
+    def __init__(self, memory_budget: int, directory: Optional[str] = None):
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self._dir = tempfile.mkdtemp(prefix="crawl-results-", dir=directory)
+
+    @classmethod
+    def from_env(cls) -> "ResultSpool":
+        """Create a spool with a CRAWL_RESULT_MEMORY_MB budget (default 256) spilling to CRAWL_SPILL_DIR."""
+        budget_mb = float(os.getenv("CRAWL_RESULT_MEMORY_MB", "256"))
+        return cls(int(budget_mb * 1024 * 1024), directory=os.getenv("CRAWL_SPILL_DIR") or None)
+
+    def close(self) -> None:
+        """Delete every spilled result."""
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    @staticmethod
+    def _write(fd: int, item: Dict[str, Any]) -> None:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(item, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, Any]:
+        with open(path, "rb") as f:
+            item = pickle.load(f)
+        os.unlink(path)
+        return item
+
+    async def hold(self, item: Dict[str, Any]) -> SpoolEntry:
+        """
+        Keep a result until take() is called, in memory if it fits in the budget.
+
+        Args:
+            item: Pipeline item, e.g. a crawled document or a prepared document
+
+        Returns:
+            SpoolEntry to pass to take() or discard()
+        """
+        size = result_size(item)
+        if self.memory_used + size <= self.memory_budget:
+            self.memory_used += size
+            return SpoolEntry(size, item=item)
+        # Create the file here so it can be removed even if the write is cancelled
+        fd, path = tempfile.mkstemp(dir=self._dir, suffix=".pickle")
+        try:
+            await asyncio.to_thread(self._write, fd, item)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return SpoolEntry(size, path=path)
+
+    async def take(self, entry: SpoolEntry) -> Dict[str, Any]:
+        """
+        Release a held result and return it, reading it back from disk if it was spilled.
+
+        Args:
+            entry: Entry returned by hold()
+
+        Returns:
+            The result passed to hold()
+        """
+        if entry.path is None:
+            item = entry.item
+            self.discard(entry)
+            return item
+        path, entry.path = entry.path, None
+        return await asyncio.to_thread(self._read, path)
+
+    def discard(self, entry: SpoolEntry) -> None:
+        """Release a held result without reading it, e.g. when its crawl is cancelled."""
+        if entry.path is not None:
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+            entry.path = None
+        elif entry.item is not None:
+            self.memory_used -= entry.size
+            entry.item = None
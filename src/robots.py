@@ -0,0 +1,221 @@
+"""
+Cached robots.txt evaluation for the Crawl4AI MCP server.
+
+Each host's robots.txt is fetched once, compiled into matching rules and kept for
+a TTL, so checking a URL before it enters the frontier costs a dictionary lookup and
+a few regex matches. Rules follow RFC 9309: the group for our user agent (or "*")
+applies, "*" and "$" wildcards are supported, and the longest matching rule wins,
+with Allow winning ties. The group's Crawl-delay is exposed for rate limiting.
+"""
+import asyncio
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+
+@dataclass
+class RobotsRules:
+    """Compiled rules of the robots.txt group that applies to us."""
+    rules: List[Tuple[int, bool, Pattern]] = field(default_factory=list)
+    crawl_delay: Optional[float] = None
+
+    def allows(self, path: str) -> bool:
+        """
+        Check whether a path (with query string) may be crawled.
+
+        Args:
+            path: URL path, including the query string if any
+
+        Returns:
+            True unless the longest matching rule is a Disallow
+        """
+        for _, allow, pattern in self.rules:
+            if pattern.match(path):
+                return allow
+        return True
+
+
+def compile_rule(value: str) -> Pattern:
+    """Compile a robots.txt path pattern with "*" and "$" wildcards into a regex."""
+    anchored = value.endswith("$")
+    if anchored:
+        value = value[:-1]
+    regex = "".join(".*" if ch == "*" else re.escape(ch) for ch in value)
+    return re.compile(regex + (r"\Z" if anchored else ""))
+
+
+def product_token(user_agent: str) -> str:
+    """Return the lowercased product token of a user agent string ("Crawl4AI/0.6" -> "crawl4ai")."""
+    return user_agent.split("/", 1)[0].strip().lower()
+
+
+def parse_robots(text: str, user_agent: str) -> RobotsRules:
+    """
+    Parse robots.txt and compile the rules of the group that applies to a user agent.
+
+    Groups naming the user agent take precedence over the "*" group; several
+    matching groups are merged.
+
+    Args:
+        text: Content of robots.txt
+        user_agent: Product token of our crawler, e.g. "crawl4ai" (a version after "/" is ignored)
+
+    Returns:
+        RobotsRules for the user agent
+    """
+    token = product_token(user_agent)
+    groups: List[Tuple[List[str], List[Tuple[bool, str]], Optional[float]]] = []
+    agents: List[str] = []
+    rules: List[Tuple[bool, str]] = []
+    delay: Optional[float] = None
+    in_rules = False
+
+    for raw_line in text.splitlines():
+        line = raw_line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        name, value = (part.strip() for part in line.split(":", 1))
+        name = name.lower()
+        if name == "user-agent":
+            if in_rules:
+                groups.append((agents, rules, delay))
+                agents, rules, delay, in_rules = [], [], None, False
+            agents.append(value if value == "*" else product_token(value))
+        elif name in ("allow", "disallow") and agents:
+            in_rules = True
+            if value:
+                rules.append((name == "allow", value))
+        elif name == "crawl-delay" and agents:
+            in_rules = True
+            try:
+                delay = float(value)
+            except ValueError:
+                pass
+    if agents:
+        groups.append((agents, rules, delay))
+
+    matching = [g for g in groups if token in g[0]]
+    if not matching:
+        matching = [g for g in groups if "*" in g[0]]
+
+    compiled = RobotsRules()
+    for _, group_rules, group_delay in matching:
+        for allow, value in group_rules:
+            compiled.rules.append((len(value), allow, compile_rule(value)))
+        if group_delay is not None:
+            compiled.crawl_delay = group_delay
+    # Longest rule first; Allow before Disallow for rules of the same length
+    compiled.rules.sort(key=lambda rule: (-rule[0], not rule[1]))
+    return compiled
+
+
+class RobotsCache:
+    """
+    Process-wide robots.txt cache keyed by scheme and host.
+
+    A missing robots.txt (4xx) allows everything. One that cannot be fetched
+    (network error or 5xx) also allows everything but is only cached for
+    error_ttl seconds, so a temporary outage neither blocks nor is trusted for long.
+    Concurrent lookups for the same host share one download.
+    """
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        user_agent: str = "crawl4ai",
+        ttl: float = 3600.0,
+        error_ttl: float = 60.0,
+        enforce: bool = True
+    ):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.enforce = enforce
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(follow_redirects=True, timeout=10.0)
+        self._cache: Dict[str, Tuple[float, RobotsRules]] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def from_env(cls, client: Optional[httpx.AsyncClient] = None) -> "RobotsCache":
+        """Create a cache configured from CRAWL_ROBOTS_* environment variables."""
+        return cls(
+            client=client,
+            user_agent=os.getenv("CRAWL_ROBOTS_USER_AGENT", "crawl4ai"),
+            ttl=float(os.getenv("CRAWL_ROBOTS_TTL", "3600")),
+            enforce=os.getenv("CRAWL_RESPECT_ROBOTS_TXT", "true") == "true"
+        )
+
+    async def close(self) -> None:
+        """Close the HTTP client if the cache created it."""
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def _download(self, origin: str) -> Tuple[float, RobotsRules]:
+        try:
+            response = await self.client.get(f"{origin}/robots.txt")
+        except Exception as e:
+            print(f"Error fetching robots.txt for {origin}: {e}")
+            return time.monotonic() + self.error_ttl, RobotsRules()
+        if response.status_code >= 500:
+            return time.monotonic() + self.error_ttl, RobotsRules()
+        if response.status_code >= 400:
+            return time.monotonic() + self.ttl, RobotsRules()
+        return time.monotonic() + self.ttl, parse_robots(response.text, self.user_agent)
+
+    async def rules_for(self, url: str) -> RobotsRules:
+        """
+        Get the compiled robots.txt rules for a URL's host, fetching them if needed.
+
+        Args:
+            url: Any URL on the host
+
+        Returns:
+            RobotsRules for the host
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc.lower()}"
+        cached = self._cache.get(origin)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        task = self._pending.get(origin)
+        if task is None:
+            task = asyncio.create_task(self._download(origin))
+            self._pending[origin] = task
+            task.add_done_callback(lambda _: self._pending.pop(origin, None))
+        self._cache[origin] = await asyncio.shield(task)
+        return self._cache[origin][1]
+
+    async def allowed(self, url: str) -> bool:
+        """
+        Check whether robots.txt allows crawling a URL.
+
+        Args:
+            url: URL to check
+
+        Returns:
+            True if the URL may be crawled (always True when enforcement is off)
+        """
+        if not self.enforce:
+            return True
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        return (await self.rules_for(url)).allows(path)
+
+    async def crawl_delay(self, url: str) -> Optional[float]:
+        """
+        Get the Crawl-delay that applies to a URL's host.
+
+        Args:
+            url: Any URL on the host
+
+        Returns:
+            Seconds between requests, or None if robots.txt sets no delay
+        """
+        return (await self.rules_for(url)).crawl_delay
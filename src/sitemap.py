@@ -0,0 +1,148 @@
+"""
+Async, streaming sitemap reader for the Crawl4AI MCP server.
+
+Sitemaps are downloaded in chunks and parsed incrementally, so URLs reach the
+crawler while the XML is still arriving and memory stays flat on sitemaps with
+hundreds of thousands of entries. Sitemap index files are followed recursively,
+with child sitemaps read concurrently, and gzipped sitemaps are decompressed on
+the fly.
+"""
+import asyncio
+import zlib
+from typing import AsyncIterator, Dict, Optional, Tuple
+from xml.etree import ElementTree
+
+import httpx
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag name."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _is_gzipped(url: str, response: httpx.Response) -> bool:
+    """Check whether the response body is a gzip file (not just gzip transfer encoding)."""
+    if response.headers.get("content-encoding", "").lower() == "gzip":
+        # httpx already decodes Content-Encoding
+        return False
+    content_type = response.headers.get("content-type", "").lower()
+    return url.lower().endswith(".gz") or "gzip" in content_type
+
+
+async def _stream_sitemap(client: httpx.AsyncClient, sitemap_url: str) -> AsyncIterator[Tuple[str, Dict[str, Optional[str]]]]:
+    """
+    Stream one sitemap document and yield its entries as they are parsed.
+
+    Args:
+        client: HTTP client used for the download
+        sitemap_url: URL of the sitemap or sitemap index
+
+    Yields:
+        ("url", entry) for page entries and ("sitemap", entry) for child sitemaps,
+        where entry holds "loc" and "lastmod"
+    """
+    async with client.stream("GET", sitemap_url) as response:
+        if response.status_code != 200:
+            print(f"Error fetching sitemap {sitemap_url}: HTTP {response.status_code}")
+            return
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if _is_gzipped(sitemap_url, response) else None
+        parser = ElementTree.XMLPullParser(events=("start", "end"))
+        root = None
+
+        async for data in response.aiter_bytes():
+            if decompressor is not None:
+                data = decompressor.decompress(data)
+            parser.feed(data)
+
+            for event, elem in parser.read_events():
+                if event == "start":
+                    if root is None:
+                        root = elem
+                    continue
+
+                kind = _local_name(elem.tag)
+                if kind not in ("url", "sitemap"):
+                    continue
+
+                loc = lastmod = None
+                for child in elem:
+                    name = _local_name(child.tag)
+                    if name == "loc" and child.text:
+                        loc = child.text.strip()
+                    elif name == "lastmod" and child.text:
+                        lastmod = child.text.strip()
+
+                # Drop parsed entries so the tree never holds more than one of them
+                root.clear()
+                if loc:
+                    yield kind, {"loc": loc, "lastmod": lastmod}
+
+        parser.close()
+
+
+async def iter_sitemap_entries(
+    sitemap_url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    max_concurrent: int = 4,
+    max_depth: int = 3,
+    queue_size: int = 1000
+) -> AsyncIterator[Dict[str, Optional[str]]]:
+    """
+    Yield page entries from a sitemap, following sitemap index files recursively.
+
+    Args:
+        sitemap_url: URL of the sitemap or sitemap index
+        client: Optional shared HTTP client; a temporary one is created if omitted
+        max_concurrent: Maximum number of sitemaps downloaded at the same time
+        max_depth: Maximum nesting depth of sitemap index files
+        queue_size: Maximum number of parsed entries buffered ahead of the consumer
+
+    Yields:
+        Dictionaries with the page URL ("loc") and its <lastmod> value, if any
+    """
+    owns_client = client is None
+    if owns_client:
+        client = httpx.AsyncClient(follow_redirects=True, timeout=30.0)
+
+    entries: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    semaphore = asyncio.Semaphore(max_concurrent)
+    seen = set()
+    tasks = set()
+    pending = 0
+
+    def spawn(url: str, depth: int) -> None:
+        nonlocal pending
+        if url in seen or depth > max_depth:
+            return
+        seen.add(url)
+        pending += 1
+        task = asyncio.create_task(read(url, depth))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def read(url: str, depth: int) -> None:
+        nonlocal pending
+        try:
+            async with semaphore:
+                async for kind, entry in _stream_sitemap(client, url):
+                    if kind == "sitemap":
+                        spawn(entry["loc"], depth + 1)
+                    else:
+                        await entries.put(entry)
+        except Exception as e:
+            print(f"Error reading sitemap {url}: {e}")
+        finally:
+            pending -= 1
+            if pending == 0:
+                await entries.put(None)
+
+    spawn(sitemap_url, 0)
+    try:
+        while (entry := await entries.get()) is not None:
+            yield entry
+    finally:
+        for task in list(tasks):
+            task.cancel()
+        if owns_client:
+            await client.aclose()
@@ -0,0 +1,104 @@
+"""
+Token counting for chunking and embedding requests.
+
+Chunks and embedding requests are limited by the embedding model in tokens, not
+characters: a chunk of code or non-Latin text has far more tokens per character
+than English prose. Tokens are counted with the model's own tokenizer (tiktoken)
+when it is installed and its vocabulary can be loaded. Otherwise they are
+estimated at three characters per token, which is at or above the real count
+for English prose and most code; non-Latin text may have more tokens than that.
+"""
+import importlib.util
+import os
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Limits of the OpenAI embeddings API: tokens per input, inputs and tokens per request
+MAX_INPUT_TOKENS = 8191
+MAX_BATCH_INPUTS = 2048
+MAX_BATCH_TOKENS = 300000
+
+FALLBACK_CHARS_PER_TOKEN = 3
+
+
+@lru_cache(maxsize=None)
+def get_encoding() -> Optional[Any]:
+    """Load the embedding model's tiktoken encoding once, or return None if it is unavailable."""
+    if importlib.util.find_spec("tiktoken") is None:
+        return None
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    except Exception as e:
+        # The vocabulary is downloaded on first use, which fails without network access
+        print(f"Could not load the {EMBEDDING_MODEL} tokenizer, estimating token counts instead: {e}")
+        return None
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Count the embedding model's tokens in a text (estimated without tiktoken)."""
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // FALLBACK_CHARS_PER_TOKEN + 1
+    return len(encoding.encode_ordinary(text))
+
+
+def within_tokens(text: str, max_tokens: int) -> bool:
+    """
+    Check whether a text has at most max_tokens tokens, without tokenizing it when possible.
+
+    Every token covers at least one byte, so ASCII text no longer than max_tokens
+    characters always fits.
+    """
+    if len(text) <= max_tokens and text.isascii():
+        return True
+    return count_tokens(text) <= max_tokens
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text to at most max_tokens tokens."""
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:(max_tokens - 1) * FALLBACK_CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode_ordinary(text)[:max_tokens])
+
+
+def chunk_token_limit() -> int:
+    """Token budget of a chunk: CHUNK_MAX_TOKENS, at most what the embedding model accepts."""
+    return min(MAX_INPUT_TOKENS, int(os.getenv("CHUNK_MAX_TOKENS", str(MAX_INPUT_TOKENS))))
+
+
+def batch_token_limit() -> int:
+    """Token budget of one embedding request: EMBEDDING_BATCH_MAX_TOKENS, at most the API's limit."""
+    return min(MAX_BATCH_TOKENS, int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", str(MAX_BATCH_TOKENS))))
+
+
+def pack_by_tokens(token_counts: List[int], max_tokens: int, max_items: int = MAX_BATCH_INPUTS) -> List[Tuple[int, int]]:
+    """
+    Group consecutive items into batches of at most max_tokens tokens and max_items items.
+
+    An item larger than max_tokens gets a batch of its own.
+
+    Args:
+        token_counts: Token count of every item, in order
+        max_tokens: Token budget of a batch
+        max_items: Most items in a batch
+
+    Returns:
+        (start, end) index ranges of the batches, covering every item in order
+    """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, count in enumerate(token_counts):
+        if i > start and (tokens + count > max_tokens or i - start >= max_items):
+            batches.append((start, i))
+            start = i
+            tokens = 0
+        tokens += count
+    if start < len(token_counts):
+        batches.append((start, len(token_counts)))
+    return batches
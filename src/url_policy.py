@@ -0,0 +1,223 @@
+"""
+URL canonicalization and filtering for the crawl frontier.
+
+Before a URL enters the frontier it is rewritten to a canonical form, so tracking
+parameter variants, default ports, fragments and reordered query strings collapse
+into one entry, and checked against include/exclude patterns and a list of file types
+that are never worth rendering (PDFs, images, archives, media, ...). When a
+RobotsCache is attached, URLs that robots.txt disallows are rejected as well.
+The policy also carries the score function that orders the frontier.
+"""
+import fnmatch
+import re
+from typing import Callable, List, Optional
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+from robots import RobotsCache
+from url_scoring import ScoreFunction, UrlScorer
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that only track the visit and never change the page
+TRACKING_PARAMS = {
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "ref_src", "spm"
+}
+TRACKING_PREFIXES = ("utm_",)
+
+SKIP_EXTENSIONS = {
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico", ".bmp", ".tif", ".tiff", ".avif",
+    ".zip", ".tar", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".whl", ".jar",
+    ".exe", ".msi", ".dmg", ".pkg", ".deb", ".rpm", ".apk", ".iso", ".bin",
+    ".mp3", ".mp4", ".m4a", ".wav", ".ogg", ".webm", ".avi", ".mov", ".mkv",
+    ".css", ".js", ".mjs", ".map", ".woff", ".woff2", ".ttf", ".otf", ".eot"
+}
+
+
+def compile_pattern(pattern: str) -> Callable[[str], Optional[re.Match]]:
+    """
+    Compile a URL pattern: "re:" prefixes a regular expression, anything else is a glob.
+
+    Globs must match the whole URL; regular expressions may match anywhere in it.
+
+    Args:
+        pattern: Glob such as "*/docs/*" or regex such as "re:/v[0-9]+/"
+
+    Returns:
+        Function that returns a match object if a URL matches the pattern
+    """
+    if pattern.startswith("re:"):
+        return re.compile(pattern[3:]).search
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+class UrlPolicy:
+    """
+    Canonicalizes URLs and decides which ones a crawl may visit.
+
+    Include patterns, when given, must match for a URL to be crawled; exclude
+    patterns reject a URL even if it is included. Patterns are checked against
+    the canonical URL. robots.txt is only consulted for URLs that pass the
+    cheaper checks, so filtered-out hosts never have their robots.txt fetched.
+    scorer decides which admitted URL is crawled first (default: UrlScorer()).
+    """
+
+    def __init__(
+        self,
+        include_patterns: Optional[List[str]] = None,
+        exclude_patterns: Optional[List[str]] = None,
+        strip_trailing_slash: bool = False,
+        skip_extensions: Optional[set] = None,
+        robots: Optional[RobotsCache] = None,
+        scorer: Optional[ScoreFunction] = None
+    ):
+        self.include = [compile_pattern(p) for p in include_patterns or []]
+        self.exclude = [compile_pattern(p) for p in exclude_patterns or []]
+        self.strip_trailing_slash = strip_trailing_slash
+        self.skip_extensions = SKIP_EXTENSIONS if skip_extensions is None else skip_extensions
+        self.robots = robots
+        self.scorer = scorer or UrlScorer()
+        self.rejected_count = 0
+        self.disallowed_count = 0
+
+    def canonicalize(self, url: str) -> str:
+        """
+        Rewrite a URL to its canonical form.
+
+        Lowercases the scheme and host, drops default ports, fragments and tracking
+        parameters, and sorts the remaining query parameters. The parameters are
+        kept exactly as written ("%20" stays "%20", "?flag" stays "?flag"), and so
+        is a trailing slash unless strip_trailing_slash is set, so the canonical
+        URL is one the server actually links to and does not redirect.
+
+        Args:
+            url: URL to canonicalize
+
+        Returns:
+            The canonical URL
+
+        Raises:
+            ValueError: If the URL is malformed, e.g. has a non-numeric port
+        """
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").lower()
+        if ":" in host:
+            # IPv6 literals keep their brackets
+            host = f"[{host}]"
+        netloc = host
+        if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+            netloc = f"{host}:{parts.port}"
+        if parts.username:
+            netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+
+        path = parts.path or "/"
+        if self.strip_trailing_slash and len(path) > 1 and path.endswith("/"):
+            path = path.rstrip("/") or "/"
+
+        params = []
+        for pair in parts.query.split("&"):
+            key = unquote_plus(pair.split("=", 1)[0]).lower()
+            if pair and key not in TRACKING_PARAMS and not key.startswith(TRACKING_PREFIXES):
+                params.append(pair)
+        query = "&".join(sorted(params))
+        return urlunsplit((scheme, netloc, path, query, ""))
+
+    def try_canonicalize(self, url: str) -> Optional[str]:
+        """
+        Canonicalize a URL found on a page, rejecting it if it is malformed.
+
+        Args:
+            url: URL to canonicalize
+
+        Returns:
+            The canonical URL, or None for a malformed URL (counted as rejected)
+        """
+        try:
+            return self.canonicalize(url)
+        except ValueError:
+            self.rejected_count += 1
+            return None
+
+    def allows(self, url: str) -> bool:
+        """
+        Check whether a canonical URL may enter the frontier.
+
+        Args:
+            url: Canonical URL
+
+        Returns:
+            True if the URL passes the scheme, file type and pattern checks
+        """
+        allowed = self._allows(url)
+        if not allowed:
+            self.rejected_count += 1
+        return allowed
+
+    async def admits(self, url: str, written: Optional[str] = None) -> bool:
+        """
+        Check a canonical URL against the filters and, if attached, robots.txt.
+
+        Args:
+            url: Canonical URL
+            written: The URL as it was linked or listed, before canonicalization
+
+        Returns:
+            True if the URL may enter the frontier
+        """
+        if not self.allows(url):
+            return False
+        if not await self.robots_allow(url, written):
+            self.disallowed_count += 1
+            return False
+        return True
+
+    async def robots_allow(self, url: str, written: Optional[str] = None) -> bool:
+        """
+        Check every form a URL may be fetched in against robots.txt.
+
+        A URL can be allowed in one form and disallowed in another that the server
+        redirects it to: with "Disallow: /private/", "/private" is allowed but
+        usually redirects to "/private/". The canonical URL, its trailing-slash
+        twin and the URL as written must all be allowed.
+
+        Args:
+            url: Canonical URL
+            written: The URL as it was linked or listed, before canonicalization
+
+        Returns:
+            True if robots.txt allows every form (always True without a RobotsCache)
+        """
+        if self.robots is None:
+            return True
+        forms = [url]
+        parts = urlsplit(url)
+        if not parts.path.endswith("/"):
+            forms.append(urlunsplit(parts._replace(path=parts.path + "/")))
+        try:
+            written_parts = urlsplit(written.strip()) if written else None
+        except ValueError:
+            written_parts = None
+        if written_parts and written_parts.scheme.lower() in ("http", "https") and written_parts.netloc:
+            forms.append(urlunsplit(written_parts._replace(fragment="")))
+        for form in dict.fromkeys(forms):
+            if not await self.robots.allowed(form):
+                return False
+        return True
+
+    def _allows(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return False
+
+        # Only the explicit deny-list: guessed MIME types depend on the host's
+        # mime.types and would drop pages such as .php or .rb documentation
+        path = parts.path.lower()
+        dot = path.rfind(".")
+        if dot > path.rfind("/") and path[dot:] in self.skip_extensions:
+            return False
+
+        if self.include and not any(matches(url) for matches in self.include):
+            return False
+        return not any(matches(url) for matches in self.exclude)
@@ -0,0 +1,80 @@
+"""
+URL scoring for the priority crawl frontier.
+
+The frontier fetches the highest-scoring URL first, so when a crawl is bounded by
+a budget the most useful pages are indexed before it runs out. The default
+UrlScorer prefers documentation-like paths, short paths, few link hops,
+descriptive anchor text and pages that many crawled pages link to. Any callable
+with the same signature can replace it.
+"""
+import math
+import re
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+# score(url, depth, anchor_text, inbound_links) -> higher is crawled first
+ScoreFunction = Callable[[str, int, str, int], float]
+
+# Path segments (or segment prefixes) that mark reference material or low-value listings
+BOOST_SEGMENTS = {
+    "docs": 2.0, "doc": 2.0, "documentation": 2.0, "api": 2.0, "reference": 2.0,
+    "guide": 1.5, "guides": 1.5, "tutorial": 1.5, "tutorials": 1.5, "manual": 1.5,
+    "getting-started": 1.5, "quickstart": 1.5, "learn": 1.0, "examples": 1.0, "concepts": 1.0
+}
+DEMOTE_SEGMENTS = {
+    "blog": -2.0, "changelog": -2.0, "news": -1.5, "releases": -1.5, "release-notes": -1.5,
+    "press": -1.5, "events": -1.5, "careers": -2.5, "jobs": -2.5, "tag": -2.5, "tags": -2.5,
+    "category": -2.0, "author": -2.5, "archive": -2.0, "page": -1.5, "search": -2.5,
+    "login": -3.0, "signin": -3.0, "signup": -3.0, "register": -3.0, "cart": -3.0
+}
+
+# Words in anchor text that describe reference material or low-value listings
+ANCHOR_BOOST = re.compile(r"\b(docs?|documentation|api|reference|guide|tutorial|getting started|quick ?start|overview|introduction)\b", re.IGNORECASE)
+ANCHOR_DEMOTE = re.compile(r"\b(blog|changelog|release notes|news|careers|jobs|log ?in|sign ?(in|up)|older posts|next page)\b", re.IGNORECASE)
+
+
+class UrlScorer:
+    """
+    Default frontier score: URL patterns, path length, link depth, anchor text and inbound links.
+
+    Args:
+        boost_segments: Path segment weights added to the score (default: BOOST_SEGMENTS)
+        demote_segments: Path segment weights, usually negative (default: DEMOTE_SEGMENTS)
+    """
+
+    def __init__(self, boost_segments: Optional[Dict[str, float]] = None, demote_segments: Optional[Dict[str, float]] = None):
+        self.segment_weights = {
+            **(DEMOTE_SEGMENTS if demote_segments is None else demote_segments),
+            **(BOOST_SEGMENTS if boost_segments is None else boost_segments)
+        }
+
+    def __call__(self, url: str, depth: int, anchor_text: str = "", inbound_links: int = 0) -> float:
+        """
+        Score a URL for the frontier.
+
+        Args:
+            url: Canonical URL
+            depth: Link hops from the start URL
+            anchor_text: Text of the link the URL was found through, if any
+            inbound_links: Number of crawled pages linking to the URL so far
+
+        Returns:
+            Score; URLs with higher scores are crawled first
+        """
+        parts = urlsplit(url)
+        segments = [s for s in parts.path.lower().split("/") if s]
+
+        score = -1.0 * depth - 0.3 * len(segments)
+        # Only the strongest boost and the strongest demotion count, so long paths are not favored
+        weights = [self.segment_weights[s] for s in segments if s in self.segment_weights]
+        score += max([w for w in weights if w > 0], default=0.0) + min([w for w in weights if w < 0], default=0.0)
+        if parts.query:
+            score -= 1.0
+
+        if anchor_text:
+            if ANCHOR_BOOST.search(anchor_text):
+                score += 1.0
+            if ANCHOR_DEMOTE.search(anchor_text):
+                score -= 1.0
+
+        return score + math.log2(1 + inbound_links)
@@ -3,6 +3,7 @@ Utility functions for the Crawl4AI MCP server.
 """
 import os
 import concurrent.futures
+import hashlib
 from typing import List, Dict, Any, Optional, Tuple
 import json
 from supabase import create_client, Client
@@ -11,6 +12,8 @@ import openai
 import re
 import time
 
+from tokenizer import EMBEDDING_MODEL, MAX_INPUT_TOKENS, batch_token_limit, count_tokens, pack_by_tokens, truncate_to_tokens
+
 # Load OpenAI API key for embeddings
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
@@ -31,7 +34,12 @@ def get_supabase_client() -> Client:
 
 def create_embeddings_batch(texts: List[str]) -> List[List[float]]:
     """
-    Create embeddings for multiple texts in a single API call.
+    Create embeddings for multiple texts in as few API calls as possible.
+    
+    Texts are packed into requests by their total token count, up to
+    EMBEDDING_BATCH_MAX_TOKENS tokens and the API's limit on inputs per request.
+    A text longer than the embedding model accepts is cut to the model's limit
+    with a warning instead of failing its whole request.
     
     Args:
         texts: List of texts to create embeddings for
@@ -42,13 +50,38 @@ def create_embeddings_batch(texts: List[str]) -> List[List[float]]:
     if not texts:
         return []
     
+    texts = list(texts)
+    token_counts = []
+    for i, text in enumerate(texts):
+        token_count = count_tokens(text)
+        if token_count > MAX_INPUT_TOKENS:
+            print(f"Text {i} has {token_count} tokens, more than the embedding model accepts; embedding its first {MAX_INPUT_TOKENS}")
+            texts[i] = truncate_to_tokens(text, MAX_INPUT_TOKENS)
+            token_count = MAX_INPUT_TOKENS
+        token_counts.append(token_count)
+    
+    embeddings = []
+    for start, end in pack_by_tokens(token_counts, batch_token_limit()):
+        embeddings.extend(create_embeddings_request(texts[start:end]))
+    return embeddings
+
+def create_embeddings_request(texts: List[str]) -> List[List[float]]:
+    """
+    Create embeddings for texts in a single API call, retrying on errors.
+    
+    Args:
+        texts: Texts that fit in one embeddings request
+        
+    Returns:
+        List of embeddings (each embedding is a list of floats)
+    """
     max_retries = 3
     retry_delay = 1.0  # Start with 1 second delay
     
     for retry in range(max_retries):
         try:
             response = openai.embeddings.create(
-                model="text-embedding-3-small", # Hardcoding embedding model for now, will change this later to be more dynamic
+                model=EMBEDDING_MODEL,
                 input=texts
             )
             return [item.embedding for item in response.data]
@@ -68,7 +101,7 @@ def create_embeddings_batch(texts: List[str]) -> List[List[float]]:
                 for i, text in enumerate(texts):
                     try:
                         individual_response = openai.embeddings.create(
-                            model="text-embedding-3-small",
+                            model=EMBEDDING_MODEL,
                             input=[text]
                         )
                         embeddings.append(individual_response.data[0].embedding)
@@ -164,6 +197,39 @@ def process_chunk_with_context(args):
     url, content, full_document = args
     return generate_contextual_embedding(full_document, content)
 
+def chunk_hash(content: str) -> str:
+    """Return the SHA-256 hex digest of a chunk's text, which identifies it across pages and crawls."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_chunk_embeddings(client: Client, chunk_hashes: List[str], batch_size: int = 50) -> List[Dict[str, Any]]:
+    """
+    Get stored chunks, with their embeddings, by the hash of their text.
+    
+    Args:
+        client: Supabase client
+        chunk_hashes: chunk_hash values to look up
+        batch_size: Number of hashes per query
+        
+    Returns:
+        crawled_pages rows (url, content, embedding, metadata) of every stored chunk with one of the hashes
+    """
+    rows = []
+    unique_hashes = list(dict.fromkeys(chunk_hashes))
+    for i in range(0, len(unique_hashes), batch_size):
+        batch_hashes = unique_hashes[i:i + batch_size]
+        try:
+            result = client.table("crawled_pages").select("url, content, embedding, metadata").in_("metadata->>chunk_hash", batch_hashes).execute()
+            for row in result.data or []:
+                # PostgREST returns vector columns as their text form
+                if isinstance(row.get("embedding"), str):
+                    row["embedding"] = json.loads(row["embedding"])
+                rows.append(row)
+        except Exception as e:
+            print(f"Error loading stored chunk embeddings: {e}")
+    return rows
+
+
 def add_documents_to_supabase(
     client: Client, 
     urls: List[str], 
@@ -172,11 +238,19 @@ def add_documents_to_supabase(
     metadatas: List[Dict[str, Any]],
     url_to_full_document: Dict[str, str],
     batch_size: int = 20
-) -> None:
+) -> int:
     """
     Add documents to the Supabase crawled_pages table in batches.
     Deletes existing records with the same URLs before inserting to prevent duplicates.
     
+    Every chunk's metadata records the hash of its text (chunk_hash). With
+    REUSE_CHUNK_EMBEDDINGS (the default), a chunk whose text is already stored,
+    embedded by the same model with the same contextual embedding setting, keeps
+    the stored content and embedding instead of being embedded again. Without
+    contextual embeddings any page's copy of the chunk can be reused; with them the
+    stored context depends on the page, so only the same URL's copy is reused, and
+    only if its context was generated by the current MODEL_CHOICE.
+    
     Args:
         client: Supabase client
         urls: List of URLs
@@ -184,8 +258,37 @@ def add_documents_to_supabase(
         contents: List of document contents
         metadatas: List of document metadata
         url_to_full_document: Dictionary mapping URLs to their full document content
-        batch_size: Size of each batch for insertion
+        batch_size: Size of each batch for contextual embedding and insertion (embedding requests are packed by tokens)
+        
+    Returns:
+        Number of chunks whose stored embedding was reused
     """
+    # Check if MODEL_CHOICE is set for contextual embeddings
+    use_contextual_embeddings = os.getenv("USE_CONTEXTUAL_EMBEDDINGS", "false") == "true"
+    print(f"\n\nUse contextual embeddings: {use_contextual_embeddings}\n\n")
+    model_choice = os.getenv("MODEL_CHOICE")
+    
+    for content, meta in zip(contents, metadatas):
+        meta.setdefault("chunk_hash", chunk_hash(content))
+        meta["embedding_model"] = EMBEDDING_MODEL
+    
+    # A contextual chunk's stored context was written for its own page
+    def reuse_key(url: str, hash_: str) -> Tuple[Optional[str], str]:
+        return (url if use_contextual_embeddings else None, hash_)
+    
+    # Look up unchanged chunks before their rows are deleted below
+    reusable = {}
+    if os.getenv("REUSE_CHUNK_EMBEDDINGS", "true") == "true":
+        for row in get_chunk_embeddings(client, [meta["chunk_hash"] for meta in metadatas]):
+            stored_meta = row.get("metadata") or {}
+            if (stored_meta.get("embedding_model") == EMBEDDING_MODEL
+                    and bool(stored_meta.get("contextual_embedding")) == use_contextual_embeddings
+                    and (not use_contextual_embeddings or stored_meta.get("contextual_model") == model_choice)
+                    and row.get("embedding")):
+                reusable.setdefault(reuse_key(row["url"], stored_meta["chunk_hash"]), row)
+    reused_rows = [reusable.get(reuse_key(urls[i], metadatas[i]["chunk_hash"])) for i in range(len(contents))]
+    reused = [row is not None for row in reused_rows]
+    
     # Get unique URLs to delete existing records
     unique_urls = list(set(urls))
     
@@ -204,60 +307,63 @@ def add_documents_to_supabase(
                 print(f"Error deleting record for URL {url}: {inner_e}")
                 # Continue with the next URL even if one fails
     
-    # Check if MODEL_CHOICE is set for contextual embeddings
-    use_contextual_embeddings = os.getenv("USE_CONTEXTUAL_EMBEDDINGS", "false") == "true"
-    print(f"\n\nUse contextual embeddings: {use_contextual_embeddings}\n\n")
-    
-    # Process in batches to avoid memory issues
-    for i in range(0, len(contents), batch_size):
-        batch_end = min(i + batch_size, len(contents))
-        
-        # Get batch slices
-        batch_urls = urls[i:batch_end]
-        batch_chunk_numbers = chunk_numbers[i:batch_end]
-        batch_contents = contents[i:batch_end]
-        batch_metadatas = metadatas[i:batch_end]
-        
-        # Apply contextual embedding to each chunk if MODEL_CHOICE is set
-        if use_contextual_embeddings:
+    # Reused chunks keep their stored (possibly contextual) content
+    all_contextual_contents = list(contents)
+    for i in range(len(contents)):
+        if reused[i]:
+            all_contextual_contents[i] = reused_rows[i]["content"]
+            if use_contextual_embeddings:
+                metadatas[i]["contextual_embedding"] = True
+                metadatas[i]["contextual_model"] = model_choice
+    
+    # Apply contextual embeddings in batches to avoid memory issues
+    if use_contextual_embeddings:
+        new_indices = [i for i in range(len(contents)) if not reused[i]]
+        for b in range(0, len(new_indices), batch_size):
+            batch_indices = new_indices[b:b + batch_size]
+            
             # Prepare arguments for parallel processing
             process_args = []
-            for j, content in enumerate(batch_contents):
-                url = batch_urls[j]
-                full_document = url_to_full_document.get(url, "")
-                process_args.append((url, content, full_document))
+            for i in batch_indices:
+                full_document = url_to_full_document.get(urls[i], "")
+                process_args.append((urls[i], contents[i], full_document))
             
             # Process in parallel using ThreadPoolExecutor
-            contextual_contents = []
             with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
                 # Submit all tasks and collect results
-                future_to_idx = {executor.submit(process_chunk_with_context, arg): idx 
-                                for idx, arg in enumerate(process_args)}
+                future_to_idx = {executor.submit(process_chunk_with_context, arg): i 
+                                for i, arg in zip(batch_indices, process_args)}
                 
-                # Process results as they complete
+                # Process results as they complete, keeping each in its chunk's position
                 for future in concurrent.futures.as_completed(future_to_idx):
                     idx = future_to_idx[future]
                     try:
                         result, success = future.result()
-                        contextual_contents.append(result)
+                        all_contextual_contents[idx] = result
                         if success:
-                            batch_metadatas[idx]["contextual_embedding"] = True
+                            metadatas[idx]["contextual_embedding"] = True
+                            metadatas[idx]["contextual_model"] = model_choice
                     except Exception as e:
+                        # The original content stays as the fallback
                         print(f"Error processing chunk {idx}: {e}")
-                        # Use original content as fallback
-                        contextual_contents.append(batch_contents[idx])
-            
-            # Sort results back into original order if needed
-            if len(contextual_contents) != len(batch_contents):
-                print(f"Warning: Expected {len(batch_contents)} results but got {len(contextual_contents)}")
-                # Use original contents as fallback
-                contextual_contents = batch_contents
-        else:
-            # If not using contextual embeddings, use original contents
-            contextual_contents = batch_contents
-        
-        # Create embeddings for the entire batch at once
-        batch_embeddings = create_embeddings_batch(contextual_contents)
+    
+    # Create embeddings for new chunks at once, packed into as few requests as their tokens allow
+    new_embeddings = iter(create_embeddings_batch([all_contextual_contents[i] for i in range(len(contents)) if not reused[i]]))
+    embeddings = [
+        reused_rows[i]["embedding"] if reused[i] else next(new_embeddings)
+        for i in range(len(contents))
+    ]
+    if any(reused):
+        print(f"Reused stored embeddings for {sum(reused)} of {len(contents)} chunks")
+    
+    # Insert in batches to keep each request small
+    for i in range(0, len(contents), batch_size):
+        batch_end = min(i + batch_size, len(contents))
+        batch_urls = urls[i:batch_end]
+        batch_chunk_numbers = chunk_numbers[i:batch_end]
+        batch_metadatas = metadatas[i:batch_end]
+        contextual_contents = all_contextual_contents[i:batch_end]
+        batch_embeddings = embeddings[i:batch_end]
         
         batch_data = []
         for j in range(len(contextual_contents)):
@@ -313,6 +419,8 @@ def add_documents_to_supabase(
                     
                     if successful_inserts > 0:
                         print(f"Successfully inserted {successful_inserts}/{len(batch_data)} records individually")
+    
+    return sum(reused)
 
 def search_documents(
     client: Client, 
@@ -355,88 +463,6 @@ def search_documents(
         return []
 
 
-def extract_code_blocks(markdown_content: str, min_length: int = 1000) -> List[Dict[str, Any]]:
-    """
-    Extract code blocks from markdown content along with context.
-    
-    Args:
-        markdown_content: The markdown content to extract code blocks from
-        min_length: Minimum length of code blocks to extract (default: 1000 characters)
-        
-    Returns:
-        List of dictionaries containing code blocks and their context
-    """
-    code_blocks = []
-    
-    # Skip if content starts with triple backticks (edge case for files wrapped in backticks)
-    content = markdown_content.strip()
-    start_offset = 0
-    if content.startswith('```'):
-        # Skip the first triple backticks
-        start_offset = 3
-        print("Skipping initial triple backticks")
-    
-    # Find all occurrences of triple backticks
-    backtick_positions = []
-    pos = start_offset
-    while True:
-        pos = markdown_content.find('```', pos)
-        if pos == -1:
-            break
-        backtick_positions.append(pos)
-        pos += 3
-    
-    # Process pairs of backticks
-    i = 0
-    while i < len(backtick_positions) - 1:
-        start_pos = backtick_positions[i]
-        end_pos = backtick_positions[i + 1]
-        
-        # Extract the content between backticks
-        code_section = markdown_content[start_pos+3:end_pos]
-        
-        # Check if there's a language specifier on the first line
-        lines = code_section.split('\n', 1)
-        if len(lines) > 1:
-            # Check if first line is a language specifier (no spaces, common language names)
-            first_line = lines[0].strip()
-            if first_line and not ' ' in first_line and len(first_line) < 20:
-                language = first_line
-                code_content = lines[1].strip() if len(lines) > 1 else ""
-            else:
-                language = ""
-                code_content = code_section.strip()
-        else:
-            language = ""
-            code_content = code_section.strip()
-        
-        # Skip if code block is too short
-        if len(code_content) < min_length:
-            i += 2  # Move to next pair
-            continue
-        
-        # Extract context before (1000 chars)
-        context_start = max(0, start_pos - 1000)
-        context_before = markdown_content[context_start:start_pos].strip()
-        
-        # Extract context after (1000 chars)
-        context_end = min(len(markdown_content), end_pos + 3 + 1000)
-        context_after = markdown_content[end_pos + 3:context_end].strip()
-        
-        code_blocks.append({
-            'code': code_content,
-            'language': language,
-            'context_before': context_before,
-            'context_after': context_after,
-            'full_context': f"{context_before}\n\n{code_content}\n\n{context_after}"
-        })
-        
-        # Move to next pair (skip the closing backtick we just processed)
-        i += 2
-    
-    return code_blocks
-
-
 def generate_code_example_summary(code: str, context_before: str, context_after: str) -> str:
     """
     Generate a summary for a code example using its surrounding context.
@@ -594,6 +620,265 @@ def add_code_examples_to_supabase(
         print(f"Inserted batch {i//batch_size + 1} of {(total_items + batch_size - 1)//batch_size} code examples")
 
 
+def get_crawl_states(client: Client, urls: List[str], batch_size: int = 100) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the stored fetch state for a list of URLs from the crawl_state table.
+    
+    Args:
+        client: Supabase client
+        urls: URLs to look up
+        batch_size: Number of URLs per query
+        
+    Returns:
+        Dictionary mapping each known URL to its crawl_state row
+    """
+    states = {}
+    for i in range(0, len(urls), batch_size):
+        batch_urls = urls[i:i + batch_size]
+        try:
+            result = client.table('crawl_state').select('*').in_('url', batch_urls).execute()
+            for row in result.data or []:
+                states[row['url']] = row
+        except Exception as e:
+            print(f"Error loading crawl state: {e}")
+    return states
+
+
+def upsert_crawl_states(client: Client, states: List[Dict[str, Any]]) -> None:
+    """
+    Insert or update fetch state rows in the crawl_state table.
+    
+    Args:
+        client: Supabase client
+        states: crawl_state rows keyed by URL
+    """
+    if not states:
+        return
+    try:
+        client.table('crawl_state').upsert(states, on_conflict='url').execute()
+    except Exception as e:
+        print(f"Error saving crawl state: {e}")
+
+
+def add_page_aliases(client: Client, aliases: List[Dict[str, Any]]) -> None:
+    """
+    Store duplicate pages as aliases of a canonical page instead of as chunks.
+    
+    Any chunks or code examples previously stored under an alias URL are removed,
+    since the canonical page now holds the same content.
+    
+    Args:
+        client: Supabase client
+        aliases: crawl_state rows with canonical_url set
+    """
+    if not aliases:
+        return
+    alias_urls = [alias['url'] for alias in aliases]
+    for table in ('crawled_pages', 'code_examples'):
+        try:
+            client.table(table).delete().in_('url', alias_urls).execute()
+        except Exception as e:
+            print(f"Error removing {table} rows for duplicate pages: {e}")
+    upsert_crawl_states(client, aliases)
+
+
+def touch_crawl_states(client: Client, urls: List[str]) -> None:
+    """
+    Refresh the last crawl time of URLs that were skipped as unchanged.
+    
+    Args:
+        client: Supabase client
+        urls: URLs to update
+    """
+    if not urls:
+        return
+    try:
+        client.table('crawl_state').update({'last_crawled_at': 'now()'}).in_('url', urls).execute()
+    except Exception as e:
+        print(f"Error updating crawl state: {e}")
+
+
+def create_distributed_crawl(client: Client, crawl_id: str, url: str, crawl_type: str, params: Dict[str, Any]) -> None:
+    """
+    Register a distributed crawl so workers can look up its start URL and parameters.
+    
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        url: Start URL
+        crawl_type: The crawl strategy used for its pages
+        params: Crawl parameters shared by every worker
+    """
+    client.table('distributed_crawls').insert({
+        'crawl_id': crawl_id,
+        'url': url,
+        'crawl_type': crawl_type,
+        'params': params
+    }).execute()
+
+
+def get_distributed_crawl(client: Client, crawl_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a distributed crawl by ID.
+    
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        
+    Returns:
+        The distributed_crawls row, or None if the crawl does not exist
+    """
+    result = client.table('distributed_crawls').select('*').eq('crawl_id', crawl_id).execute()
+    return result.data[0] if result.data else None
+
+
+def enqueue_frontier_urls(client: Client, crawl_id: str, entries: List[Dict[str, Any]]) -> int:
+    """
+    Add URLs to the shared frontier of a distributed crawl.
+    
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        entries: Dictionaries with url, depth and priority
+        
+    Returns:
+        Number of URLs the crawl had not seen before
+    """
+    if not entries:
+        return 0
+    try:
+        result = client.rpc('enqueue_frontier_urls', {'p_crawl_id': crawl_id, 'p_urls': entries}).execute()
+        return result.data or 0
+    except Exception as e:
+        print(f"Error adding URLs to the crawl frontier: {e}")
+        return 0
+
+
+def lease_frontier_urls(client: Client, crawl_id: str, worker_id: str, limit: int, lease_seconds: int, max_attempts: int) -> List[Dict[str, Any]]:
+    """
+    Lease the highest-priority queued URLs of a distributed crawl to a worker.
+    
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        worker_id: ID of the leasing worker
+        limit: Maximum number of URLs to lease
+        lease_seconds: Seconds until the lease expires unless renewed
+        max_attempts: Number of expired leases after which a URL is marked failed
+        
+    Returns:
+        Dictionaries with the url and depth of each leased URL
+    """
+    try:
+        result = client.rpc('lease_frontier_urls', {
+            'p_crawl_id': crawl_id,
+            'p_worker': worker_id,
+            'p_limit': limit,
+            'p_lease_seconds': lease_seconds,
+            'p_max_attempts': max_attempts
+        }).execute()
+        return result.data or []
+    except Exception as e:
+        print(f"Error leasing URLs from the crawl frontier: {e}")
+        return []
+
+
+def mark_frontier_urls_fetched(client: Client, crawl_id: str, worker_id: str, urls: List[str]) -> None:
+    """
+    Record that a worker fetched leased pages and queued their links.
+    
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        worker_id: ID of the worker holding the leases
+        urls: Leased URLs
+    """
+    if not urls:
+        return
+    try:
+        client.rpc('mark_frontier_urls_fetched', {'p_crawl_id': crawl_id, 'p_worker': worker_id, 'p_urls': urls}).execute()
+    except Exception as e:
+        print(f"Error marking crawl frontier URLs as fetched: {e}")
+
+
+def complete_frontier_urls(client: Client, crawl_id: str, worker_id: str, urls: List[str], status: str = 'done', error: Optional[str] = None) -> None:
+    """
+    Report URLs leased by a worker as done or failed.
+    
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        worker_id: ID of the worker holding the leases
+        urls: Leased URLs
+        status: 'done' or 'failed'
+        error: Error message for failed URLs
+    """
+    if not urls:
+        return
+    try:
+        client.rpc('complete_frontier_urls', {
+            'p_crawl_id': crawl_id,
+            'p_worker': worker_id,
+            'p_urls': urls,
+            'p_status': status,
+            'p_error': error
+        }).execute()
+    except Exception as e:
+        print(f"Error completing URLs in the crawl frontier: {e}")
+
+
+def renew_frontier_leases(client: Client, crawl_id: str, worker_id: str, lease_seconds: int) -> None:
+    """
+    Extend every lease a worker holds in a distributed crawl.
+    
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        worker_id: ID of the worker holding the leases
+        lease_seconds: Seconds from now until the leases expire
+    """
+    try:
+        client.rpc('renew_frontier_leases', {'p_crawl_id': crawl_id, 'p_worker': worker_id, 'p_lease_seconds': lease_seconds}).execute()
+    except Exception as e:
+        print(f"Error renewing crawl frontier leases: {e}")
+
+
+def release_frontier_leases(client: Client, crawl_id: str, worker_id: str) -> None:
+    """
+    Return a worker's unfinished leases to the queue of a distributed crawl.
+    
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        worker_id: ID of the worker holding the leases
+    """
+    try:
+        client.rpc('release_frontier_leases', {'p_crawl_id': crawl_id, 'p_worker': worker_id}).execute()
+    except Exception as e:
+        print(f"Error releasing crawl frontier leases: {e}")
+
+
+def get_frontier_counts(client: Client, crawl_id: str, worker_id: Optional[str] = None) -> Optional[Dict[str, int]]:
+    """
+    Count the URLs of a distributed crawl by state.
+    
+    Args:
+        client: Supabase client
+        crawl_id: ID of the crawl
+        worker_id: Worker whose own leases are excluded from crawling_by_others
+        
+    Returns:
+        Dictionary with queued, leased, crawling_by_others, done, failed and workers,
+        or None if the counts could not be loaded
+    """
+    try:
+        result = client.rpc('crawl_frontier_counts', {'p_crawl_id': crawl_id, 'p_worker': worker_id}).execute()
+        return result.data[0] if result.data else None
+    except Exception as e:
+        print(f"Error counting crawl frontier URLs: {e}")
+        return None
+
+
 def update_source_info(client: Client, source_id: str, summary: str, word_count: int):
     """
     Update or insert source information in the sources table.
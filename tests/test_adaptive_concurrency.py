@@ -0,0 +1,174 @@
+"""Tests for the AIMD concurrency limit in adaptive_concurrency."""
+import asyncio
+from contextlib import ExitStack
+
+import pytest
+
+from adaptive_concurrency import MIN_WINDOW, AdaptiveConcurrency, ConcurrencySlot, is_overload, percentile
+
+
+def run_window(limit, latency=0.1, saturated=True, count=None):
+    """Record one window of fetches, with every slot of the limit busy if saturated."""
+    with ExitStack() as stack:
+        busy = limit.limit if saturated else limit.limit - 1
+        slots = [ConcurrencySlot(limit, limit._epoch) for _ in range(busy)]
+        for slot in slots:
+            stack.enter_context(slot.fetching())
+        for _ in range(count or max(MIN_WINDOW, limit.limit)):
+            slots[0].record(latency)
+
+
+def test_healthy_saturated_window_increases_limit():
+    limit = AdaptiveConcurrency(2, maximum=4)
+    run_window(limit)
+    assert limit.limit == 3
+    assert limit.increases == 1
+    assert limit.last_p95 == pytest.approx(0.1)
+
+
+def test_unsaturated_window_keeps_limit():
+    limit = AdaptiveConcurrency(2, maximum=4)
+    run_window(limit, saturated=False)
+    assert limit.limit == 2
+    assert limit.increases == 0
+
+
+def test_partial_window_keeps_limit():
+    limit = AdaptiveConcurrency(2, maximum=4)
+    run_window(limit, count=MIN_WINDOW - 1)
+    assert limit.limit == 2
+    assert limit.last_p95 is None
+
+
+def test_limit_stops_at_maximum():
+    limit = AdaptiveConcurrency(2, maximum=3)
+    for _ in range(3):
+        run_window(limit)
+    assert limit.limit == 3
+    assert limit.increases == 1
+
+
+def test_latency_rise_stops_growth():
+    limit = AdaptiveConcurrency(2, maximum=10, latency_tolerance=2.0)
+    run_window(limit, latency=0.1)
+    assert limit.limit == 3
+    run_window(limit, latency=1.0)
+    assert limit.limit == 3
+    assert limit.backoffs == 0
+
+
+def test_overload_halves_limit_once_per_burst():
+    limit = AdaptiveConcurrency(8, maximum=8)
+    slots = [ConcurrencySlot(limit, limit._epoch) for _ in range(3)]
+    for slot in slots:
+        slot.record(5.0, overloaded=True)
+    assert limit.limit == 4
+    assert limit.backoffs == 1
+    # Fetches started after the backoff count again
+    ConcurrencySlot(limit, limit._epoch).record(5.0, overloaded=True)
+    assert limit.limit == 2
+    assert limit.backoffs == 2
+
+
+def test_overload_respects_minimum():
+    limit = AdaptiveConcurrency(2, minimum=2)
+    ConcurrencySlot(limit, limit._epoch).record(1.0, overloaded=True)
+    assert limit.limit == 2
+
+
+def test_slow_window_backs_off():
+    limit = AdaptiveConcurrency(8, latency_target=1.0)
+    run_window(limit, latency=2.0)
+    assert limit.limit == 4
+    assert limit.backoffs == 1
+    assert limit.last_p95 == pytest.approx(2.0)
+
+
+def test_fixed_limit_when_not_adaptive():
+    limit = AdaptiveConcurrency(2, maximum=4, adaptive=False)
+    run_window(limit)
+    ConcurrencySlot(limit, limit._epoch).record(1.0, overloaded=True)
+    assert limit.limit == 2
+    assert limit.snapshot()["effective"] == 2
+
+
+def test_acquire_waits_for_free_slot_in_order():
+    async def scenario():
+        limit = AdaptiveConcurrency(1, maximum=2)
+        order = []
+
+        async def worker(name, hold):
+            async with limit.acquire():
+                order.append(name)
+                await hold.wait()
+
+        first_done, second_done, third_done = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        tasks = [
+            asyncio.create_task(worker("first", first_done)),
+            asyncio.create_task(worker("second", second_done)),
+            asyncio.create_task(worker("third", third_done)),
+        ]
+        await asyncio.sleep(0)
+        assert order == ["first"]
+        assert limit.in_flight == 1
+
+        # A higher limit admits the next waiter right away
+        limit.limit = 2
+        limit._wake()
+        await asyncio.sleep(0)
+        assert order == ["first", "second"]
+
+        first_done.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert order == ["first", "second", "third"]
+
+        second_done.set()
+        third_done.set()
+        await asyncio.gather(*tasks)
+        assert limit.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_releases_nothing():
+    async def scenario():
+        limit = AdaptiveConcurrency(1)
+        async with limit.acquire():
+            waiter = asyncio.create_task(limit.acquire().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            assert limit.in_flight == 1
+        assert limit.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+class Result:
+    def __init__(self, success=True, status_code=200, error_message=None):
+        self.success = success
+        self.status_code = status_code
+        self.error_message = error_message
+
+
+@pytest.mark.parametrize("result, error, expected", [
+    (Result(), None, False),
+    (Result(status_code=404), None, False),
+    (Result(status_code=429), None, True),
+    (Result(status_code=503), None, True),
+    (Result(success=False, status_code=None, error_message="Page.goto: Timeout 30000ms exceeded"), None, True),
+    (Result(success=False, status_code=None, error_message="net::ERR_NAME_NOT_RESOLVED"), None, False),
+    (None, TimeoutError(), True),
+    (None, ValueError("bad"), False),
+])
+def test_is_overload(result, error, expected):
+    assert is_overload(result, error) is expected
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 21)]
+    assert percentile(values, 95) == 19.0
+    assert percentile(values, 50) == 10.0
+    assert percentile([3.0], 95) == 3.0
@@ -0,0 +1,116 @@
+"""Tests for the memory-bounded ResultSpool."""
+import asyncio
+import os
+
+import pytest
+
+from result_spool import ResultSpool, result_size
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = ResultSpool(memory_budget=100, directory=str(tmp_path))
+    yield spool
+    spool.close()
+
+
+def spilled_files(spool):
+    return os.listdir(spool._dir)
+
+
+def test_result_size():
+    item = {
+        "markdown": "x" * 10,
+        "chunks": ["a" * 3, "b" * 4],
+        "code_blocks": [{"code": "c" * 5, "full_context": "d" * 6}],
+    }
+    assert result_size(item) == 28
+    assert result_size({"url": "https://example.com"}) == 0
+
+
+def test_round_trip_in_memory(spool):
+    item = {"url": "https://example.com/a", "markdown": "a" * 60}
+
+    async def scenario():
+        entry = await spool.hold(item)
+        assert not entry.spilled
+        assert spool.memory_used == 60
+        assert await spool.take(entry) is item
+        assert spool.memory_used == 0
+
+    asyncio.run(scenario())
+
+
+def test_round_trip_spilled(spool):
+    first = {"url": "https://example.com/a", "markdown": "a" * 60}
+    second = {
+        "url": "https://example.com/b",
+        "markdown": "b" * 60,
+        "chunks": ["b" * 30, "b" * 30],
+        "metadatas": [{"chunk_index": 0}, {"chunk_index": 1}],
+        "fetch_state": None,
+    }
+
+    async def scenario():
+        kept = await spool.hold(first)
+        spilled = await spool.hold(second)
+        assert spilled.spilled
+        assert spool.memory_used == 60
+        assert len(spilled_files(spool)) == 1
+
+        assert await spool.take(spilled) == second
+        assert not spilled.spilled
+        assert spilled_files(spool) == []
+        assert await spool.take(kept) is first
+        assert spool.memory_used == 0
+
+    asyncio.run(scenario())
+
+
+def test_memory_is_reused_after_take(spool):
+    async def scenario():
+        entry = await spool.hold({"markdown": "a" * 100})
+        assert (await spool.hold({"markdown": "b"})).spilled
+        await spool.take(entry)
+        assert not (await spool.hold({"markdown": "c" * 100})).spilled
+
+    asyncio.run(scenario())
+
+
+def test_discard_releases_memory_and_files(spool):
+    async def scenario():
+        kept = await spool.hold({"markdown": "a" * 80})
+        spilled = await spool.hold({"markdown": "b" * 80})
+        spool.discard(kept)
+        spool.discard(spilled)
+        assert spool.memory_used == 0
+        assert spilled_files(spool) == []
+        # Discarding twice is harmless
+        spool.discard(kept)
+        spool.discard(spilled)
+        assert spool.memory_used == 0
+
+    asyncio.run(scenario())
+
+
+def test_close_removes_spill_directory(tmp_path):
+    spool = ResultSpool(memory_budget=0, directory=str(tmp_path))
+
+    async def scenario():
+        await spool.hold({"markdown": "a"})
+
+    asyncio.run(scenario())
+    assert len(spilled_files(spool)) == 1
+    spool.close()
+    assert not os.path.exists(spool._dir)
+
+
+def test_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("CRAWL_RESULT_MEMORY_MB", "0.5")
+    monkeypatch.setenv("CRAWL_SPILL_DIR", str(tmp_path))
+    spool = ResultSpool.from_env()
+    try:
+        assert spool.memory_budget == 512 * 1024
+        assert os.path.dirname(spool._dir) == str(tmp_path)
+    finally:
+        spool.close()
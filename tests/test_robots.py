@@ -0,0 +1,125 @@
+"""Tests for robots.txt parsing, the RobotsCache and the UrlPolicy robots check."""
+import asyncio
+
+import httpx
+
+from robots import RobotsCache, parse_robots, product_token
+from url_policy import UrlPolicy
+
+ROBOTS_TXT = """
+User-agent: *
+Disallow: /private/
+Disallow: /*.json$
+Allow: /private/public
+Crawl-delay: 2
+
+User-agent: OtherBot/2.0
+Disallow: /no-otherbot
+"""
+
+
+def make_cache(routes, requests=None, **kwargs):
+    """Build a RobotsCache whose client answers from a {url: response} mapping."""
+    def handler(request):
+        if requests is not None:
+            requests.append(str(request.url))
+        return routes.get(str(request.url), httpx.Response(404))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+    return RobotsCache(client=client, **kwargs)
+
+
+def test_product_token():
+    assert product_token("Crawl4AI/0.6.2") == "crawl4ai"
+    assert product_token(" MyBot ") == "mybot"
+
+
+def test_parse_robots_wildcard_group():
+    rules = parse_robots(ROBOTS_TXT, "crawl4ai")
+    assert rules.allows("/docs")
+    assert not rules.allows("/private/page")
+    assert rules.allows("/private")
+    assert not rules.allows("/data/items.json")
+    assert rules.allows("/data/items.json?page=2")
+    assert rules.crawl_delay == 2.0
+
+
+def test_parse_robots_longest_rule_wins():
+    rules = parse_robots(ROBOTS_TXT, "crawl4ai")
+    assert rules.allows("/private/public/page")
+    tie = parse_robots("User-agent: *\nDisallow: /a\nAllow: /a\n", "crawl4ai")
+    assert tie.allows("/a")
+
+
+def test_parse_robots_matches_product_token():
+    # A version in our user agent or in the robots.txt group does not matter
+    rules = parse_robots(ROBOTS_TXT, "OtherBot/1.0")
+    assert not rules.allows("/no-otherbot")
+    # Our own group replaces the "*" group
+    assert rules.allows("/private/page")
+
+
+def test_allowed_fetches_robots_once_per_host():
+    requests = []
+    cache = make_cache({"https://example.com/robots.txt": httpx.Response(200, text=ROBOTS_TXT)}, requests)
+
+    async def check():
+        return await asyncio.gather(
+            cache.allowed("https://example.com/docs"),
+            cache.allowed("https://example.com/private/page"),
+            cache.allowed("https://EXAMPLE.com/private/public"),
+        )
+
+    assert asyncio.run(check()) == [True, False, True]
+    assert requests == ["https://example.com/robots.txt"]
+
+
+def test_allowed_follows_robots_redirect():
+    cache = make_cache({
+        "http://example.com/robots.txt": httpx.Response(301, headers={"Location": "https://example.com/robots.txt"}),
+        "https://example.com/robots.txt": httpx.Response(200, text=ROBOTS_TXT),
+    })
+    assert not asyncio.run(cache.allowed("http://example.com/private/page"))
+
+
+def test_allowed_without_robots_or_enforcement():
+    missing = make_cache({})
+    assert asyncio.run(missing.allowed("https://example.com/private/page"))
+    failing = make_cache({"https://example.com/robots.txt": httpx.Response(503)})
+    assert asyncio.run(failing.allowed("https://example.com/private/page"))
+    off = make_cache({"https://example.com/robots.txt": httpx.Response(200, text=ROBOTS_TXT)}, enforce=False)
+    assert asyncio.run(off.allowed("https://example.com/private/page"))
+
+
+def test_robots_allow_checks_redirect_twin():
+    # "/private" is allowed as written, but servers redirect it to the disallowed "/private/"
+    cache = make_cache({"https://example.com/robots.txt": httpx.Response(200, text=ROBOTS_TXT)})
+    policy = UrlPolicy(robots=cache)
+    assert asyncio.run(cache.allowed("https://example.com/private"))
+    assert not asyncio.run(policy.robots_allow("https://example.com/private"))
+    assert asyncio.run(policy.robots_allow("https://example.com/docs"))
+
+
+def test_robots_allow_checks_written_form():
+    cache = make_cache({"https://example.com/robots.txt": httpx.Response(200, text=ROBOTS_TXT)})
+    policy = UrlPolicy(robots=cache, strip_trailing_slash=True)
+    canonical = policy.canonicalize("https://example.com/private/")
+    assert canonical == "https://example.com/private"
+    assert not asyncio.run(policy.robots_allow(canonical, "https://example.com/private/"))
+
+
+def test_admits_counts_disallowed_urls():
+    cache = make_cache({"https://example.com/robots.txt": httpx.Response(200, text=ROBOTS_TXT)})
+    policy = UrlPolicy(robots=cache)
+    assert not asyncio.run(policy.admits("https://example.com/private/page"))
+    assert asyncio.run(policy.admits("https://example.com/docs"))
+    assert policy.disallowed_count == 1
+
+
+def test_robots_allow_rejects_redirect_target():
+    # A page fetched from an allowed URL that redirected into a disallowed one is not indexed
+    cache = make_cache({"https://example.com/robots.txt": httpx.Response(200, text=ROBOTS_TXT)})
+    policy = UrlPolicy(robots=cache)
+    requested = policy.canonicalize("https://example.com/moved")
+    redirected_to = "https://example.com/private/page#top"
+    assert asyncio.run(policy.robots_allow(requested))
+    assert not asyncio.run(policy.robots_allow(policy.canonicalize(redirected_to), redirected_to))
@@ -0,0 +1,89 @@
+"""Tests for URL canonicalization and filtering in url_policy."""
+import pytest
+
+from url_policy import UrlPolicy
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM/Docs", "https://example.com/Docs"),
+    ("https://example.com:443/a", "https://example.com/a"),
+    ("http://example.com:80/a", "http://example.com/a"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com/a#section", "https://example.com/a"),
+    ("https://example.com/docs/", "https://example.com/docs/"),
+    ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a?utm_source=x&id=3&gclid=y&UTM_Medium=z", "https://example.com/a?id=3"),
+    ("https://example.com/a?utm_source=x", "https://example.com/a"),
+    ("https://example.com/a?q=a%20b&flag", "https://example.com/a?flag&q=a%20b"),
+    ("https://example.com/a?q=a+b", "https://example.com/a?q=a+b"),
+    ("http://[::1]:8080/ok", "http://[::1]:8080/ok"),
+    ("http://user:pw@example.com/a", "http://user:pw@example.com/a"),
+])
+def test_canonicalize(url, expected):
+    assert UrlPolicy().canonicalize(url) == expected
+
+
+def test_canonicalize_collapses_variants():
+    policy = UrlPolicy()
+    variants = [
+        "https://example.com/page?b=2&a=1",
+        "HTTPS://EXAMPLE.com:443/page?a=1&b=2#top",
+        "https://example.com/page?a=1&utm_campaign=launch&b=2",
+    ]
+    assert len({policy.canonicalize(url) for url in variants}) == 1
+
+
+def test_canonicalize_strip_trailing_slash():
+    policy = UrlPolicy(strip_trailing_slash=True)
+    assert policy.canonicalize("https://example.com/docs/") == "https://example.com/docs"
+    assert policy.canonicalize("https://example.com/") == "https://example.com/"
+
+
+def test_canonicalize_rejects_malformed_port():
+    with pytest.raises(ValueError):
+        UrlPolicy().canonicalize("http://example.com:abc/a")
+
+
+def test_try_canonicalize_counts_malformed_urls():
+    policy = UrlPolicy()
+    assert policy.try_canonicalize("http://example.com:abc/a") is None
+    assert policy.try_canonicalize("http://[::1/a") is None
+    assert policy.try_canonicalize("https://example.com/a") == "https://example.com/a"
+    assert policy.rejected_count == 2
+
+
+@pytest.mark.parametrize("url, allowed", [
+    ("https://example.com/docs/intro", True),
+    ("ftp://example.com/file", False),
+    ("mailto:someone@example.com", False),
+    ("https://example.com/report.pdf", False),
+    ("https://example.com/logo.PNG", False),
+    ("https://example.com/static/app.js", False),
+    ("https://example.com/manual/index.php", True),
+    ("https://example.com/lib/module.rb", True),
+    ("https://example.com/v1.2/guide", True),
+    ("https://example.com/README.md", True),
+])
+def test_allows_file_types(url, allowed):
+    assert UrlPolicy()._allows(url) is allowed
+
+
+def test_allows_include_and_exclude_patterns():
+    policy = UrlPolicy(include_patterns=["*/docs/*"], exclude_patterns=["re:/v[0-9]+/"])
+    assert policy._allows("https://example.com/docs/intro")
+    assert not policy._allows("https://example.com/blog/post")
+    assert not policy._allows("https://example.com/docs/v2/intro")
+
+
+def test_allows_custom_skip_extensions():
+    policy = UrlPolicy(skip_extensions={".txt"})
+    assert not policy._allows("https://example.com/notes.txt")
+    assert policy._allows("https://example.com/report.pdf")
+
+
+def test_allows_counts_rejections():
+    policy = UrlPolicy()
+    assert not policy.allows("https://example.com/archive.zip")
+    assert policy.allows("https://example.com/docs")
+    assert policy.rejected_count == 1
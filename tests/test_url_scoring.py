@@ -0,0 +1,59 @@
+"""Tests for the frontier's default UrlScorer."""
+from url_policy import UrlPolicy
+from url_scoring import UrlScorer
+
+
+def ranked(urls, scorer=None):
+    scorer = scorer or UrlScorer()
+    return sorted(urls, key=lambda url: -scorer(url, 1))
+
+
+def test_documentation_before_listings():
+    urls = [
+        "https://example.com/blog/2024/launch",
+        "https://example.com/docs/install",
+        "https://example.com/about",
+        "https://example.com/tag/python",
+    ]
+    assert ranked(urls) == [
+        "https://example.com/docs/install",
+        "https://example.com/about",
+        "https://example.com/blog/2024/launch",
+        "https://example.com/tag/python",
+    ]
+
+
+def test_depth_path_length_and_query_lower_the_score():
+    scorer = UrlScorer()
+    assert scorer("https://example.com/a", 1) > scorer("https://example.com/a", 2)
+    assert scorer("https://example.com/a", 1) > scorer("https://example.com/a/b/c", 1)
+    assert scorer("https://example.com/a", 1) > scorer("https://example.com/a?page=2", 1)
+
+
+def test_only_strongest_boost_counts():
+    scorer = UrlScorer()
+    single = scorer("https://example.com/docs/x", 1)
+    stacked = scorer("https://example.com/docs/api/x", 1)
+    # The second boosted segment only adds path length
+    assert stacked < single
+
+
+def test_anchor_text_and_inbound_links():
+    scorer = UrlScorer()
+    url = "https://example.com/page"
+    assert scorer(url, 1, "API reference") > scorer(url, 1, "") > scorer(url, 1, "Older posts")
+    assert scorer(url, 1, "", 3) == scorer(url, 1, "", 0) + 2.0
+
+
+def test_custom_segment_weights():
+    scorer = UrlScorer(boost_segments={"handbook": 3.0}, demote_segments={})
+    assert scorer("https://example.com/handbook/x", 1) > scorer("https://example.com/docs/x", 1)
+    assert scorer("https://example.com/blog/x", 1) == scorer("https://example.com/misc/x", 1)
+
+
+def test_policy_uses_custom_scorer():
+    def prefer_short(url, depth, anchor_text="", inbound_links=0):
+        return -len(url)
+
+    assert isinstance(UrlPolicy().scorer, UrlScorer)
+    assert UrlPolicy(scorer=prefer_short).scorer is prefer_short